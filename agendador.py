@@ -0,0 +1,257 @@
+import datetime
+import json
+import os
+import threading
+import time
+import streamlit as st
+from motor_backup import gerar_backup, novo_arquivo_temporario, remover_arquivo, FORMATO_PADRAO
+from esquema import ordem_topologica
+from repositorio_backup import (
+    guardar_backup, aplicar_retencao, coletar_lixo, PASTA_REPOSITORIO, RETENCAO_DIARIOS, RETENCAO_SEMANAIS,
+)
+from utils import init_connection
+
+try:
+    import fcntl  # Trava entre processos (Linux/macOS); no Windows vale só a trava do processo
+except ImportError:
+    fcntl = None
+
+# --- Backups Automáticos ---
+# Agenda no formato do cron: "minuto hora dia mês dia_da_semana" (horário local do servidor).
+# Desativado por padrão: só roda com OFFICEFLOW_AGENDA_BACKUP definida (vazio ou "desativado" desliga).
+AGENDA_BACKUP = os.environ.get("OFFICEFLOW_AGENDA_BACKUP", "")
+FORMATO_BACKUP_AGENDADO = os.environ.get("OFFICEFLOW_FORMATO_BACKUP", FORMATO_PADRAO)
+
+
+def _retencao_do_ambiente():
+    """(diários, semanais) de OFFICEFLOW_RETENCAO_DIARIOS/_SEMANAIS; None se nenhuma estiver definida."""
+    diarios = os.environ.get("OFFICEFLOW_RETENCAO_DIARIOS", "").strip()
+    semanais = os.environ.get("OFFICEFLOW_RETENCAO_SEMANAIS", "").strip()
+    if not diarios and not semanais:
+        return None
+    return int(diarios or RETENCAO_DIARIOS), int(semanais or RETENCAO_SEMANAIS)
+
+
+# Retenção aplicada após cada execução. Sem as variáveis o agendador não remove backups:
+# a limpeza fica a cargo da página de Backup, com a política escolhida lá.
+RETENCAO_AGENDADA = _retencao_do_ambiente()
+
+ARQUIVO_HISTORICO = "historico_agendador.json"
+ARQUIVO_TRAVA = "agendador.lock"
+LIMITE_HISTORICO = 200  # Execuções mantidas no histórico
+INTERVALO_VERIFICACAO = 60  # Espera máxima (s) entre conferências do relógio
+
+
+# --- Expressão Cron ---
+LIMITES_CRON = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _campo_cron(campo, minimo, maximo):
+    """Valores aceitos por um campo: '*', 'a-b', 'a,b', '*/n' e 'a-b/n'."""
+    valores = set()
+    for parte in campo.split(","):
+        intervalo, _, passo = parte.partition("/")
+        if intervalo == "*":
+            inicio, fim = minimo, maximo
+        elif "-" in intervalo:
+            inicio, fim = (int(v) for v in intervalo.split("-"))
+        else:
+            inicio = fim = int(intervalo)
+            if passo:
+                fim = maximo
+        if not (minimo <= inicio <= fim <= maximo):
+            raise ValueError(f"Valor fora do intervalo {minimo}-{maximo}: '{parte}'")
+        valores.update(range(inicio, fim + 1, int(passo) if passo else 1))
+    return valores
+
+
+class AgendaCron:
+    """Expressão cron de 5 campos com o cálculo da próxima execução."""
+
+    def __init__(self, expressao):
+        campos = expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f"A agenda deve ter 5 campos (minuto hora dia mês dia_da_semana): '{expressao}'")
+        self.expressao = expressao
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+            _campo_cron(campo, *limites) for campo, limites in zip(campos, LIMITES_CRON)
+        )
+        # Domingo pode ser 0 ou 7; convertido para a numeração do Python (segunda = 0)
+        self.dias_semana = {(d - 1) % 7 for d in dias_semana}
+        # Como no cron: com dia do mês e da semana restritos, basta um dos dois coincidir
+        self._dia_restrito = campos[2] != "*"
+        self._semana_restrita = campos[4] != "*"
+        # Agenda impossível (ex: 30 de fevereiro) falha já na configuração, não na thread
+        self.proxima(datetime.datetime.now())
+
+    def _dia_valido(self, data):
+        if data.month not in self.meses:
+            return False
+        no_mes = data.day in self.dias
+        na_semana = data.weekday() in self.dias_semana
+        if self._dia_restrito and self._semana_restrita:
+            return no_mes or na_semana
+        return no_mes and na_semana
+
+    def proxima(self, apos):
+        """Primeiro horário da agenda estritamente depois de `apos` (datetime sem fuso)."""
+        inicio = apos.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        data = inicio.date()
+        for _ in range(366 * 5):
+            if self._dia_valido(data):
+                for hora in sorted(self.horas):
+                    for minuto in sorted(self.minutos):
+                        candidato = datetime.datetime.combine(data, datetime.time(hora, minuto))
+                        if candidato >= inicio:
+                            return candidato
+            data += datetime.timedelta(days=1)
+        raise ValueError(f"A agenda '{self.expressao}' nunca ocorre.")
+
+
+# --- Agendador ---
+class AgendadorBackup:
+    """Thread em segundo plano que gera os backups na agenda e os guarda no repositório local.
+
+    Uma execução por vez: se um backup ainda está em andamento (agendado ou pedido na página),
+    o novo pedido é descartado em vez de enfileirado.
+    """
+
+    def __init__(self, obter_cliente, agenda=AGENDA_BACKUP, formato=FORMATO_BACKUP_AGENDADO, pasta=PASTA_REPOSITORIO,
+                 retencao=RETENCAO_AGENDADA):
+        self._obter_cliente = obter_cliente
+        self.agenda = AgendaCron(agenda) if agenda and agenda.strip().lower() != "desativado" else None
+        self.formato = formato
+        self.retencao = retencao  # (diários, semanais) ou None para não remover backups
+        self.pasta = pasta
+        self.proxima_execucao = None
+        self.em_execucao = None  # Início da execução atual
+        self._lock_execucao = threading.Lock()
+        self._lock_historico = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self.agenda and self._thread is None:
+            self._thread = threading.Thread(target=self._laco, name="agendador-backup", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+    def _laco(self):
+        self.proxima_execucao = self.agenda.proxima(datetime.datetime.now())
+        while not self._parar.is_set():
+            agora = datetime.datetime.now()
+            if agora >= self.proxima_execucao:
+                self.executar("agendado")
+                # Execuções perdidas (servidor parado, backup demorado) não são repostas
+                self.proxima_execucao = self.agenda.proxima(datetime.datetime.now())
+                continue
+            # Acorda periodicamente: acompanha ajustes no relógio do servidor
+            espera = (self.proxima_execucao - agora).total_seconds()
+            self._parar.wait(min(espera, INTERVALO_VERIFICACAO))
+
+    def executar_em_segundo_plano(self, origem="manual"):
+        """Dispara um backup fora da thread do script. Retorna False se já houver um em andamento."""
+        if self._lock_execucao.locked():
+            return False
+        threading.Thread(target=self.executar, args=(origem,), name="backup-manual", daemon=True).start()
+        return True
+
+    def executar(self, origem):
+        """Gera o backup, guarda no repositório e aplica a retenção (se configurada).
+
+        Registra o resultado no histórico.
+        """
+        if not self._lock_execucao.acquire(blocking=False):
+            return None
+
+        trava = None
+        try:
+            trava = self._travar_entre_processos()
+            if trava is False:
+                # Outro processo do servidor já está gerando o backup
+                return None
+
+            self.em_execucao = datetime.datetime.now()
+            registro = {
+                "inicio": self.em_execucao.isoformat(timespec="seconds"),
+                "origem": origem,
+                "formato": self.formato,
+            }
+            inicio = time.monotonic()
+            caminho = novo_arquivo_temporario()
+            try:
+                manifesto = gerar_backup(self._obter_cliente(), ordem_topologica(), caminho, formato=self.formato)
+                guardado = guardar_backup(caminho, self.pasta)
+                if self.retencao:
+                    diarios, semanais = self.retencao
+                    registro["removidos"] = len(aplicar_retencao(diarios, semanais, pasta=self.pasta))
+                coletar_lixo(self.pasta)
+                registro.update({
+                    "situacao": "sucesso",
+                    "id": manifesto["id"],
+                    "registros": sum(info["registros"] for info in manifesto["tabelas"].values()),
+                    "bytes": os.path.getsize(caminho),
+                    "bytes_novos": guardado["bytes_novos"],
+                })
+            except Exception as e:
+                registro.update({"situacao": "erro", "erro": str(e)})
+            finally:
+                remover_arquivo(caminho)
+
+            registro["duracao"] = round(time.monotonic() - inicio, 1)
+            self._registrar(registro)
+            return registro
+        finally:
+            if trava:
+                trava.close()
+            self.em_execucao = None
+            self._lock_execucao.release()
+
+    def _travar_entre_processos(self):
+        """Trava de arquivo na pasta do repositório. None sem suporte; False se já estiver travada."""
+        if fcntl is None:
+            return None
+        os.makedirs(self.pasta, exist_ok=True)
+        trava = open(os.path.join(self.pasta, ARQUIVO_TRAVA), "w")
+        try:
+            fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            trava.close()
+            return False
+        return trava
+
+    # --- Histórico ---
+    def _caminho_historico(self):
+        return os.path.join(self.pasta, ARQUIVO_HISTORICO)
+
+    def historico(self):
+        """Execuções registradas, da mais recente para a mais antiga."""
+        with self._lock_historico:
+            if not os.path.exists(self._caminho_historico()):
+                return []
+            with open(self._caminho_historico(), encoding="utf-8") as f:
+                return json.load(f)
+
+    def _registrar(self, registro):
+        with self._lock_historico:
+            historico = []
+            if os.path.exists(self._caminho_historico()):
+                with open(self._caminho_historico(), encoding="utf-8") as f:
+                    historico = json.load(f)
+            historico = [registro] + historico[:LIMITE_HISTORICO - 1]
+
+            os.makedirs(self.pasta, exist_ok=True)
+            temporario = f"{self._caminho_historico()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(historico, f, ensure_ascii=False)
+            os.replace(temporario, self._caminho_historico())
+
+
+@st.cache_resource()
+def agendador_backup():
+    """Agendador único do processo do servidor, compartilhado por todas as sessões."""
+    # A conexão é obtida a cada execução: uma falha de conexão vira erro no histórico
+    return AgendadorBackup(init_connection).iniciar()
@@ -0,0 +1,245 @@
+import csv
+import io
+import re
+import zipfile
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.fs as pa_fs
+import pyarrow.parquet as pq
+from esquema import tipos_da_tabela
+from motor_backup import ler_manifesto, FORMATOS, NOME_MANIFESTO, FORMATO_CSV, CODIFICACAO_CSV
+
+# --- Análise Local de Backups (DuckDB) ---
+# Os arquivos do zip são lidos direto pelo DuckDB, via datasets do Arrow, sem extração nem
+# acesso ao banco de produção. Cada consulta relê só as colunas que usa.
+
+
+class _MembroZip(io.RawIOBase):
+    """Arquivo do zip com posicionamento preguiçoso.
+
+    O Arrow consulta o tamanho com seek(0, 2); num membro compactado isso descompactaria
+    tudo. Aqui o seek só guarda a posição, e o membro é reposicionado de fato na leitura.
+    """
+
+    def __init__(self, z, info):
+        self._arquivo = z.open(info)
+        self._tamanho = info.file_size
+        self._posicao = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._posicao
+
+    def seek(self, deslocamento, origem=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._posicao, io.SEEK_END: self._tamanho}[origem]
+        self._posicao = base + deslocamento
+        return self._posicao
+
+    def readinto(self, buffer):
+        if self._arquivo.tell() != self._posicao:
+            self._arquivo.seek(self._posicao)
+        lidos = self._arquivo.readinto(buffer)
+        self._posicao += lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+class SistemaArquivosZip(pa_fs.FileSystemHandler):
+    """Sistema de arquivos (somente leitura) do Arrow sobre os membros de um zip."""
+
+    def __init__(self, z):
+        self._zip = z
+        self._infos = {info.filename: info for info in z.infolist()}
+
+    def get_type_name(self):
+        return "zip"
+
+    def normalize_path(self, caminho):
+        return caminho.lstrip("/")
+
+    def get_file_info(self, caminhos):
+        infos = []
+        for caminho in caminhos:
+            info = self._infos.get(self.normalize_path(caminho))
+            if info is None:
+                infos.append(pa_fs.FileInfo(caminho, pa_fs.FileType.NotFound))
+            else:
+                infos.append(pa_fs.FileInfo(caminho, pa_fs.FileType.File, size=info.file_size))
+        return infos
+
+    def get_file_info_selector(self, seletor):
+        return [pa_fs.FileInfo(nome, pa_fs.FileType.File, size=info.file_size) for nome, info in self._infos.items()]
+
+    def open_input_file(self, caminho):
+        return pa.PythonFile(_MembroZip(self._zip, self._infos[self.normalize_path(caminho)]), mode="r")
+
+    def open_input_stream(self, caminho):
+        return self.open_input_file(caminho)
+
+    def _somente_leitura(self, *args, **kwargs):
+        raise OSError("O backup é aberto somente para leitura.")
+
+    create_dir = delete_dir = delete_dir_contents = delete_root_dir_contents = _somente_leitura
+    delete_file = move = copy_file = open_output_stream = open_append_stream = _somente_leitura
+
+
+# --- Tipos das Colunas ---
+# O CSV do backup é lido como texto e convertido na view (decimal com vírgula, inteiros
+# que o pandas gravou como '12,0'); o Parquet já traz os tipos.
+CONVERSOES_SQL = {
+    "inteiro": "COALESCE(TRY_CAST({c} AS BIGINT), CAST(TRY_CAST(REPLACE({c}, ',', '.') AS DOUBLE) AS BIGINT))",
+    "decimal": "TRY_CAST(REPLACE({c}, ',', '.') AS DOUBLE)",
+    "data": "TRY_CAST({c} AS DATE)",
+    "data_hora": "TRY_CAST({c} AS TIMESTAMPTZ)",
+    "booleano": "TRY_CAST({c} AS BOOLEAN)",
+}
+
+
+def _identificador(nome):
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _dataset_csv(z, sistema, nome_arquivo):
+    with z.open(nome_arquivo) as f:
+        cabecalho = f.readline().decode("utf-8-sig").rstrip("\r\n")
+    # Backups no formato BR usam ';'; arquivos antigos/padrão usam ','
+    separador = ";" if ";" in cabecalho else ","
+    colunas = next(csv.reader([cabecalho], delimiter=separador))
+    formato = ds.CsvFileFormat(
+        parse_options=pa_csv.ParseOptions(delimiter=separador, newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types={coluna: pa.string() for coluna in colunas}),
+    )
+    return ds.dataset(nome_arquivo, filesystem=sistema, format=formato), colunas
+
+
+def _select_tipado(tabela, nome_registrado, colunas):
+    tipos = tipos_da_tabela(tabela)
+    expressoes = []
+    for coluna in colunas:
+        conversao = CONVERSOES_SQL.get(tipos.get(coluna))
+        c = _identificador(coluna)
+        expressoes.append(f"{conversao.format(c=c)} AS {c}" if conversao else c)
+    return f"SELECT {', '.join(expressoes)} FROM {_identificador(nome_registrado)}"
+
+
+class AnaliseBackups:
+    """Conexão DuckDB com as tabelas de um ou mais backups montadas como views.
+
+    Com um backup, as tabelas ficam no esquema principal (`SELECT * FROM ativos`).
+    Com vários, cada um ganha um esquema (`b1.ativos`, `b2.ativos`, ...) e o esquema
+    `historico` une as tabelas dos backups completos com as colunas `_backup` e `_criado_em`.
+    A view `backups` lista os arquivos montados.
+    """
+
+    def __init__(self, arquivos, banco=":memory:"):
+        self.con = duckdb.connect(banco)
+        self.tabelas_montadas = {}
+        self._zips = []
+        montados = []
+        try:
+            for posicao, arquivo in enumerate(arquivos, start=1):
+                esquema = "main" if len(arquivos) == 1 else f"b{posicao}"
+                montados.append((esquema, str(arquivo), self._montar(arquivo, esquema) or {}))
+        except BaseException:
+            self.fechar()
+            raise
+
+        self.con.register("_backups", pd.DataFrame(
+            [(esquema, arquivo, m.get("id"), m.get("tipo", "completo"), m.get("criado_em"))
+             for esquema, arquivo, m in montados],
+            columns=["esquema", "arquivo", "id", "tipo", "criado_em"],
+        ))
+        self.con.execute(
+            "CREATE VIEW backups AS SELECT * REPLACE (CAST(criado_em AS TIMESTAMPTZ) AS criado_em) FROM _backups"
+        )
+        if len(montados) > 1:
+            self._montar_historico(montados)
+
+    def _montar(self, arquivo, esquema):
+        z = zipfile.ZipFile(arquivo)
+        self._zips.append(z)
+        manifesto = ler_manifesto(z)
+        sistema = pa_fs.PyFileSystem(SistemaArquivosZip(z))
+        if esquema != "main":
+            self.con.execute(f"CREATE SCHEMA {esquema}")
+
+        for nome_arquivo in z.namelist():
+            tabela, extensao = nome_arquivo.rsplit(".", 1) if "." in nome_arquivo else (nome_arquivo, "")
+            if nome_arquivo == NOME_MANIFESTO or f".{extensao}" not in FORMATOS.values():
+                continue
+            if not re.fullmatch(r"\w+", tabela):
+                continue
+
+            nome_registrado = f"_{esquema}_{tabela}"
+            if f".{extensao}" == FORMATOS["parquet"]:
+                dataset = ds.dataset(nome_arquivo, filesystem=sistema, format="parquet")
+                consulta = f"SELECT * FROM {_identificador(nome_registrado)}"
+            else:
+                dataset, colunas = _dataset_csv(z, sistema, nome_arquivo)
+                consulta = _select_tipado(tabela, nome_registrado, colunas)
+
+            self.con.register(nome_registrado, dataset)
+            self.con.execute(f"CREATE VIEW {esquema}.{_identificador(tabela)} AS {consulta}")
+            self.tabelas_montadas.setdefault(esquema, []).append(tabela)
+        return manifesto
+
+    def _montar_historico(self, montados):
+        self.con.execute("CREATE SCHEMA historico")
+        completos = [(esquema, m) for esquema, _, m in montados if m.get("tipo", "completo") == "completo"]
+        tabelas = sorted({t for esquema, _ in completos for t in self.tabelas_montadas.get(esquema, [])})
+        for tabela in tabelas:
+            partes = [
+                f"SELECT *, '{esquema}' AS _backup, "
+                f"(SELECT criado_em FROM backups WHERE esquema = '{esquema}') AS _criado_em "
+                f"FROM {esquema}.{_identificador(tabela)}"
+                for esquema, _ in completos if tabela in self.tabelas_montadas.get(esquema, [])
+            ]
+            self.con.execute(f"CREATE VIEW historico.{_identificador(tabela)} AS {' UNION ALL BY NAME '.join(partes)}")
+
+    def consultar(self, sql):
+        """Executa a consulta e retorna um DataFrame."""
+        return self.con.execute(sql).df()
+
+    def exportar(self, sql, destino, formato="csv", linhas_por_lote=100_000):
+        """Grava o resultado em `destino` (arquivo binário) lote a lote, sem montá-lo inteiro.
+
+        CSV no padrão do Excel brasileiro ou Parquet. Retorna o número de linhas.
+        """
+        leitor = self.con.execute(sql).fetch_record_batch(linhas_por_lote)
+        escritor = pq.ParquetWriter(destino, leitor.schema) if formato == "parquet" else None
+        linhas = 0
+        try:
+            for lote in leitor:
+                if escritor:
+                    escritor.write_batch(lote)
+                elif linhas == 0:
+                    destino.write(lote.to_pandas().to_csv(index=False, **FORMATO_CSV).encode(CODIFICACAO_CSV))
+                else:
+                    destino.write(lote.to_pandas().to_csv(index=False, header=False, **FORMATO_CSV).encode("utf-8"))
+                linhas += lote.num_rows
+        finally:
+            if escritor:
+                escritor.close()
+        return linhas
+
+    def fechar(self):
+        self.con.close()
+        for z in self._zips:
+            z.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
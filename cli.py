@@ -0,0 +1,431 @@
+"""Operações em massa pela linha de comando, sem o Streamlit (cron, shell, arquivos grandes).
+
+    python cli.py backup /backups/officeflow.zip [--formato parquet] [--repositorio]
+    python cli.py restaurar completo.zip diferencial.zip [--limpar]
+    python cli.py restaurar completo.zip --delta [--simular]
+    python cli.py verificar completo.zip
+    python cli.py exportar ativos ativos.csv     (ou '-' para a saída padrão)
+    python cli.py importar ativos ativos.csv     (ou '-' para a entrada padrão)
+    python cli.py relatorio inventario.parquet --formato parquet
+    python cli.py sql jan.zip fev.zip -e "SELECT ..." [--saida resultado.csv]
+    python cli.py comparar jan.zip fev.zip [--saida diferencas.csv]
+
+A conexão vem das variáveis SUPABASE_URL e SUPABASE_KEY (também lidas de um .env)
+ou do .streamlit/secrets.toml usado pela aplicação. O progresso vai para a saída de erro.
+
+Códigos de saída: 0 sucesso, 1 falha, 2 argumentos inválidos, 3 concluído com linhas rejeitadas.
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+import pandas as pd
+import supabase
+from esquema import ordem_topologica, TABELAS
+from motor_backup import (
+    gerar_backup, ler_manifesto, ordenar_cadeia, codificar_lote_csv,
+    FORMATOS, FORMATO_PADRAO, FORMATO_CSV, CODIFICACAO_CSV,
+)
+from motor_restauracao import (
+    restaurar_backup, chave_arquivo, remover_checkpoint, verificar_backup,
+    planejar_delta, resumo_delta, aplicar_delta, TAMANHO_LOTE_RESTAURACAO,
+)
+from dados import RepositorioReferencias
+from exportacao import exportar_tabela, exportar_inventario
+from importacao import importar_csv, detectar_formato_csv
+from validacao import validar_csv, resumo_erros, ids_existentes
+
+SAIDA_SUCESSO = 0
+SAIDA_FALHA = 1
+SAIDA_PARCIAL = 3
+
+INTERVALO_PROGRESSO = 1.0  # Segundos entre mensagens de progresso da mesma tabela
+
+
+# --- Saída ---
+def informar(mensagem):
+    print(mensagem, file=sys.stderr, flush=True)
+
+
+class Progresso:
+    """Mensagens de progresso por tabela, no máximo uma por `INTERVALO_PROGRESSO`."""
+
+    def __init__(self):
+        self._ultima = {}
+
+    def __call__(self, tabela, feitas, total=None, concluida=False):
+        agora = time.monotonic()
+        if not concluida and agora - self._ultima.get(tabela, 0) < INTERVALO_PROGRESSO:
+            return
+        self._ultima[tabela] = agora
+        andamento = f"{feitas} de {total}" if total else f"{feitas}"
+        informar(f"{tabela}: {andamento} registros{' (concluída)' if concluida else ''}")
+
+
+def informar_falhas(falhas, limite=20):
+    """Lista as linhas rejeitadas (até `limite` por tabela). Retorna o total."""
+    total = 0
+    for tabela, lista in falhas.items():
+        total += len(lista)
+        for linha, erro in lista[:limite]:
+            informar(f"  {tabela}, linha {linha}: {erro}")
+        if len(lista) > limite:
+            informar(f"  {tabela}: mais {len(lista) - limite} linhas rejeitadas")
+    return total
+
+
+# --- Conexão ---
+def criar_cliente():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    url, chave = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if not (url and chave):
+        import streamlit as st
+        try:
+            url, chave = st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"]
+        except (KeyError, FileNotFoundError) as e:
+            raise RuntimeError("Defina SUPABASE_URL e SUPABASE_KEY (ambiente, .env ou .streamlit/secrets.toml).") from e
+    return supabase.create_client(url, chave)
+
+
+# --- Comandos ---
+def comando_backup(args):
+    client = criar_cliente()
+    tabelas = ordem_topologica()
+    manifesto_anterior = None
+    if args.diferencial:
+        manifesto_anterior = ler_manifesto(args.diferencial)
+        if manifesto_anterior is None:
+            raise RuntimeError(f"{args.diferencial} não possui manifesto; gere um backup completo.")
+
+    progresso = Progresso()
+    manifesto = gerar_backup(
+        client,
+        tabelas,
+        args.destino,
+        ao_progresso=lambda tabela, registros, concluida: progresso(tabela, registros, concluida=concluida),
+        manifesto_anterior=manifesto_anterior,
+        formato=args.formato,
+    )
+    total = sum(info["registros"] for info in manifesto["tabelas"].values())
+    informar(f"Backup {manifesto['tipo']} gravado em {args.destino}: {total} registros.")
+
+    if args.repositorio:
+        from repositorio_backup import guardar_backup
+        guardado = guardar_backup(args.destino)
+        informar(f"Guardado no repositório local: {guardado['bytes_novos']} bytes novos de {guardado['bytes_originais']}.")
+    return SAIDA_SUCESSO
+
+
+def comando_restaurar(args):
+    client = criar_cliente()
+    tabelas = ordem_topologica()
+    if args.delta:
+        return _restaurar_delta(client, args, tabelas)
+
+    manifestos = {caminho: ler_manifesto(caminho) for caminho in args.arquivos}
+    cadeia = ordenar_cadeia(manifestos)
+    progresso = Progresso()
+    falhas_totais = {}
+
+    for posicao, caminho in enumerate(cadeia):
+        with open(caminho, "rb") as arquivo:
+            chave = chave_arquivo(arquivo)
+            if args.recomecar:
+                remover_checkpoint(chave)
+            informar(f"Restaurando {caminho}...")
+            with zipfile.ZipFile(arquivo) as z:
+                falhas = restaurar_backup(
+                    client,
+                    z,
+                    tabelas,
+                    chave,
+                    manifesto=manifestos[caminho],
+                    limpar_antes=args.limpar and posicao == 0,
+                    ao_progresso=progresso,
+                    ao_concluir_tabela=lambda tabela, enviados, _: progresso(tabela, enviados, concluida=True),
+                    ao_remover=lambda tabela, quantidade: informar(f"{tabela}: {quantidade} registros removidos"),
+                )
+        for tabela, lista in falhas.items():
+            falhas_totais.setdefault(tabela, []).extend(lista)
+
+    if informar_falhas(falhas_totais):
+        return SAIDA_PARCIAL
+    informar("Restauração concluída.")
+    return SAIDA_SUCESSO
+
+
+def _restaurar_delta(client, args, tabelas):
+    if len(args.arquivos) > 1:
+        raise RuntimeError("A restauração delta usa um único backup completo.")
+
+    with zipfile.ZipFile(args.arquivos[0]) as z:
+        informar("Comparando o backup com o banco...")
+        plano = planejar_delta(client, z, tabelas, remover_ausentes=args.remover_ausentes, manifesto=ler_manifesto(z))
+        for linha in resumo_delta(plano):
+            informar("  " + ", ".join(f"{chave}: {valor}" for chave, valor in linha.items()))
+        if args.simular:
+            return SAIDA_SUCESSO
+
+        falhas = aplicar_delta(
+            client, z, plano,
+            ao_progresso=Progresso(),
+            ao_remover=lambda tabela, quantidade: informar(f"{tabela}: {quantidade} registros removidos"),
+        )
+
+    if informar_falhas(falhas):
+        return SAIDA_PARCIAL
+    informar("Diferenças aplicadas.")
+    return SAIDA_SUCESSO
+
+
+def comando_verificar(args):
+    valido = True
+    for caminho in args.arquivos:
+        with zipfile.ZipFile(caminho) as z:
+            resultado = verificar_backup(z)
+        valido &= resultado["valido"]
+        informar(f"{caminho}: {'backup íntegro' if resultado['valido'] else 'foram encontrados problemas'}")
+        for aviso in resultado["avisos"]:
+            informar(f"  {aviso}")
+    return SAIDA_SUCESSO if valido else SAIDA_FALHA
+
+
+def comando_exportar(args):
+    client = criar_cliente()
+    progresso = Progresso()
+    destino = sys.stdout.buffer if args.destino == "-" else open(args.destino, "wb")
+    try:
+        registros = exportar_tabela(
+            client, args.tabela, destino, formato=args.formato, colunas=args.colunas,
+            ao_progresso=lambda registros: progresso(args.tabela, registros),
+        )
+    finally:
+        if destino is not sys.stdout.buffer:
+            destino.close()
+    progresso(args.tabela, registros, concluida=True)
+    return SAIDA_SUCESSO
+
+
+def comando_relatorio(args):
+    client = criar_cliente()
+    progresso = Progresso()
+    destino = sys.stdout.buffer if args.destino == "-" else open(args.destino, "wb")
+    try:
+        ativos = exportar_inventario(
+            client, destino, formato=args.formato,
+            ao_progresso=lambda registros: progresso("inventario", registros),
+        )
+    finally:
+        if destino is not sys.stdout.buffer:
+            destino.close()
+    progresso("inventario", ativos, concluida=True)
+    return SAIDA_SUCESSO
+
+
+def comando_importar(args):
+    client = criar_cliente()
+    progresso = Progresso()
+    obter_referencia = RepositorioReferencias(client).obter
+    codificacao = args.codificacao or CODIFICACAO_CSV
+    separador = args.separador or FORMATO_CSV["sep"]
+    total, linhas_com_erro = None, set()
+    try:
+        if args.origem == "-":
+            origem = sys.stdin.buffer
+        else:
+            origem = args.origem
+            with open(origem, "rb") as f:
+                detectada, detectado = detectar_formato_csv(f)
+            codificacao, separador = args.codificacao or detectada, args.separador or detectado
+            informar(f"{origem}: codificação {codificacao}, separador {separador!r}")
+
+            # Arquivo: validado contra o esquema da tabela antes de qualquer envio
+            total, erros = validar_csv(
+                origem, args.tabela, obter_referencia, lambda tabela, ids: ids_existentes(client, tabela, ids),
+                codificacao=codificacao, separador=separador,
+            )
+            linhas_com_erro = set(erros["linha"].tolist())
+            if linhas_com_erro:
+                informar(f"{len(linhas_com_erro)} de {total} linhas com problemas:")
+                for r in resumo_erros(erros).itertuples(index=False):
+                    informar(f"  {r.coluna}: {r.erro} ({r.linhas} linha(s), a 1ª na linha {r.primeira_linha})")
+                if args.relatorio:
+                    erros.to_csv(args.relatorio, index=False, encoding=CODIFICACAO_CSV, **FORMATO_CSV)
+                    informar(f"Relatório por linha gravado em {args.relatorio}.")
+                if not args.somente_validas:
+                    informar("Nada foi enviado (use --somente-validas para importar as demais linhas).")
+                    return SAIDA_FALHA
+
+        enviados, falhas = importar_csv(
+            client, args.tabela, origem, tamanho_lote=args.tamanho_lote, codificacao=codificacao,
+            sobrescrever=args.sobrescrever, ao_progresso=lambda lidas, _: progresso(args.tabela, lidas, total),
+            obter_referencia=obter_referencia, separador=separador, ignorar=linhas_com_erro,
+        )
+    except UnicodeDecodeError as e:
+        raise RuntimeError(
+            f"O arquivo não está em {codificacao} ({e.reason}). Tente --codificacao latin1; "
+            "os lotes já enviados foram mantidos (use --sobrescrever ao repetir)."
+        ) from e
+    progresso(args.tabela, enviados, concluida=True)
+    if informar_falhas({args.tabela: falhas}) or linhas_com_erro:
+        return SAIDA_PARCIAL
+    return SAIDA_SUCESSO
+
+
+def comando_sql(args):
+    # DuckDB só é necessário para este comando
+    from analise import AnaliseBackups
+
+    with AnaliseBackups(args.arquivos) as analise:
+        for esquema, tabelas in analise.tabelas_montadas.items():
+            informar(f"{esquema}: {', '.join(tabelas)}")
+
+        if args.consulta:
+            consultas = [args.consulta]
+        elif sys.stdin.isatty():
+            consultas = _ler_consultas_interativas()
+        else:
+            consultas = [sys.stdin.read()]
+
+        for consulta in consultas:
+            try:
+                if args.saida:
+                    formato = "parquet" if args.saida.endswith(FORMATOS["parquet"]) else "csv"
+                    with open(args.saida, "wb") as destino:
+                        linhas = analise.exportar(consulta, destino, formato)
+                    informar(f"{linhas} linhas gravadas em {args.saida}.")
+                else:
+                    print(analise.consultar(consulta).to_string(index=False, max_rows=args.limite))
+            except Exception as e:
+                if args.consulta or not sys.stdin.isatty():
+                    raise
+                informar(f"Erro: {e}")
+    return SAIDA_SUCESSO
+
+
+def _ler_consultas_interativas():
+    """Consultas digitadas no terminal, terminadas por ';' (Ctrl+D para sair)."""
+    linhas = []
+    while True:
+        try:
+            linha = input("sql> " if not linhas else "...> ")
+        except EOFError:
+            return
+        linhas.append(linha)
+        if linha.rstrip().endswith(";"):
+            yield "\n".join(linhas)
+            linhas = []
+
+
+def comando_comparar(args):
+    from comparacao import comparar_backups, resumo_comparacao, COLUNAS_DIFERENCAS
+
+    destino = open(args.saida, "wb") if args.saida else None
+    try:
+        if destino:
+            destino.write(codificar_lote_csv([], COLUNAS_DIFERENCAS, cabecalho=True))
+
+        def gravar_diferencas(diferencas):
+            destino.write(diferencas.to_csv(index=False, header=False, **FORMATO_CSV).encode("utf-8"))
+
+        resultado = comparar_backups(
+            args.antes, args.depois,
+            ao_diferencas=gravar_diferencas if destino else None,
+            ao_concluir_tabela=lambda tabela, r: informar(
+                f"{tabela}: {r['inseridos']} inseridos, {r['removidos']} removidos, {r['alterados']} alterados"
+            ),
+        )
+    finally:
+        if destino:
+            destino.close()
+
+    print(pd.DataFrame(resumo_comparacao(resultado)).to_string(index=False))
+    for tabela, r in resultado.items():
+        if r["colunas_novas"] or r["colunas_removidas"]:
+            informar(f"{tabela}: colunas novas {r['colunas_novas']}, removidas {r['colunas_removidas']}")
+    return SAIDA_SUCESSO
+
+
+# --- Argumentos ---
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="officeflow", description="Backup, restauração, importação e exportação.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    backup = comandos.add_parser("backup", help="Gera um backup completo ou diferencial")
+    backup.add_argument("destino", help="Caminho do .zip a gerar")
+    backup.add_argument("--formato", choices=list(FORMATOS), default=FORMATO_PADRAO)
+    backup.add_argument("--diferencial", metavar="ANTERIOR", help="Backup anterior da cadeia (gera um diferencial)")
+    backup.add_argument("--repositorio", action="store_true", help="Guarda também no repositório local")
+    backup.set_defaults(funcao=comando_backup)
+
+    restaurar = comandos.add_parser("restaurar", help="Restaura um backup (ou uma cadeia de diferenciais)")
+    restaurar.add_argument("arquivos", nargs="+", help="Backup completo e, se houver, os diferenciais")
+    restaurar.add_argument("--limpar", action="store_true", help="Limpa as tabelas antes de restaurar")
+    restaurar.add_argument("--recomecar", action="store_true", help="Ignora o progresso salvo")
+    restaurar.add_argument("--delta", action="store_true", help="Grava só as linhas novas ou alteradas")
+    restaurar.add_argument("--remover-ausentes", action="store_true", help="Delta: remove o que não está no backup")
+    restaurar.add_argument("--simular", action="store_true", help="Delta: só mostra o resumo, sem gravar")
+    restaurar.set_defaults(funcao=comando_restaurar)
+
+    verificar = comandos.add_parser("verificar", help="Confere os arquivos contra o manifesto")
+    verificar.add_argument("arquivos", nargs="+")
+    verificar.set_defaults(funcao=comando_verificar)
+
+    exportar = comandos.add_parser("exportar", help="Exporta uma tabela")
+    exportar.add_argument("tabela", choices=TABELAS)
+    exportar.add_argument("destino", help="Arquivo de saída ou '-' para a saída padrão")
+    exportar.add_argument("--formato", choices=list(FORMATOS), default=FORMATO_PADRAO)
+    exportar.add_argument("--colunas", default="*", help="Colunas separadas por vírgula")
+    exportar.set_defaults(funcao=comando_exportar)
+
+    importar = comandos.add_parser("importar", help="Importa um CSV (padrão do Excel: ';' e ',' decimal)")
+    importar.add_argument("tabela", choices=TABELAS)
+    importar.add_argument("origem", help="Arquivo CSV ou '-' para a entrada padrão")
+    importar.add_argument("--codificacao", help="Padrão: detectada no arquivo (utf-8-sig na entrada padrão)")
+    importar.add_argument("--separador", help="Padrão: detectado no cabeçalho (';' na entrada padrão)")
+    importar.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_RESTAURACAO)
+    importar.add_argument("--sobrescrever", action="store_true", help="Atualiza registros com o mesmo ID (upsert)")
+    importar.add_argument("--somente-validas", action="store_true", help="Importa as linhas aprovadas na validação")
+    importar.add_argument("--relatorio", help="CSV com os erros de validação por linha")
+    importar.set_defaults(funcao=comando_importar)
+
+    relatorio = comandos.add_parser("relatorio", help="Inventário de ativos com os nomes no lugar dos IDs")
+    relatorio.add_argument("destino", help="Arquivo de saída ou '-' para a saída padrão")
+    relatorio.add_argument("--formato", choices=list(FORMATOS), default=FORMATO_PADRAO)
+    relatorio.set_defaults(funcao=comando_relatorio)
+
+    sql = comandos.add_parser("sql", help="Consultas SQL (DuckDB) sobre backups, sem acessar o banco")
+    sql.add_argument("arquivos", nargs="+", help="Backups; com mais de um, use b1.tabela, b2.tabela ou historico.tabela")
+    sql.add_argument("-e", "--consulta", help="Consulta a executar (sem ela, lê da entrada padrão)")
+    sql.add_argument("--saida", help="Grava o resultado em .csv (Excel) ou .parquet em vez de exibir")
+    sql.add_argument("--limite", type=int, default=100, help="Linhas exibidas no terminal")
+    sql.set_defaults(funcao=comando_sql)
+
+    comparar = comandos.add_parser("comparar", help="Diferenças entre dois backups completos, por id")
+    comparar.add_argument("antes", help="Backup mais antigo")
+    comparar.add_argument("depois", help="Backup mais recente")
+    comparar.add_argument("--saida", help="CSV com cada linha inserida, removida e coluna alterada")
+    comparar.set_defaults(funcao=comando_comparar)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    try:
+        return args.funcao(args)
+    except KeyboardInterrupt:
+        informar("Interrompido. Restaurações podem ser retomadas repetindo o comando.")
+        return SAIDA_FALHA
+    except Exception as e:
+        informar(f"Erro: {e}")
+        return SAIDA_FALHA
+
+
+if __name__ == "__main__":
+    sys.exit(main())
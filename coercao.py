@@ -0,0 +1,179 @@
+import time
+import numpy as np
+import pandas as pd
+from esquema import tipos_da_tabela
+
+# --- Tipos do Pandas por Tipo de Coluna ---
+# Tipos anuláveis: nulos viram pd.NA sem transformar a coluna em 'object'
+DTYPES = {
+    "inteiro": "Int64",
+    "decimal": "Float64",
+    "texto": "string",
+    "data": "string",
+    "data_hora": "string",
+    "booleano": "boolean",
+}
+
+VALORES_VERDADEIROS = {"true", "t", "1", "sim", "s", "verdadeiro"}
+VALORES_FALSOS = {"false", "f", "0", "nao", "não", "n", "falso"}
+
+TIPOS_TEXTUAIS = {"texto", "data", "data_hora"}
+
+
+def dtypes_leitura(tabela):
+    """Mapa coluna -> dtype para o `pd.read_csv` das colunas de texto da tabela.
+
+    Lidas como texto desde o início (sem perder zeros à esquerda de seriais, por exemplo);
+    as numéricas ficam com a inferência do leitor e são ajustadas por `coagir_tipos`.
+    """
+    return {coluna: DTYPES[tipo] for coluna, tipo in tipos_da_tabela(tabela).items() if tipo in TIPOS_TEXTUAIS}
+
+
+# --- Conversão por Coluna ---
+def _numerico(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    # Texto vindo de planilha: aceita vírgula como separador decimal
+    texto = serie.astype("string").str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto.replace("", pd.NA), errors="raise")
+
+
+def _inteiro(serie):
+    valores = _numerico(serie)
+    if pd.api.types.is_float_dtype(valores):
+        validos = valores.dropna()
+        if not (np.mod(validos.to_numpy(dtype="float64"), 1) == 0).all():
+            raise ValueError("contém valores com casas decimais")
+    return valores.astype("Int64")
+
+
+def _booleano(serie):
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.astype("boolean")
+    texto = serie.astype("string").str.strip().str.lower()
+    resultado = pd.Series(pd.NA, index=serie.index, dtype="boolean")
+    resultado[texto.isin(VALORES_VERDADEIROS).fillna(False)] = True
+    resultado[texto.isin(VALORES_FALSOS).fillna(False)] = False
+    return resultado
+
+
+def _data(serie, formato):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.strftime(formato).astype("string")
+    return serie.astype("string")
+
+
+CONVERSORES = {
+    "inteiro": _inteiro,
+    "decimal": lambda serie: _numerico(serie).astype("Float64"),
+    "texto": lambda serie: serie.astype("string"),
+    "data": lambda serie: _data(serie, "%Y-%m-%d"),
+    "data_hora": lambda serie: _data(serie, "%Y-%m-%dT%H:%M:%S%z"),
+    "booleano": _booleano,
+}
+
+
+def _inferir_inteiro(serie):
+    """Colunas fora do esquema: float com todos os valores inteiros vira Int64."""
+    if not pd.api.types.is_float_dtype(serie):
+        return serie
+    validos = serie.dropna().to_numpy(dtype="float64")
+    if (np.mod(validos, 1) == 0).all():
+        return serie.astype("Int64")
+    return serie
+
+
+def coagir_tipos(df, tabela):
+    """Converte as colunas do DataFrame para os tipos declarados da tabela.
+
+    Operações vetorizadas (NumPy/pandas) com tipos anuláveis; colunas fora do esquema
+    só têm inteiros corrigidos. Lança ValueError indicando a coluna inválida.
+    """
+    tipos = tipos_da_tabela(tabela)
+    colunas = {}
+    for coluna in df.columns:
+        tipo = tipos.get(coluna)
+        try:
+            if tipo:
+                colunas[coluna] = CONVERSORES[tipo](df[coluna])
+            else:
+                colunas[coluna] = _inferir_inteiro(df[coluna])
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Coluna '{coluna}' ({tipo or 'sem tipo'}): {e}") from e
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def _valores_coluna(serie):
+    """Valores Python nativos da coluna, com None nos nulos."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        serie = serie.dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.to_numpy(dtype=object, na_value=None).tolist()
+    if pd.api.types.is_integer_dtype(serie):
+        valores = serie.to_numpy(dtype="int64", na_value=0).tolist()
+    elif pd.api.types.is_float_dtype(serie):
+        valores = serie.to_numpy(dtype="float64", na_value=0).tolist()
+    else:
+        return serie.to_numpy(dtype=object, na_value=None).tolist()
+
+    # Numéricos: conversão em bloco pelo NumPy e só as posições nulas trocadas por None
+    for posicao in np.flatnonzero(serie.isna().to_numpy()).tolist():
+        valores[posicao] = None
+    return valores
+
+
+def para_registros(df):
+    """Lista de dicionários pronta para o JSON do PostgREST (nulos como None).
+
+    Converte coluna a coluna, sem passar o DataFrame inteiro para 'object'.
+    """
+    colunas = [str(coluna) for coluna in df.columns]
+    valores = [_valores_coluna(df[coluna]) for coluna in df.columns]
+    return [dict(zip(colunas, linha)) for linha in zip(*valores)]
+
+
+def preparar_registros(df, tabela):
+    return para_registros(coagir_tipos(df, tabela))
+
+
+# --- Comparação de Desempenho ---
+def _abordagem_anterior(df):
+    # Conversão usada antes na restauração/importação (uma chamada Python por célula)
+    for col in df.select_dtypes(include=['float']).columns:
+        is_integer = df[col].dropna().apply(lambda x: x.is_integer()).all()
+        if is_integer:
+            df[col] = df[col].astype('Int64')
+    df = df.astype(object)
+    df = df.where(pd.notnull(df), None)
+    return df.to_dict(orient='records')
+
+
+def comparar_desempenho(linhas=100_000, repeticoes=3):
+    """Mede a conversão anterior e a vetorizada numa tabela 'ativos' sintética."""
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "id": np.arange(1, linhas + 1, dtype="float64"),
+        "serial": [f"SN-{i:08d}" for i in range(linhas)],
+        "valor": np.round(rng.uniform(100, 10_000, linhas), 2),
+        "modelo_id": rng.integers(1, 200, linhas).astype("float64"),
+        "usuario_id": np.where(rng.random(linhas) < 0.3, np.nan, rng.integers(1, 500, linhas)),
+        "local_id": rng.integers(1, 30, linhas).astype("float64"),
+        "status_id": rng.integers(1, 6, linhas).astype("float64"),
+        "estado_id": rng.integers(1, 4, linhas).astype("float64"),
+        "compra_id": np.where(rng.random(linhas) < 0.5, np.nan, rng.integers(1, 1000, linhas)),
+    })
+
+    resultados = {}
+    for nome, funcao in [("anterior", _abordagem_anterior), ("vetorizada", lambda d: preparar_registros(d, "ativos"))]:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao(df.copy())
+            tempos.append(time.perf_counter() - inicio)
+        resultados[nome] = min(tempos)
+    return resultados
+
+
+if __name__ == "__main__":
+    for nome, segundos in comparar_desempenho().items():
+        print(f"{nome:>10}: {segundos:.3f} s")
@@ -0,0 +1,172 @@
+import zipfile
+import numpy as np
+import pandas as pd
+from esquema import ordem_topologica
+from motor_backup import ler_manifesto
+from motor_restauracao import arquivo_da_tabela, colunas_do_arquivo, ler_dataframes_em_lotes, normalizar_linhas
+
+# --- Comparação entre Backups ---
+# Os arquivos das tabelas saem ordenados por id (a exportação lê em ordem de chave), então
+# as duas versões são percorridas juntas, lote a lote, como num merge join: a memória usada
+# por tabela fica limitada a um lote de cada lado, qualquer que seja o tamanho da tabela.
+TAMANHO_LOTE_COMPARACAO = 50_000
+
+COLUNAS_DIFERENCAS = ["tabela", "id", "tipo", "coluna", "antes", "depois"]
+
+
+def _lotes_ordenados(z, nome_arquivo, tabela, colunas, tamanho_lote):
+    """Lotes normalizados e indexados pelo id, conferindo a ordem crescente entre os lotes."""
+    if nome_arquivo is None:
+        return
+    ultimo = None
+    for df in ler_dataframes_em_lotes(z, nome_arquivo, tabela, tamanho_lote):
+        df = normalizar_linhas(df, tabela)
+        ids = df["id"].to_numpy(dtype="int64")
+        if len(ids) and ((ultimo is not None and ids[0] <= ultimo) or (np.diff(ids) <= 0).any()):
+            raise ValueError(f"'{nome_arquivo}' não está ordenado por id; a comparação exige arquivos gerados pelo backup.")
+        if len(ids):
+            ultimo = ids[-1]
+        yield df.set_index(pd.Index(ids, name="id"))[colunas]
+
+
+class _Fluxo:
+    """Lotes de um lado da comparação, consumidos até um id limite."""
+
+    def __init__(self, lotes, colunas):
+        self._lotes = lotes
+        self._colunas = colunas
+        self.buffer = None
+        self.fim = False
+
+    def abastecer(self):
+        while not self.fim and (self.buffer is None or self.buffer.empty):
+            self.buffer = next(self._lotes, None)
+            if self.buffer is None:
+                self.fim = True
+
+    def limite(self):
+        """Maior id que já pode ser decidido: tudo até ele deste lado já foi lido."""
+        if self.fim or self.buffer is None or self.buffer.empty:
+            return np.inf
+        return self.buffer.index[-1]
+
+    def retirar(self, limite):
+        if self.buffer is None or self.buffer.empty:
+            return pd.DataFrame(columns=self._colunas, index=pd.Index([], dtype="int64", name="id"))
+        corte = self.buffer.index.searchsorted(limite, side="right")
+        parte, self.buffer = self.buffer.iloc[:corte], self.buffer.iloc[corte:]
+        return parte
+
+
+def _como_texto(serie):
+    return serie.astype("string").astype(object).where(serie.notna(), None)
+
+
+def _comparar_parte(tabela, antes, depois, comuns, resumo):
+    """Compara as linhas de um mesmo intervalo de ids. Retorna o DataFrame de diferenças."""
+    removidos = antes.index.difference(depois.index)
+    inseridos = depois.index.difference(antes.index)
+    ids_comuns = antes.index.intersection(depois.index)
+
+    a = antes.loc[ids_comuns, comuns]
+    b = depois.loc[ids_comuns, comuns]
+    # Hash por linha primeiro: só as linhas alteradas são comparadas coluna a coluna
+    alterada = (
+        pd.util.hash_pandas_object(a, index=False).to_numpy()
+        != pd.util.hash_pandas_object(b, index=False).to_numpy()
+    )
+    a, b = a[alterada], b[alterada]
+
+    resumo["inseridos"] += len(inseridos)
+    resumo["removidos"] += len(removidos)
+    resumo["alterados"] += int(alterada.sum())
+    resumo["iguais"] += int(len(ids_comuns) - alterada.sum())
+
+    partes = [
+        pd.DataFrame({"id": inseridos, "tipo": "inserido"}),
+        pd.DataFrame({"id": removidos, "tipo": "removido"}),
+    ]
+    for coluna in comuns:
+        va, vb = a[coluna], b[coluna]
+        iguais = (va == vb).fillna(False).to_numpy(dtype=bool) | (va.isna() & vb.isna()).to_numpy()
+        if iguais.all():
+            continue
+        mudou = ~iguais
+        resumo["colunas"][coluna] = resumo["colunas"].get(coluna, 0) + int(mudou.sum())
+        partes.append(pd.DataFrame({
+            "id": a.index[mudou],
+            "tipo": "alterado",
+            "coluna": coluna,
+            "antes": _como_texto(va[mudou]).to_numpy(),
+            "depois": _como_texto(vb[mudou]).to_numpy(),
+        }))
+
+    diferencas = pd.concat(partes, ignore_index=True).reindex(columns=COLUNAS_DIFERENCAS)
+    diferencas["tabela"] = tabela
+    return diferencas
+
+
+def comparar_tabela(z_antes, z_depois, tabela, tamanho_lote=TAMANHO_LOTE_COMPARACAO, ao_diferencas=None):
+    """Compara a tabela nos dois backups (ZipFiles abertos) em memória constante.
+
+    `ao_diferencas(df)` recebe, a cada lote, as linhas inseridas, removidas e as colunas
+    alteradas (colunas `COLUNAS_DIFERENCAS`). Retorna as contagens da tabela.
+    """
+    arquivo_antes = arquivo_da_tabela(z_antes.namelist(), tabela)
+    arquivo_depois = arquivo_da_tabela(z_depois.namelist(), tabela)
+    colunas_antes = colunas_do_arquivo(z_antes, arquivo_antes) if arquivo_antes else []
+    colunas_depois = colunas_do_arquivo(z_depois, arquivo_depois) if arquivo_depois else []
+    comuns = [coluna for coluna in colunas_depois if coluna in colunas_antes and coluna != "id"]
+
+    resumo = {
+        "inseridos": 0, "removidos": 0, "alterados": 0, "iguais": 0, "colunas": {},
+        "colunas_novas": [c for c in colunas_depois if c not in colunas_antes] if arquivo_antes else [],
+        "colunas_removidas": [c for c in colunas_antes if c not in colunas_depois] if arquivo_depois else [],
+    }
+    antes = _Fluxo(_lotes_ordenados(z_antes, arquivo_antes, tabela, colunas_antes, tamanho_lote), colunas_antes)
+    depois = _Fluxo(_lotes_ordenados(z_depois, arquivo_depois, tabela, colunas_depois, tamanho_lote), colunas_depois)
+
+    while True:
+        antes.abastecer()
+        depois.abastecer()
+        # Com os dois lados no fim, o limite é infinito e o restante sai nesta volta
+        limite = min(antes.limite(), depois.limite())
+        diferencas = _comparar_parte(tabela, antes.retirar(limite), depois.retirar(limite), comuns, resumo)
+        if ao_diferencas and not diferencas.empty:
+            ao_diferencas(diferencas)
+        if antes.fim and depois.fim:
+            return resumo
+
+
+def comparar_backups(arquivo_antes, arquivo_depois, tabelas=None, tamanho_lote=TAMANHO_LOTE_COMPARACAO,
+                     ao_diferencas=None, ao_concluir_tabela=None):
+    """Compara dois backups completos (caminhos ou arquivos binários), tabela a tabela.
+
+    Retorna {tabela: contagens}; os detalhes seguem para `ao_diferencas(df)` em lotes,
+    e `ao_concluir_tabela(tabela, contagens)` é chamado ao fim de cada tabela.
+    """
+    with zipfile.ZipFile(arquivo_antes) as z_antes, zipfile.ZipFile(arquivo_depois) as z_depois:
+        for z in (z_antes, z_depois):
+            manifesto = ler_manifesto(z)
+            if manifesto and manifesto["tipo"] != "completo":
+                raise ValueError("A comparação exige dois backups completos.")
+
+        presentes = set(z_antes.namelist()) | set(z_depois.namelist())
+        resultado = {}
+        for tabela in ordem_topologica(tabelas):
+            if not arquivo_da_tabela(presentes, tabela):
+                continue
+            resultado[tabela] = comparar_tabela(z_antes, z_depois, tabela, tamanho_lote, ao_diferencas)
+            if ao_concluir_tabela:
+                ao_concluir_tabela(tabela, resultado[tabela])
+        return resultado
+
+
+def resumo_comparacao(resultado):
+    """Contagens em linhas prontas para um DataFrame."""
+    return [
+        {"Tabela": tabela, "Inseridos": r["inseridos"], "Removidos": r["removidos"],
+         "Alterados": r["alterados"], "Iguais": r["iguais"],
+         "Colunas alteradas": ", ".join(f"{coluna} ({n})" for coluna, n in r["colunas"].items())}
+        for tabela, r in resultado.items()
+    ]
@@ -0,0 +1,57 @@
+import streamlit as st
+from coercao import preparar_registros
+from dados import ids_existentes
+from motor_restauracao import enviar_lote
+
+# --- Grade Editável ---
+# Opções comuns das grades de edição: linhas fixas (só edição), sem índice, largura total
+OPCOES_GRADE = {"num_rows": "fixed", "hide_index": True, "width": "stretch"}
+
+
+def linhas_alteradas(original, editado, colunas=None):
+    """Máscara das linhas do `editado` que diferem do `original` (mesmas posições).
+
+    Compara as grades inteiras de uma vez, sem percorrer linha a linha; nulos dos dois lados
+    contam como iguais. `colunas` limita a comparação (padrão: todas as do `editado`).
+    """
+    colunas = list(colunas or editado.columns)
+    # Em 'object' a comparação não depende do dtype de cada lado (ex: int64 x Int64, object x string)
+    antes = original[colunas].astype(object).reset_index(drop=True)
+    depois = editado[colunas].astype(object).reset_index(drop=True)
+    diferente = antes.ne(depois) & ~(antes.isna() & depois.isna())
+    return diferente.any(axis=1).to_numpy()
+
+
+def grade_editavel(df, key=None, **opcoes):
+    """`st.data_editor` de linhas fixas. Retorna (editado, alteradas), com só as linhas modificadas.
+
+    Sem `key`, as edições são descartadas quando os dados mudam (ex: outra página da lista).
+    """
+    editado = st.data_editor(df, key=key, **{**OPCOES_GRADE, **opcoes})
+    return editado, editado[linhas_alteradas(df, editado)]
+
+
+def salvar_alteracoes(client, tabela, registros):
+    """Grava as linhas alteradas num único upsert por `id` e exibe as que falharem.
+
+    `registros` é um DataFrame já nas colunas da tabela (nomes traduzidos para IDs); os tipos
+    são ajustados por `preparar_registros`. Antes do envio, os IDs são conferidos no banco:
+    linhas removidas por outra sessão enquanto a grade estava aberta são informadas em vez
+    de recriadas. Se o upsert falhar, o lote é dividido até isolar as linhas com erro
+    (ver `enviar_lote`). Retorna o número de registros salvos.
+    """
+    if registros.empty:
+        return 0
+    removidos = ~registros["id"].isin(ids_existentes(client, tabela, registros["id"].tolist()))
+    for item_id in registros.loc[removidos, "id"]:
+        st.error(f"ID {item_id}: registro removido por outra sessão; a alteração não foi salva.")
+    registros = registros[~removidos]
+    if registros.empty:
+        return 0
+
+    salvos, falhas = enviar_lote(
+        client, tabela, preparar_registros(registros, tabela), 0, linhas=registros["id"].tolist()
+    )
+    for item_id, erro in falhas:
+        st.error(f"Erro no ID {item_id}: {erro}")
+    return salvos
@@ -0,0 +1,228 @@
+import threading
+import time
+import streamlit as st
+from utils import init_connection
+
+# --- Tabelas de Referência ---
+# Consulta usada para cada tabela auxiliar (modelos já trazem o nome da marca)
+CONSULTAS_REFERENCIA = {
+    "marcas": "id, nome",
+    "modelos": "id, nome, categoria_id, marca_id, marcas(nome)",
+    "categorias": "id, nome",
+    "setores": "id, nome",
+    "status": "id, nome",
+    "estados": "id, nome",
+    "lojas": "id, nome",
+    "colaboradores": "id, nome, email, setor_id",
+}
+
+# Tempo máximo (em segundos) antes de revalidar uma tabela.
+# Cobre alterações feitas fora deste processo (outro servidor, SQL direto).
+TTL_REFERENCIA = 300
+
+
+def rotulo_modelo(modelo, sem_marca="S/M"):
+    """Nome de exibição de um modelo: 'Marca - Modelo'."""
+    marca = (modelo.get("marcas") or {}).get("nome", sem_marca)
+    return f"{marca} - {modelo['nome']}"
+
+
+class Referencia:
+    """Registros de uma tabela auxiliar com os mapas id -> nome e nome -> id já montados."""
+
+    def __init__(self, tabela, registros):
+        self.tabela = tabela
+        self.registros = registros
+
+        if tabela == "modelos":
+            nomes = [rotulo_modelo(r) for r in registros]
+        else:
+            nomes = [r["nome"] for r in registros]
+
+        self.por_id = {r["id"]: nome for r, nome in zip(registros, nomes)}
+        self.por_nome = {nome: r["id"] for r, nome in zip(registros, nomes)}
+
+    def nomes(self):
+        return list(self.por_nome.keys())
+
+
+class RepositorioReferencias:
+    """Cache de processo das tabelas auxiliares, renovado por tabela conforme a versão dos dados."""
+
+    def __init__(self, client, ttl=TTL_REFERENCIA):
+        self._client = client
+        self._ttl = ttl
+        self._versoes = {tabela: 0 for tabela in CONSULTAS_REFERENCIA}
+        self._cache = {}
+        self._locks = {tabela: threading.Lock() for tabela in CONSULTAS_REFERENCIA}
+        self._lock_versoes = threading.Lock()
+
+    def versao(self, tabela):
+        return self._versoes[tabela]
+
+    def invalidar(self, *tabelas):
+        """Incrementa a versão das tabelas alteradas (todas, se nenhuma for informada)."""
+        with self._lock_versoes:
+            for tabela in tabelas or CONSULTAS_REFERENCIA:
+                self._versoes[tabela] += 1
+
+    def _valida(self, tabela, entrada):
+        if entrada is None:
+            return False
+        versao, carregado_em, _ = entrada
+        return versao == self._versoes[tabela] and time.monotonic() - carregado_em < self._ttl
+
+    def obter(self, tabela):
+        entrada = self._cache.get(tabela)
+        if self._valida(tabela, entrada):
+            return entrada[2]
+
+        # Apenas uma sessão recarrega a tabela; as demais aguardam e reaproveitam o resultado
+        with self._locks[tabela]:
+            entrada = self._cache.get(tabela)
+            if self._valida(tabela, entrada):
+                return entrada[2]
+
+            versao = self._versoes[tabela]
+            registros = (
+                self._client.table(tabela)
+                .select(CONSULTAS_REFERENCIA[tabela])
+                .order("nome")
+                .execute()
+                .data
+            )
+            referencia = Referencia(tabela, registros)
+            self._cache[tabela] = (versao, time.monotonic(), referencia)
+            return referencia
+
+
+@st.cache_resource()
+def repositorio_referencias():
+    return RepositorioReferencias(init_connection())
+
+
+def carregar_referencia(tabela):
+    return repositorio_referencias().obter(tabela)
+
+
+def carregar_referencias(*tabelas):
+    repositorio = repositorio_referencias()
+    return [repositorio.obter(tabela) for tabela in tabelas]
+
+
+def invalidar_referencias(*tabelas):
+    repositorio_referencias().invalidar(*tabelas)
+
+
+def aplicar_filtros(consulta, filtros):
+    """Aplica filtros de igualdade; None vira 'IS NULL'.
+
+    Outros operadores são passados como tupla (ex: {"id": ("gt", 100)}).
+    Filtros em recursos embutidos usam a notação 'tabela.coluna' (ex: 'modelos.categoria_id').
+    Vários filtros na mesma coluna vão numa lista de pares (ex: [("id", ("gt", 1)), ("id", ("lt", 9))]).
+    """
+    for coluna, valor in (filtros.items() if isinstance(filtros, dict) else filtros or []):
+        if isinstance(valor, tuple):
+            operador, valor = valor
+            consulta = getattr(consulta, operador)(coluna, valor)
+        elif valor is None:
+            consulta = consulta.is_(coluna, "null")
+        else:
+            consulta = consulta.eq(coluna, valor)
+    return consulta
+
+
+# --- Paginação por Chave (Keyset) ---
+def buscar_pagina(client, tabela, colunas="*", filtros=None, apos=None, tamanho=50, chave="id"):
+    """Busca a página seguinte ao registro `apos`, ordenada pela chave.
+
+    Retorna (registros, restantes): `restantes` é a contagem exata de registros que
+    atendem aos filtros a partir do cursor, obtida na mesma requisição.
+    """
+    consulta = aplicar_filtros(client.table(tabela).select(colunas, count="exact"), filtros)
+    if apos is not None:
+        consulta = consulta.gt(chave, apos)
+
+    resposta = consulta.order(chave).limit(tamanho).execute()
+    return resposta.data, resposta.count or 0
+
+
+# --- Leitura em Lotes (Range) ---
+# Igual ao 'max-rows' padrão do PostgREST: lotes maiores seriam cortados pelo servidor
+TAMANHO_LOTE_LEITURA = 1000
+
+
+def ler_tabela_em_lotes(
+    client, tabela, colunas="*", filtros=None, tamanho_lote=TAMANHO_LOTE_LEITURA, ordem="id", ou=None
+):
+    """Percorre a tabela inteira em lotes de `.range()` ordenados pela chave primária.
+
+    Gera uma lista de registros por lote, sem nunca montar a resposta completa.
+    `ou` recebe uma condição OR no formato do PostgREST (ex: "id.gt.10,created_at.gt.2024-01-01").
+    """
+    inicio = 0
+    while True:
+        consulta = aplicar_filtros(client.table(tabela).select(colunas), filtros)
+        if ou:
+            consulta = consulta.or_(ou)
+        lote = consulta.order(ordem).range(inicio, inicio + tamanho_lote - 1).execute().data
+
+        if not lote:
+            return
+
+        yield lote
+        inicio += len(lote)
+
+        if len(lote) < tamanho_lote:
+            # Lote menor que o pedido: fim da tabela ou limite de linhas do servidor.
+            # Ajusta o tamanho e confirma com mais uma leitura em vez de truncar.
+            tamanho_lote = len(lote)
+
+
+def ler_tabela(client, tabela, colunas="*", filtros=None, tamanho_lote=TAMANHO_LOTE_LEITURA, ordem="id"):
+    """Lista completa de registros, lida em lotes (não sofre o corte de linhas do PostgREST)."""
+    registros = []
+    for lote in ler_tabela_em_lotes(client, tabela, colunas, filtros, tamanho_lote, ordem):
+        registros.extend(lote)
+    return registros
+
+
+
+# IDs por consulta 'in' (limite prático do tamanho da URL)
+TAMANHO_CONSULTA_IDS = 500
+
+
+def ids_existentes(client, tabela, ids):
+    """Conjunto dos `ids` que existem na tabela, consultados em lotes com 'in'."""
+    ids = sorted(ids)
+    existentes = set()
+    for inicio in range(0, len(ids), TAMANHO_CONSULTA_IDS):
+        lote = ids[inicio:inicio + TAMANHO_CONSULTA_IDS]
+        for registros in ler_tabela_em_lotes(client, tabela, "id", filtros={"id": ("in_", lote)}):
+            existentes.update(registro["id"] for registro in registros)
+    return existentes
+
+
+# --- Movimentação em Lote ---
+# Função do banco que grava histórico e ativos numa única transação (ver sql/movimentar_ativos.sql)
+FUNCAO_MOVIMENTACAO = "movimentar_ativos"
+FUNCAO_INEXISTENTE = "PGRST202"  # Código do PostgREST para função não encontrada no esquema
+
+
+def movimentar_ativos(client, movimentos, observacao=None):
+    """Registra as movimentações e atualiza os ativos numa única chamada ao banco.
+
+    `movimentos` é uma lista de dicionários com ativo_id, usuario_id, setor_id e status_id.
+    Tudo ou nada: qualquer erro desfaz o lote inteiro. Retorna {ativo_id: movimentacao_id}.
+    Lança RuntimeError se a função ainda não foi instalada no banco (nada é gravado).
+    """
+    try:
+        resposta = client.rpc(FUNCAO_MOVIMENTACAO, {"movimentos": movimentos, "observacao": observacao}).execute()
+    except Exception as e:
+        if getattr(e, "code", None) == FUNCAO_INEXISTENTE:
+            raise RuntimeError(
+                f"Função '{FUNCAO_MOVIMENTACAO}' não encontrada no banco. Execute o arquivo "
+                "sql/movimentar_ativos.sql no SQL Editor do Supabase para habilitar a movimentação em lote."
+            ) from e
+        raise
+    return {registro["ativo_id"]: registro["movimentacao_id"] for registro in resposta.data}
@@ -0,0 +1,137 @@
+# --- Esquema do Banco ---
+# Incrementar ao alterar tabelas ou colunas: fica registrada no manifesto de cada backup
+VERSAO_ESQUEMA = 1
+
+# Tipo de cada coluna por tabela, usado na conversão de tipos do backup e da importação.
+# Tipos: "inteiro", "decimal", "texto", "data", "data_hora", "booleano".
+TIPOS_COLUNAS = {
+    "marcas": {"id": "inteiro", "nome": "texto"},
+    "categorias": {"id": "inteiro", "nome": "texto"},
+    "setores": {"id": "inteiro", "nome": "texto"},
+    "status": {"id": "inteiro", "nome": "texto"},
+    "estados": {"id": "inteiro", "nome": "texto"},
+    "lojas": {"id": "inteiro", "nome": "texto"},
+    "modelos": {
+        "id": "inteiro",
+        "nome": "texto",
+        "marca_id": "inteiro",
+        "categoria_id": "inteiro",
+    },
+    "colaboradores": {
+        "id": "inteiro",
+        "nome": "texto",
+        "email": "texto",
+        "setor_id": "inteiro",
+    },
+    "compras": {
+        "id": "inteiro",
+        "data_compra": "data",
+        "nota_fiscal": "texto",
+        "loja_id": "inteiro",
+        "comprador_id": "inteiro",
+        "valor_total": "decimal",
+        "nf_url": "texto",
+    },
+    "ativos": {
+        "id": "inteiro",
+        "serial": "texto",
+        "valor": "decimal",
+        "modelo_id": "inteiro",
+        "usuario_id": "inteiro",
+        "local_id": "inteiro",
+        "status_id": "inteiro",
+        "estado_id": "inteiro",
+        "compra_id": "inteiro",
+    },
+    "movimentacoes": {
+        "id": "inteiro",
+        "created_at": "data_hora",
+        "ativo_id": "inteiro",
+        "usuario_id": "inteiro",
+        "setor_id": "inteiro",
+        "status_id": "inteiro",
+        "observacao": "texto",
+    },
+    "manutencoes": {
+        "id": "inteiro",
+        "ativo_id": "inteiro",
+        "fornecedor": "texto",
+        "defeito": "texto",
+        "criado_em": "data",
+        "retornado_em": "data",
+        "valor": "decimal",
+    },
+    "capas_peliculas": {
+        "id": "inteiro",
+        "modelo": "texto",
+        "qnt_capas": "inteiro",
+        "qnt_peliculas": "inteiro",
+    },
+    "user_sistema": {
+        "id": "inteiro",
+        "nome": "texto",
+        "email": "texto",
+        "senha_hash": "texto",
+    },
+}
+
+
+def tipos_da_tabela(tabela):
+    return TIPOS_COLUNAS.get(tabela, {})
+
+
+# --- Chaves Estrangeiras ---
+# coluna -> tabela referenciada; define a ordem de restauração e de limpeza
+CHAVES_ESTRANGEIRAS = {
+    "modelos": {"marca_id": "marcas", "categoria_id": "categorias"},
+    "colaboradores": {"setor_id": "setores"},
+    "compras": {"loja_id": "lojas", "comprador_id": "colaboradores"},
+    "ativos": {
+        "modelo_id": "modelos",
+        "usuario_id": "colaboradores",
+        "local_id": "setores",
+        "status_id": "status",
+        "estado_id": "estados",
+        "compra_id": "compras",
+    },
+    "movimentacoes": {
+        "ativo_id": "ativos",
+        "usuario_id": "colaboradores",
+        "setor_id": "setores",
+        "status_id": "status",
+    },
+    "manutencoes": {"ativo_id": "ativos"},
+}
+
+TABELAS = list(TIPOS_COLUNAS)
+
+
+def dependencias(tabela):
+    """Tabelas referenciadas por `tabela` (exceto ela mesma)."""
+    return {destino for destino in CHAVES_ESTRANGEIRAS.get(tabela, {}).values() if destino != tabela}
+
+
+def niveis_dependencia(tabelas=None):
+    """Agrupa as tabelas em níveis: cada nível só depende dos anteriores.
+
+    Tabelas do mesmo nível são independentes entre si e podem ser restauradas ao mesmo tempo.
+    Dependências fora de `tabelas` são ignoradas. Lança ValueError se houver ciclo.
+    """
+    tabelas = list(tabelas or TABELAS)
+    pendentes = {tabela: dependencias(tabela) & set(tabelas) for tabela in tabelas}
+    niveis = []
+    while pendentes:
+        nivel = [tabela for tabela in tabelas if tabela in pendentes and not pendentes[tabela]]
+        if not nivel:
+            raise ValueError(f"Dependência circular entre as tabelas: {', '.join(pendentes)}")
+        niveis.append(nivel)
+        for tabela in nivel:
+            del pendentes[tabela]
+        for restantes in pendentes.values():
+            restantes.difference_update(nivel)
+    return niveis
+
+
+def ordem_topologica(tabelas=None):
+    """Tabelas em ordem de inserção (referenciadas antes das que as referenciam)."""
+    return [tabela for nivel in niveis_dependencia(tabelas) for tabela in nivel]
@@ -0,0 +1,143 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dados import ler_tabela_em_lotes, TAMANHO_LOTE_LEITURA
+from esquema import tipos_da_tabela
+from formato_parquet import codificar_lote_arrow, EscritorParquet, COMPRESSAO_PARQUET
+from motor_backup import codificar_lote_csv, FORMATOS, FORMATO_PADRAO, FORMATO_CSV, CODIFICACAO_CSV
+
+# --- Exportação de Tabelas ---
+# Lotes lidos por range e gravados direto no destino: a tabela nunca fica inteira na memória
+
+
+def exportar_tabela(client, tabela, destino, formato=FORMATO_PADRAO, colunas="*", filtros=None,
+                    tamanho_lote=TAMANHO_LOTE_LEITURA, ao_progresso=None):
+    """Grava a tabela em `destino` (arquivo binário aberto) como CSV do Excel ou Parquet.
+
+    `ao_progresso(registros)` é chamado após cada lote. Retorna o número de registros exportados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: '{formato}'")
+
+    nomes_colunas = None
+    escritor = EscritorParquet(destino) if formato == "parquet" else None
+    registros = 0
+    try:
+        for lote in ler_tabela_em_lotes(client, tabela, colunas, filtros, tamanho_lote):
+            if nomes_colunas is None:
+                nomes_colunas = list(lote[0].keys())
+
+            if escritor:
+                escritor.escrever(codificar_lote_arrow(lote, nomes_colunas, tabela))
+            else:
+                destino.write(codificar_lote_csv(lote, nomes_colunas, cabecalho=registros == 0))
+
+            registros += len(lote)
+            if ao_progresso:
+                ao_progresso(registros)
+
+        if nomes_colunas is None and escritor is None:
+            # Tabela vazia: só o cabeçalho, com as colunas conhecidas do esquema
+            colunas_esquema = list(tipos_da_tabela(tabela)) if colunas == "*" else colunas.replace(" ", "").split(",")
+            destino.write(codificar_lote_csv([], colunas_esquema, cabecalho=True))
+    finally:
+        if escritor:
+            escritor.fechar()
+    return registros
+
+
+# --- Relatório de Inventário ---
+# Ativos com os nomes no lugar dos IDs: o PostgREST resolve os joins pelos recursos embutidos,
+# numa única consulta por página, e o Arrow achata as estruturas aninhadas sem laço por registro.
+CONSULTA_INVENTARIO = (
+    "id, serial, valor, "
+    "modelos(nome, marcas(nome), categorias(nome)), "
+    "setores(nome), status(nome), estados(nome), "
+    "colaboradores(nome, email), "
+    "compras(data_compra, nota_fiscal, lojas(nome))"
+)
+
+_NOME = pa.struct([("nome", pa.string())])
+
+ESQUEMA_INVENTARIO = pa.schema([
+    ("id", pa.int64()),
+    ("serial", pa.string()),
+    ("valor", pa.float64()),
+    ("modelos", pa.struct([("nome", pa.string()), ("marcas", _NOME), ("categorias", _NOME)])),
+    ("setores", _NOME),
+    ("status", _NOME),
+    ("estados", _NOME),
+    ("colaboradores", pa.struct([("nome", pa.string()), ("email", pa.string())])),
+    ("compras", pa.struct([("data_compra", pa.string()), ("nota_fiscal", pa.string()), ("lojas", _NOME)])),
+])
+
+# Caminho no registro achatado -> coluna do relatório (na ordem do arquivo)
+COLUNAS_INVENTARIO = {
+    "id": "id",
+    "serial": "serial",
+    "modelos.categorias.nome": "categoria",
+    "modelos.marcas.nome": "marca",
+    "modelos.nome": "modelo",
+    "status.nome": "status",
+    "estados.nome": "estado",
+    "setores.nome": "setor",
+    "colaboradores.nome": "usuario",
+    "colaboradores.email": "email_usuario",
+    "valor": "valor",
+    "compras.nota_fiscal": "nota_fiscal",
+    "compras.data_compra": "data_compra",
+    "compras.lojas.nome": "loja",
+}
+
+
+def achatar_inventario(lote):
+    """Tabela Arrow do relatório a partir de uma página de ativos com os recursos embutidos.
+
+    Recursos ausentes (ativo sem usuário ou sem compra) viram nulos nas colunas correspondentes.
+    """
+    tabela = pa.Table.from_pylist(lote, schema=ESQUEMA_INVENTARIO)
+    while any(pa.types.is_struct(coluna.type) for coluna in tabela.columns):
+        tabela = tabela.flatten()
+    tabela = tabela.select(list(COLUNAS_INVENTARIO)).rename_columns(list(COLUNAS_INVENTARIO.values()))
+    posicao = tabela.schema.get_field_index("data_compra")
+    return tabela.set_column(posicao, "data_compra", tabela["data_compra"].cast(pa.date32()))
+
+
+def exportar_inventario(client, destino, formato=FORMATO_PADRAO, filtros=None, tamanho_lote=TAMANHO_LOTE_LEITURA,
+                        ao_progresso=None):
+    """Grava o relatório de inventário em `destino` (arquivo binário aberto), página a página.
+
+    `filtros` valem para as colunas de ativos (ex: {"local_id": 3}). `ao_progresso(registros)`
+    é chamado após cada página. Retorna o número de ativos exportados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: '{formato}'")
+
+    escritor = None
+    registros = 0
+    try:
+        for lote in ler_tabela_em_lotes(client, "ativos", CONSULTA_INVENTARIO, filtros, tamanho_lote):
+            dados = achatar_inventario(lote)
+            if formato == "parquet":
+                if escritor is None:
+                    escritor = pq.ParquetWriter(destino, dados.schema, compression=COMPRESSAO_PARQUET)
+                escritor.write_table(dados)
+            elif registros == 0:
+                destino.write(dados.to_pandas().to_csv(index=False, **FORMATO_CSV).encode(CODIFICACAO_CSV))
+            else:
+                destino.write(dados.to_pandas().to_csv(index=False, header=False, **FORMATO_CSV).encode("utf-8"))
+
+            registros += len(lote)
+            if ao_progresso:
+                ao_progresso(registros)
+
+        if registros == 0:
+            # Nenhum ativo: arquivo só com as colunas do relatório
+            vazio = achatar_inventario([])
+            if formato == "parquet":
+                pq.write_table(vazio, destino, compression=COMPRESSAO_PARQUET)
+            else:
+                destino.write(vazio.to_pandas().to_csv(index=False, **FORMATO_CSV).encode(CODIFICACAO_CSV))
+    finally:
+        if escritor:
+            escritor.close()
+    return registros
@@ -0,0 +1,154 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from esquema import tipos_da_tabela
+
+# --- Formato Colunar (Parquet) ---
+# Um arquivo por tabela, com o esquema gravado junto; cada lote do backup vira um grupo de linhas
+COMPRESSAO_PARQUET = "zstd"
+
+TIPOS_ARROW = {
+    "inteiro": pa.int64(),
+    "decimal": pa.float64(),
+    "texto": pa.string(),
+    "booleano": pa.bool_(),
+}
+
+# Datas chegam do PostgREST como texto ISO; tenta os tipos na ordem
+# (colunas 'timestamp' sem fuso não trazem o deslocamento e ficam sem fuso)
+TIPOS_TEMPORAIS = {
+    "data": [pa.date32()],
+    "data_hora": [pa.timestamp("us", tz="UTC"), pa.timestamp("us")],
+}
+
+
+def _coluna_arrow(valores, tipo):
+    if tipo in TIPOS_TEMPORAIS:
+        texto = pa.array(valores, pa.string())
+        for destino in TIPOS_TEMPORAIS[tipo]:
+            try:
+                return texto.cast(destino)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                continue
+        return texto
+
+    if tipo:
+        return pa.array(valores, TIPOS_ARROW[tipo])
+
+    # Coluna fora do esquema: tipo inferido; lote todo nulo ou misto vira texto
+    try:
+        coluna = pa.array(valores)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in valores], pa.string())
+    return coluna.cast(pa.string()) if pa.types.is_null(coluna.type) else coluna
+
+
+def tabela_arrow(lote, colunas, tabela):
+    """Tabela Arrow tipada conforme o esquema a partir de uma lista de registros."""
+    tipos = tipos_da_tabela(tabela)
+    arrays = [_coluna_arrow([registro.get(coluna) for registro in lote], tipos.get(coluna)) for coluna in colunas]
+    return pa.Table.from_arrays(arrays, names=colunas)
+
+
+def codificar_lote_arrow(lote, colunas, tabela):
+    """Converte um lote de registros em bytes Arrow IPC (executado no pool de processos)."""
+    dados = tabela_arrow(lote, colunas, tabela)
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, dados.schema) as escritor:
+        escritor.write_table(dados)
+    return saida.getvalue().to_pybytes()
+
+
+class EscritorParquet:
+    """Grava os lotes codificados de uma tabela como grupos de linhas de um único Parquet."""
+
+    def __init__(self, destino):
+        self._destino = destino
+        self._escritor = None
+
+    def escrever(self, dados_ipc):
+        dados = pa.ipc.open_stream(dados_ipc).read_all()
+        if self._escritor is None:
+            self._escritor = pq.ParquetWriter(self._destino, dados.schema, compression=COMPRESSAO_PARQUET)
+        elif dados.schema != self._escritor.schema:
+            # Colunas fora do esquema podem ter sido inferidas de outra forma neste lote
+            dados = dados.cast(self._escritor.schema)
+        self._escritor.write_table(dados)
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+
+
+def tamanho_parquet(lote, colunas, tabela):
+    """Tamanho em bytes do Parquet com os registros do lote."""
+    saida = pa.BufferOutputStream()
+    pq.write_table(tabela_arrow(lote, colunas, tabela), saida, compression=COMPRESSAO_PARQUET)
+    return saida.getvalue().size
+
+
+# --- Leitura ---
+def contar_linhas_parquet(arquivo):
+    return pq.ParquetFile(arquivo).metadata.num_rows
+
+
+def _lote_textual(lote):
+    """Lote com as datas de volta ao texto ISO, como chegam do PostgREST e do CSV."""
+    colunas = []
+    for campo, coluna in zip(lote.schema, lote.columns):
+        if pa.types.is_timestamp(campo.type):
+            coluna = pc.strftime(coluna, format="%Y-%m-%dT%H:%M:%S")
+            if campo.type.tz:
+                # Gravado em UTC: mesmo deslocamento que o PostgREST devolve
+                coluna = pc.binary_join_element_wise(coluna, "+00:00", "")
+        elif pa.types.is_date(coluna.type):
+            coluna = coluna.cast(pa.string())
+        colunas.append(coluna)
+    return pa.RecordBatch.from_arrays(colunas, names=lote.schema.names)
+
+
+def registros_arrow(lote):
+    """Registros prontos para o upsert, com datas de volta ao texto ISO."""
+    return _lote_textual(lote).to_pylist()
+
+
+def _lotes_parquet(arquivo, tamanho_lote, pular=0):
+    parquet = pq.ParquetFile(arquivo)
+    grupos = []
+    for indice in range(parquet.num_row_groups):
+        linhas = parquet.metadata.row_group(indice).num_rows
+        if pular >= linhas and not grupos:
+            pular -= linhas
+        else:
+            grupos.append(indice)
+
+    if not grupos:
+        return
+
+    for lote in parquet.iter_batches(batch_size=tamanho_lote, row_groups=grupos):
+        if pular >= lote.num_rows:
+            pular -= lote.num_rows
+            continue
+        if pular:
+            lote = lote.slice(pular)
+            pular = 0
+        yield _lote_textual(lote)
+
+
+def ler_parquet_em_lotes(arquivo, tamanho_lote, pular=0):
+    """Gera listas de registros de até `tamanho_lote` linhas, pulando as `pular` primeiras.
+
+    Grupos de linhas inteiramente já restaurados nem são lidos.
+    """
+    for lote in _lotes_parquet(arquivo, tamanho_lote, pular):
+        yield lote.to_pylist()
+
+
+def ler_parquet_dataframes(arquivo, tamanho_lote):
+    """Gera DataFrames de até `tamanho_lote` linhas (datas como texto, como no CSV)."""
+    for lote in _lotes_parquet(arquivo, tamanho_lote):
+        yield lote.to_pandas()
+
+
+def colunas_parquet(arquivo):
+    return pq.ParquetFile(arquivo).schema_arrow.names
@@ -0,0 +1,258 @@
+import codecs
+import numpy as np
+import pandas as pd
+from coercao import preparar_registros
+from dados import rotulo_modelo, CONSULTAS_REFERENCIA
+from esquema import CHAVES_ESTRANGEIRAS
+from motor_backup import FORMATO_CSV, CODIFICACAO_CSV
+from motor_restauracao import enviar_lote, TAMANHO_LOTE_RESTAURACAO
+
+# --- Tradução de Nomes para IDs ---
+# Nas colunas de chave estrangeira o usuário pode escrever o nome ("TI", "dell - latitude 5420")
+# em vez do ID. A comparação ignora maiúsculas, acentos e espaços repetidos.
+COLUNAS_PENDENCIAS = ["coluna", "valor", "ocorrencias", "primeira_linha", "motivo"]
+
+
+def normalizar_nome(serie):
+    """Chave de comparação de nomes: sem acentos, minúsculas e espaços simples (vetorizado)."""
+    return (
+        serie.astype("string")
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.casefold()
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def colunas_traduziveis(tabela):
+    """Colunas de chave estrangeira da tabela cujas referências estão em cache: {coluna: tabela}."""
+    return {
+        coluna: referenciada
+        for coluna, referenciada in CHAVES_ESTRANGEIRAS.get(tabela, {}).items()
+        if referenciada in CONSULTAS_REFERENCIA
+    }
+
+
+def tabela_busca(referencia):
+    """DataFrame chave -> id de uma tabela de referência, com as chaves ambíguas marcadas.
+
+    Modelos aceitam 'Marca - Modelo' ou só o modelo; colaboradores, o nome ou o e-mail.
+    """
+    chaves, ids = [], []
+    for registro in referencia.registros:
+        nomes = [registro["nome"]]
+        if referencia.tabela == "modelos":
+            nomes.append(rotulo_modelo(registro))
+        elif referencia.tabela == "colaboradores" and registro.get("email"):
+            nomes.append(registro["email"])
+        for nome in dict.fromkeys(nomes):
+            chaves.append(nome)
+            ids.append(registro["id"])
+
+    busca = pd.DataFrame({"chave": normalizar_nome(pd.Series(chaves, dtype="string")), "id": ids})
+    busca = busca.drop_duplicates()
+    # Mesmo nome em registros diferentes (dois modelos 'Latitude', dois 'João Silva')
+    busca["ambigua"] = busca.duplicated("chave", keep=False)
+    return busca.drop_duplicates("chave").reset_index(drop=True)
+
+
+def traduzir_nomes(df, tabela, obter_referencia):
+    """Troca os nomes das colunas de chave estrangeira pelos IDs, com um merge por coluna.
+
+    Os valores distintos da coluna são normalizados e cruzados de uma vez com a tabela de busca;
+    valores numéricos que não são nomes valem como ID. `obter_referencia(tabela)` devolve a
+    `Referencia` em cache. Retorna (df traduzido, pendências), com as pendências (valores não
+    encontrados ou ambíguos, nas colunas `COLUNAS_PENDENCIAS`) reunidas para todas as colunas.
+    """
+    df = df.copy()
+    pendencias = []
+    for coluna, referenciada in colunas_traduziveis(tabela).items():
+        if coluna not in df.columns:
+            continue
+        codigos, valores = pd.factorize(df[coluna].astype("string").str.strip().replace("", pd.NA))
+        if not len(valores):
+            continue
+
+        busca = tabela_busca(obter_referencia(referenciada))
+        distintos = pd.DataFrame({"valor": valores, "chave": normalizar_nome(pd.Series(valores))})
+        cruzados = distintos.merge(busca, on="chave", how="left")
+
+        # Sem nome correspondente: número que existe na tabela é tratado como ID
+        numeros = pd.to_numeric(cruzados["valor"], errors="coerce")
+        eh_id = cruzados["id"].isna() & numeros.isin(busca["id"])
+        cruzados["id"] = cruzados["id"].astype("Float64").where(~eh_id, numeros)
+        cruzados["ambigua"] = cruzados["ambigua"].fillna(False).astype(bool) & ~eh_id
+
+        resolvidos = pd.array(cruzados["id"], dtype="Int64")
+        traduzida = pd.Series(pd.NA, index=df.index, dtype="Int64")
+        validos = codigos >= 0
+        traduzida[validos] = resolvidos[codigos[validos]]
+        df[coluna] = traduzida
+
+        problemas = (cruzados["id"].isna() | cruzados["ambigua"]).to_numpy(dtype=bool)
+        if problemas.any():
+            afetadas = validos & problemas[np.maximum(codigos, 0)]
+            df.loc[afetadas, coluna] = pd.NA
+            linhas = pd.Series(df.index[afetadas] + 1).groupby(codigos[afetadas]).agg(["size", "min"])
+            motivos = np.where(
+                cruzados["id"].notna(), f"nome repetido em '{referenciada}'", f"não encontrado em '{referenciada}'"
+            )
+            pendencias.append(pd.DataFrame({
+                "coluna": coluna,
+                "valor": cruzados["valor"].to_numpy()[linhas.index],
+                "ocorrencias": linhas["size"].to_numpy(),
+                "primeira_linha": linhas["min"].to_numpy(),
+                "motivo": motivos[linhas.index],
+            }))
+
+    if not pendencias:
+        return df, pd.DataFrame(columns=COLUNAS_PENDENCIAS)
+    return df, pd.concat(pendencias, ignore_index=True)
+
+
+# --- Importação de CSV ---
+# Mesmo formato da exportação (padrão do Excel brasileiro); linhas numeradas a partir de 1,
+# sem contar o cabeçalho, como nos relatórios da restauração.
+TAMANHO_LEITURA_CSV = 50_000  # Linhas lidas e convertidas de uma vez; o envio segue em lotes menores
+TAMANHO_AMOSTRA = 64 * 1024  # Início do arquivo usado para achar o separador
+BLOCO_VERIFICACAO = 1024 * 1024
+
+# Em ordem de preferência; latin1 aceita qualquer byte e fica por último
+CODIFICACOES_IMPORTACAO = ("utf-8-sig", "cp1252", "latin1")
+SEPARADORES_IMPORTACAO = (";", ",", "\t", "|")
+
+
+def _decodifica(arquivo, codificacao):
+    """Confere, em blocos, se o arquivo inteiro é válido na codificação."""
+    decodificador = codecs.getincrementaldecoder(codificacao)()
+    try:
+        while bloco := arquivo.read(BLOCO_VERIFICACAO):
+            decodificador.decode(bloco)
+        decodificador.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detectar_formato_csv(arquivo):
+    """Descobre (codificação, separador) de um CSV aberto em modo binário e posicionável.
+
+    A codificação é conferida no arquivo todo, bloco a bloco (um byte inválido no fim não
+    derruba a importação no meio); o separador é o mais frequente no cabeçalho da amostra.
+    O arquivo volta à posição inicial.
+    """
+    inicio = arquivo.tell()
+    amostra = arquivo.read(TAMANHO_AMOSTRA)
+
+    codificacao = CODIFICACOES_IMPORTACAO[-1]
+    for candidata in CODIFICACOES_IMPORTACAO[:-1]:
+        arquivo.seek(inicio)
+        if _decodifica(arquivo, candidata):
+            codificacao = candidata
+            break
+    arquivo.seek(inicio)
+
+    cabecalho = amostra.decode(codificacao, errors="ignore").partition("\n")[0]
+    separador = max(SEPARADORES_IMPORTACAO, key=cabecalho.count)
+    if not cabecalho.count(separador):
+        separador = FORMATO_CSV["sep"]
+    return codificacao, separador
+
+
+def ler_csv_importacao(arquivo, tamanho_lote=TAMANHO_LEITURA_CSV, codificacao=CODIFICACAO_CSV,
+                       separador=FORMATO_CSV["sep"]):
+    """Lê o CSV (caminho ou arquivo binário) em DataFrames de `tamanho_lote` linhas, tudo como texto."""
+    formato = {**FORMATO_CSV, "sep": separador}
+    return pd.read_csv(arquivo, dtype=str, encoding=codificacao, chunksize=tamanho_lote, **formato)
+
+
+def ler_previa_csv(arquivo, linhas, codificacao=CODIFICACAO_CSV, separador=FORMATO_CSV["sep"]):
+    """Só as primeiras `linhas` do CSV, com o arquivo devolvido à posição inicial."""
+    inicio = arquivo.tell()
+    previa = pd.read_csv(arquivo, dtype=str, encoding=codificacao, nrows=linhas, **{**FORMATO_CSV, "sep": separador})
+    arquivo.seek(inicio)
+    return previa
+
+
+def _traduzir_lote(df, tabela, obter_referencia):
+    """Traduz o lote e separa as linhas com nomes pendentes. Retorna (df enviável, falhas)."""
+    colunas = [coluna for coluna in colunas_traduziveis(tabela) if coluna in df.columns]
+    preenchidas = df[colunas].apply(lambda serie: serie.str.strip().fillna("") != "")
+    df, pendencias = traduzir_nomes(df, tabela, obter_referencia)
+    pendentes = (preenchidas & df[colunas].isna()).any(axis=1)
+    falhas = [
+        (p.primeira_linha, f"{p.coluna}: '{p.valor}' {p.motivo} ({p.ocorrencias} linha(s) ignorada(s))")
+        for p in pendencias.itertuples(index=False)
+    ]
+    return df[~pendentes], falhas
+
+
+def _lotes_de_envio(df, tabela, tamanho_lote):
+    """Converte o bloco lido e o divide em lotes de envio: (linhas, registros, erro).
+
+    A conversão é feita no bloco inteiro; se falhar, é refeita lote a lote para
+    descartar só os lotes com o valor inválido.
+    """
+    try:
+        registros = preparar_registros(df, tabela)
+    except ValueError:
+        for inicio in range(0, len(df), tamanho_lote):
+            parte = df.iloc[inicio:inicio + tamanho_lote]
+            try:
+                yield list(parte.index + 1), preparar_registros(parte, tabela), None
+            except ValueError as e:
+                yield list(parte.index + 1), None, str(e)
+        return
+
+    for inicio in range(0, len(df), tamanho_lote):
+        yield list(df.index[inicio:inicio + tamanho_lote] + 1), registros[inicio:inicio + tamanho_lote], None
+
+
+def importar_csv(client, tabela, arquivo, tamanho_lote=TAMANHO_LOTE_RESTAURACAO, codificacao=CODIFICACAO_CSV,
+                 sobrescrever=False, ao_progresso=None, obter_referencia=None, separador=FORMATO_CSV["sep"],
+                 ignorar=None):
+    """Importa o CSV em blocos de `TAMANHO_LEITURA_CSV` linhas, sem carregar o arquivo inteiro.
+
+    Cada bloco é enviado em lotes de `tamanho_lote`. Lotes com erro de conversão são
+    descartados inteiros e os demais seguem; no envio, `enviar_lote` isola as linhas
+    rejeitadas pelo banco. Com `sobrescrever` os registros com o mesmo ID são atualizados
+    (upsert) em vez de rejeitados. Com `obter_referencia`, os nomes nas chaves estrangeiras
+    são traduzidos para IDs e as linhas com nomes não encontrados ou ambíguos ficam de
+    fora (uma falha por valor). `ignorar` recebe os números das linhas que não devem ser
+    enviadas (as reprovadas por `validacao.validar_csv`, por exemplo).
+
+    `ao_progresso(linhas_lidas, enviados)` é chamado após cada lote.
+    Retorna (enviados, falhas), com falhas como [(linha, mensagem)].
+    """
+    metodo = "upsert" if sobrescrever else "insert"
+    ignorar = np.fromiter(ignorar or (), dtype="int64")
+    enviados, falhas, lidas = 0, [], 0
+    for df in ler_csv_importacao(arquivo, TAMANHO_LEITURA_CSV, codificacao, separador):
+        lidas += len(df)
+        if len(ignorar):
+            df = df[~np.isin(df.index + 1, ignorar)]
+        if df.empty:
+            # Bloco inteiro ignorado: nada a traduzir nem enviar
+            if ao_progresso:
+                ao_progresso(lidas, enviados)
+            continue
+        if obter_referencia:
+            df, falhas_nomes = _traduzir_lote(df, tabela, obter_referencia)
+            falhas.extend(falhas_nomes)
+
+        # A numeração vem do índice, contínuo entre os blocos (mesmo sem as linhas pendentes)
+        for linhas, registros, erro in _lotes_de_envio(df, tabela, tamanho_lote):
+            if erro:
+                falhas.append((f"{linhas[0]}-{linhas[-1]}", erro))
+            else:
+                ok, falhas_lote = enviar_lote(client, tabela, registros, linhas[0], linhas, metodo)
+                enviados += ok
+                falhas.extend(falhas_lote)
+            if ao_progresso:
+                ao_progresso(linhas[-1], enviados)
+
+        if ao_progresso:
+            ao_progresso(lidas, enviados)
+    return enviados, falhas
@@ -0,0 +1,446 @@
+import datetime
+import hashlib
+import json
+import time
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import uuid
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from dados import ler_tabela_em_lotes, TAMANHO_LOTE_LEITURA
+from esquema import VERSAO_ESQUEMA
+from formato_parquet import codificar_lote_arrow, EscritorParquet, tamanho_parquet
+
+# --- Formato dos Arquivos ---
+# CSV no padrão do Excel brasileiro (mesmo formato usado na restauração)
+FORMATO_CSV = {"sep": ";", "decimal": ","}
+CODIFICACAO_CSV = "utf-8-sig"
+
+# Extensão do arquivo de cada tabela por formato. O CSV abre no Excel;
+# o Parquet é menor, mais rápido e preserva os tipos das colunas.
+FORMATOS = {"csv": ".csv", "parquet": ".parquet"}
+FORMATO_PADRAO = "csv"
+
+NOME_ARQUIVO_BACKUP = "officeflow_full_backup.zip"
+NOME_ARQUIVO_DIFERENCIAL = "officeflow_diff_backup.zip"
+
+# --- Manifesto ---
+# Metadados do backup gravados dentro do zip, ao lado dos arquivos das tabelas
+NOME_MANIFESTO = "manifesto.json"
+# Versão 2: esquema, colunas e soma SHA-256 de cada arquivo de tabela
+VERSAO_MANIFESTO = 2
+TAMANHO_BLOCO = 1024 * 1024  # Leitura e cópia dos arquivos do zip em blocos
+
+# Tabelas só de inserção e a coluna de data usada como marca d'água.
+# No modo diferencial exportam apenas as linhas novas; as demais tabelas recebem
+# atualizações no lugar (ex: ativos movimentados) e são sempre exportadas inteiras.
+TABELAS_INCREMENTAIS = {"movimentacoes": "created_at"}
+
+# --- Paralelismo ---
+MAX_CONEXOES_BACKUP = 4        # Tabelas baixadas ao mesmo tempo
+PROCESSOS_CODIFICACAO = 2      # Processos que codificam os lotes (CSV ou Arrow)
+LOTES_PENDENTES_POR_TABELA = 2 # Lotes em codificação por tabela (limita a memória)
+LIMITE_SPOOL_BYTES = 8 * 1024 * 1024  # Acima disso o CSV de uma tabela vai para o disco
+
+
+# --- Codificação em Lotes ---
+def codificar_lote_csv(lote, colunas, cabecalho=False):
+    """Converte um lote de registros em bytes CSV na ordem de `colunas`.
+
+    O primeiro lote de cada tabela (`cabecalho=True`) leva o BOM e a linha de cabeçalho.
+    """
+    df = pd.DataFrame(lote, columns=colunas)
+    if cabecalho:
+        return df.to_csv(index=False, **FORMATO_CSV).encode(CODIFICACAO_CSV)
+    return df.to_csv(index=False, header=False, **FORMATO_CSV).encode("utf-8")
+
+
+# --- Pool de Processos (um por servidor) ---
+_pool_processos = None
+_lock_pool = threading.Lock()
+
+
+def pool_codificacao(processos=PROCESSOS_CODIFICACAO):
+    """Pool de processos compartilhado para codificação; None desativa (codifica na thread)."""
+    global _pool_processos
+    if not processos:
+        return None
+    with _lock_pool:
+        if _pool_processos is None:
+            # 'spawn' evita herdar por fork as threads do servidor do Streamlit
+            contexto = multiprocessing.get_context("spawn")
+            _pool_processos = ProcessPoolExecutor(processos, mp_context=contexto)
+        return _pool_processos
+
+
+def _descartar_pool():
+    global _pool_processos
+    with _lock_pool:
+        if _pool_processos is not None:
+            _pool_processos.shutdown(wait=False, cancel_futures=True)
+            _pool_processos = None
+
+
+# --- Intervalos de IDs ---
+# Conjuntos de IDs guardados como [[inicio, fim], ...]: tabelas que só crescem viram um único intervalo
+def adicionar_id(intervalos, id_):
+    """Acrescenta um ID (em ordem crescente) à lista de intervalos."""
+    if intervalos and id_ <= intervalos[-1][1] + 1:
+        intervalos[-1][1] = max(intervalos[-1][1], id_)
+    else:
+        intervalos.append([id_, id_])
+
+
+def contar_ids(intervalos):
+    return sum(fim - inicio + 1 for inicio, fim in intervalos)
+
+
+def unir_intervalos(a, b):
+    resultado = []
+    for inicio, fim in sorted(list(a) + list(b)):
+        if resultado and inicio <= resultado[-1][1] + 1:
+            resultado[-1][1] = max(resultado[-1][1], fim)
+        else:
+            resultado.append([inicio, fim])
+    return resultado
+
+
+def subtrair_intervalos(a, b):
+    """IDs presentes em `a` e ausentes em `b` (ambos ordenados e sem sobreposição)."""
+    resultado = []
+    j = 0
+    for inicio, fim in a:
+        atual = inicio
+        while j < len(b) and b[j][1] < atual:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] <= fim:
+            if b[k][0] > atual:
+                resultado.append([atual, b[k][0] - 1])
+            atual = max(atual, b[k][1] + 1)
+            k += 1
+        if atual <= fim:
+            resultado.append([atual, fim])
+    return resultado
+
+
+def expandir_intervalos(intervalos):
+    for inicio, fim in intervalos:
+        yield from range(inicio, fim + 1)
+
+
+# --- Pipeline por Tabela ---
+def _ids_removidos(client, tabela, ids_anteriores, tamanho_lote):
+    """IDs do backup anterior que não existem mais na tabela.
+
+    Uma contagem decide se há remoções; só então os IDs atuais são percorridos.
+    """
+    if not ids_anteriores:
+        return []
+
+    limite = ids_anteriores[-1][1]
+    vivos = client.table(tabela).select("id", count="exact", head=True).lte("id", limite).execute().count
+    if vivos == contar_ids(ids_anteriores):
+        return []
+
+    ids_atuais = []
+    for lote in ler_tabela_em_lotes(client, tabela, "id", {"id": ("lte", limite)}, tamanho_lote):
+        for registro in lote:
+            adicionar_id(ids_atuais, registro["id"])
+    return subtrair_intervalos(ids_anteriores, ids_atuais)
+
+
+def _baixar_e_codificar(client, tabela, tamanho_lote, pool, eventos, cancelado, anterior=None, formato=FORMATO_PADRAO):
+    """Baixa a tabela em lotes e codifica cada lote enquanto o próximo é baixado.
+
+    O arquivo da tabela vai para um temporário em spool; eventos de progresso e conclusão
+    são enviados para a thread que escreve o zip. Com `anterior` (entrada da tabela
+    no manifesto do backup anterior), tabelas incrementais exportam só as linhas novas.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=LIMITE_SPOOL_BYTES)
+    escritor_parquet = EscritorParquet(spool) if formato == "parquet" else None
+    gravar = escritor_parquet.escrever if escritor_parquet else spool.write
+    pendentes = deque()
+    colunas = None
+    total = 0
+
+    coluna_data = TABELAS_INCREMENTAIS.get(tabela)
+    incremental = anterior is not None and coluna_data is not None
+    info = {"modo": "incremental" if incremental else "completo", "max_id": None}
+    if coluna_data:
+        info["coluna_data"] = coluna_data
+        info["max_data"] = None
+
+    condicao = None
+    if incremental:
+        info["max_id"] = anterior.get("max_id")
+        info["max_data"] = anterior.get("max_data")
+        condicoes = []
+        if info["max_id"] is not None:
+            condicoes.append(f"id.gt.{info['max_id']}")
+        if info["max_data"]:
+            condicoes.append(f'{coluna_data}.gt."{info["max_data"]}"')
+        condicao = ",".join(condicoes) or None
+
+    ids_exportados = []
+
+    def gravar_primeiro_pendente():
+        futuro = pendentes.popleft()
+        gravar(futuro.result() if pool else futuro)
+
+    try:
+        for lote in ler_tabela_em_lotes(client, tabela, tamanho_lote=tamanho_lote, ou=condicao):
+            if cancelado.is_set():
+                spool.close()
+                return
+
+            if colunas is None:
+                colunas = list(lote[0].keys())
+
+            if escritor_parquet:
+                codificar, argumentos = codificar_lote_arrow, (lote, colunas, tabela)
+            else:
+                codificar, argumentos = codificar_lote_csv, (lote, colunas, total == 0)
+
+            if pool:
+                pendentes.append(pool.submit(codificar, *argumentos))
+            else:
+                pendentes.append(codificar(*argumentos))
+            total += len(lote)
+
+            # Marcas d'água (o lote vem ordenado por id)
+            for registro in lote:
+                adicionar_id(ids_exportados, registro["id"])
+            info["max_id"] = max(info["max_id"] or 0, lote[-1]["id"])
+            if coluna_data:
+                datas = [r[coluna_data] for r in lote if r.get(coluna_data)]
+                if datas:
+                    info["max_data"] = max([info["max_data"] or ""] + datas)
+
+            while len(pendentes) > LOTES_PENDENTES_POR_TABELA:
+                gravar_primeiro_pendente()
+            eventos.put(("progresso", tabela, total))
+
+        while pendentes:
+            gravar_primeiro_pendente()
+        if escritor_parquet:
+            escritor_parquet.fechar()
+
+        info["registros"] = total
+        info["colunas"] = colunas or []
+        if anterior is None:
+            info["ids"] = ids_exportados
+        elif incremental:
+            removidos = _ids_removidos(client, tabela, anterior.get("ids", []), tamanho_lote)
+            info["removidos"] = removidos
+            info["ids"] = unir_intervalos(subtrair_intervalos(anterior.get("ids", []), removidos), ids_exportados)
+        else:
+            info["removidos"] = subtrair_intervalos(anterior.get("ids", []), ids_exportados)
+            info["ids"] = ids_exportados
+
+        spool.seek(0)
+        eventos.put(("concluida", tabela, (spool, info)))
+    except Exception as e:
+        spool.close()
+        eventos.put(("erro", tabela, e))
+
+
+# --- Geração do Arquivo ---
+def gerar_backup(
+    client,
+    tabelas,
+    destino,
+    tamanho_lote=TAMANHO_LOTE_LEITURA,
+    max_conexoes=MAX_CONEXOES_BACKUP,
+    processos=PROCESSOS_CODIFICACAO,
+    ao_progresso=None,
+    manifesto_anterior=None,
+    formato=FORMATO_PADRAO,
+):
+    """Escreve o backup em `destino` (caminho ou arquivo binário aberto).
+
+    As tabelas são baixadas em paralelo (pool de threads limitado), os lotes são
+    codificados em processos separados e cada tabela concluída é compactada no zip
+    pela thread chamadora enquanto as demais continuam baixando.
+
+    Com `manifesto_anterior` o backup é diferencial: as tabelas incrementais trazem só
+    as linhas após a marca d'água e todas as tabelas registram os IDs removidos.
+
+    `formato` escolhe o arquivo de cada tabela: "csv" (padrão do Excel) ou "parquet".
+
+    `ao_progresso(tabela, registros, concluida)` é chamado na thread chamadora,
+    então pode atualizar elementos do Streamlit. Retorna o manifesto gravado.
+    """
+    manifesto = {
+        "versao": VERSAO_MANIFESTO,
+        "versao_esquema": VERSAO_ESQUEMA,
+        "id": uuid.uuid4().hex,
+        "tipo": "diferencial" if manifesto_anterior else "completo",
+        "base": manifesto_anterior["id"] if manifesto_anterior else None,
+        "criado_em": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "formato": formato,
+        "tabelas": {},
+    }
+    tabelas_anteriores = manifesto_anterior["tabelas"] if manifesto_anterior else {}
+
+    eventos = queue.Queue()
+    cancelado = threading.Event()
+    pool = pool_codificacao(processos)
+
+    with ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix="backup") as threads:
+        for tabela in tabelas:
+            # Tabela ausente no backup anterior: exporta inteira, como num backup completo
+            anterior = tabelas_anteriores.get(tabela) if manifesto_anterior else None
+            threads.submit(
+                _baixar_e_codificar, client, tabela, tamanho_lote, pool, eventos, cancelado, anterior, formato
+            )
+
+        try:
+            with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                restantes = len(tabelas)
+                while restantes:
+                    tipo, tabela, valor = eventos.get()
+
+                    if tipo == "erro":
+                        raise RuntimeError(f"Falha ao exportar '{tabela}': {valor}") from valor
+
+                    if tipo == "progresso":
+                        if ao_progresso:
+                            ao_progresso(tabela, valor, False)
+                        continue
+
+                    spool, info = valor
+                    with spool:
+                        if info["registros"]:
+                            entrada_zip = zipfile.ZipInfo(f"{tabela}{FORMATOS[formato]}", time.localtime()[:6])
+                            # Parquet já vem compactado: armazenado sem recompactar
+                            entrada_zip.compress_type = zipfile.ZIP_STORED if formato == "parquet" else zipfile.ZIP_DEFLATED
+                            with zip_file.open(entrada_zip, "w", force_zip64=True) as entrada:
+                                info["arquivo"] = entrada_zip.filename
+                                info["sha256"], info["bytes"] = _copiar_com_resumo(spool, entrada)
+                    manifesto["tabelas"][tabela] = info
+                    restantes -= 1
+                    if ao_progresso:
+                        ao_progresso(tabela, info["registros"], True)
+
+                manifesto["tabelas"] = {tabela: manifesto["tabelas"][tabela] for tabela in tabelas}
+                zip_file.writestr(NOME_MANIFESTO, json.dumps(manifesto, ensure_ascii=False))
+        except BaseException as e:
+            cancelado.set()
+            if isinstance(e.__cause__, BrokenProcessPool):
+                _descartar_pool()
+            raise
+
+    return manifesto
+
+
+def _copiar_com_resumo(origem, destino):
+    """Copia em blocos calculando a soma SHA-256 no mesmo passe. Retorna (soma, bytes)."""
+    resumo = hashlib.sha256()
+    tamanho = 0
+    for bloco in iter(lambda: origem.read(TAMANHO_BLOCO), b""):
+        resumo.update(bloco)
+        destino.write(bloco)
+        tamanho += len(bloco)
+    return resumo.hexdigest(), tamanho
+
+
+def ler_manifesto(arquivo_zip):
+    """Manifesto de um backup (caminho, arquivo ou ZipFile); None para backups antigos sem manifesto."""
+    if not isinstance(arquivo_zip, zipfile.ZipFile):
+        with zipfile.ZipFile(arquivo_zip) as z:
+            return ler_manifesto(z)
+
+    if NOME_MANIFESTO not in arquivo_zip.namelist():
+        return None
+    return json.loads(arquivo_zip.read(NOME_MANIFESTO).decode("utf-8"))
+
+
+def ordenar_cadeia(manifestos):
+    """Ordena os backups enviados em base completa seguida dos diferenciais encadeados.
+
+    Recebe {chave: manifesto} e retorna a lista de chaves na ordem de reaplicação.
+    Um único backup sem manifesto (formato antigo) é tratado como completo.
+    """
+    if len(manifestos) == 1:
+        return list(manifestos)
+
+    if any(m is None for m in manifestos.values()):
+        raise ValueError("Backups sem manifesto não podem ser combinados com diferenciais.")
+
+    bases = [chave for chave, m in manifestos.items() if m["tipo"] == "completo"]
+    if len(bases) != 1:
+        raise ValueError("Envie exatamente um backup completo como base da cadeia.")
+
+    por_base = {m["base"]: chave for chave, m in manifestos.items() if m["tipo"] == "diferencial"}
+    ordem = [bases[0]]
+    while manifestos[ordem[-1]]["id"] in por_base:
+        ordem.append(por_base[manifestos[ordem[-1]]["id"]])
+
+    if len(ordem) != len(manifestos):
+        raise ValueError("Há backups diferenciais que não pertencem à cadeia da base enviada.")
+    return ordem
+
+
+# --- Estimativa de Tamanho ---
+AMOSTRA_ESTIMATIVA = 200     # Linhas reais usadas para estimar o tamanho de cada tabela
+BYTES_POR_ENTRADA_ZIP = 120  # Cabeçalhos locais e diretório central de cada arquivo
+
+
+def tamanho_compactado(dados):
+    """Tamanho de `dados` após DEFLATE com os mesmos parâmetros do zipfile."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return len(compressor.compress(dados)) + len(compressor.flush())
+
+
+def _estatisticas_tabela(client, tabela, amostra, formato=FORMATO_PADRAO):
+    # Contagem exata e amostra de linhas na mesma requisição
+    resposta = client.table(tabela).select("*", count="exact").order("id").limit(amostra).execute()
+    registros = resposta.count or 0
+    linhas = resposta.data
+
+    if not registros or not linhas:
+        return registros, 0
+
+    colunas = list(linhas[0].keys())
+    if formato == "parquet":
+        # Parquet tem custo fixo por arquivo (esquema e rodapé): medido com uma única linha
+        fixo = tamanho_parquet(linhas[:1], colunas, tabela)
+        bytes_por_linha = (tamanho_parquet(linhas, colunas, tabela) - fixo) / max(len(linhas) - 1, 1)
+        return registros, int(fixo + bytes_por_linha * (registros - 1)) + BYTES_POR_ENTRADA_ZIP
+
+    csv_amostra = codificar_lote_csv(linhas, colunas, cabecalho=True)
+    bytes_por_linha = tamanho_compactado(csv_amostra) / len(linhas)
+    return registros, int(bytes_por_linha * registros) + BYTES_POR_ENTRADA_ZIP
+
+
+def estimar_backup(client, tabelas, amostra=AMOSTRA_ESTIMATIVA, max_conexoes=MAX_CONEXOES_BACKUP, formato=FORMATO_PADRAO):
+    """Conta as linhas e estima o tamanho do zip de cada tabela, em paralelo.
+
+    O tamanho vem de uma amostra real codificada e compactada como no backup.
+    Retorna {tabela: (registros, bytes_estimados)}.
+    """
+    with ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix="estatisticas") as threads:
+        futuros = {
+            tabela: threads.submit(_estatisticas_tabela, client, tabela, amostra, formato) for tabela in tabelas
+        }
+        return {tabela: futuro.result() for tabela, futuro in futuros.items()}
+
+
+def novo_arquivo_temporario(sufixo=".zip"):
+    """Cria um arquivo temporário em disco e retorna o caminho (o chamador remove)."""
+    descritor, caminho = tempfile.mkstemp(prefix="officeflow_", suffix=sufixo)
+    os.close(descritor)
+    return caminho
+
+
+def remover_arquivo(caminho):
+    if caminho and os.path.exists(caminho):
+        os.remove(caminho)
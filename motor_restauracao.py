@@ -0,0 +1,543 @@
+import csv
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from coercao import dtypes_leitura, preparar_registros, coagir_tipos
+from dados import ler_tabela_em_lotes, TAMANHO_LOTE_LEITURA
+from esquema import niveis_dependencia, ordem_topologica, tipos_da_tabela, VERSAO_ESQUEMA
+from formato_parquet import contar_linhas_parquet, ler_parquet_em_lotes, ler_parquet_dataframes, colunas_parquet
+from motor_backup import ler_manifesto, expandir_intervalos, FORMATOS, NOME_MANIFESTO, TAMANHO_BLOCO
+
+# --- Configuração ---
+TAMANHO_LOTE_RESTAURACAO = 500  # Linhas por upsert
+LOTE_REMOCAO = 500              # IDs por delete de um backup diferencial
+MAX_FALHAS_CHECKPOINT = 1000    # Falhas guardadas por tabela no checkpoint
+MAX_CONEXOES_RESTAURACAO = 4    # Tabelas de um mesmo nível restauradas ao mesmo tempo
+
+PASTA_CHECKPOINTS = os.path.join(tempfile.gettempdir(), "officeflow_restauracao")
+
+
+# --- Checkpoints ---
+def chave_arquivo(arquivo):
+    """Identifica um backup para o checkpoint: id do manifesto ou hash do conteúdo."""
+    manifesto = ler_manifesto(arquivo)
+    if manifesto:
+        return manifesto["id"]
+
+    arquivo.seek(0)
+    resumo = hashlib.sha256()
+    for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+        resumo.update(bloco)
+    arquivo.seek(0)
+    return resumo.hexdigest()
+
+
+def _caminho_checkpoint(chave):
+    return os.path.join(PASTA_CHECKPOINTS, f"{chave}.json")
+
+
+def carregar_checkpoint(chave):
+    """Estado salvo de uma restauração interrompida (ou estado vazio)."""
+    caminho = _caminho_checkpoint(chave)
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    return {"linhas": {}, "concluidas": [], "falhas": {}}
+
+
+def salvar_checkpoint(chave, estado):
+    os.makedirs(PASTA_CHECKPOINTS, exist_ok=True)
+    caminho = _caminho_checkpoint(chave)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    # Troca atômica: um checkpoint nunca fica pela metade
+    os.replace(temporario, caminho)
+
+
+def remover_checkpoint(chave):
+    caminho = _caminho_checkpoint(chave)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+def existe_checkpoint(chave):
+    return os.path.exists(_caminho_checkpoint(chave))
+
+
+# --- Leitura dos Arquivos do Backup ---
+def arquivo_da_tabela(nomes, tabela):
+    """Nome do arquivo da tabela no zip (CSV ou Parquet), ou None se ela não estiver no backup."""
+    for extensao in FORMATOS.values():
+        if f"{tabela}{extensao}" in nomes:
+            return f"{tabela}{extensao}"
+    return None
+
+
+def _eh_parquet(nome_arquivo):
+    return nome_arquivo.endswith(FORMATOS["parquet"])
+
+
+def _separador(z, nome_arquivo):
+    # Backups no formato BR usam ';'; arquivos antigos/padrão usam ','
+    with z.open(nome_arquivo) as f:
+        cabecalho = f.readline().decode("utf-8-sig", errors="replace")
+    return (";", ",") if ";" in cabecalho else (",", ".")
+
+
+def ler_csv_em_lotes(z, nome_arquivo, tamanho_lote, pular=0, tabela=None):
+    """Lê um CSV do zip em DataFrames de `tamanho_lote` linhas, pulando as `pular` primeiras."""
+    sep, decimal = _separador(z, nome_arquivo)
+    with z.open(nome_arquivo) as f:
+        leitor = pd.read_csv(
+            f,
+            sep=sep,
+            decimal=decimal,
+            dtype=dtypes_leitura(tabela) if tabela else None,
+            chunksize=tamanho_lote,
+            skiprows=range(1, pular + 1) if pular else None,
+        )
+        for df in leitor:
+            yield df
+
+
+def contar_linhas_csv(z, nome_arquivo):
+    """Conta as linhas de dados de um CSV sem carregá-lo (aproximado se houver quebras de linha nos campos)."""
+    linhas = 0
+    with z.open(nome_arquivo) as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            linhas += bloco.count(b"\n")
+    return max(linhas - 1, 0)
+
+
+def contar_linhas(z, nome_arquivo):
+    if _eh_parquet(nome_arquivo):
+        with z.open(nome_arquivo) as f:
+            return contar_linhas_parquet(f)
+    return contar_linhas_csv(z, nome_arquivo)
+
+
+def colunas_do_arquivo(z, nome_arquivo):
+    """Colunas gravadas no arquivo da tabela (cabeçalho do CSV ou esquema do Parquet)."""
+    with z.open(nome_arquivo) as f:
+        if _eh_parquet(nome_arquivo):
+            return colunas_parquet(f)
+        cabecalho = f.readline().decode("utf-8-sig").rstrip("\r\n")
+    return next(csv.reader([cabecalho], delimiter=_separador(z, nome_arquivo)[0]), [])
+
+
+def ler_dataframes_em_lotes(z, nome_arquivo, tabela, tamanho_lote):
+    """DataFrames de até `tamanho_lote` linhas do CSV ou do Parquet, ainda sem a conversão de tipos."""
+    if _eh_parquet(nome_arquivo):
+        with z.open(nome_arquivo) as f:
+            yield from ler_parquet_dataframes(f, tamanho_lote)
+    else:
+        yield from ler_csv_em_lotes(z, nome_arquivo, tamanho_lote, tabela=tabela)
+
+
+def ler_registros_em_lotes(z, nome_arquivo, tabela, tamanho_lote, pular=0):
+    """Lotes de registros prontos para o upsert, lidos do CSV ou do Parquet da tabela."""
+    if _eh_parquet(nome_arquivo):
+        # O Parquet já traz os tipos exatos: não há conversão a fazer
+        with z.open(nome_arquivo) as f:
+            yield from ler_parquet_em_lotes(f, tamanho_lote, pular)
+    else:
+        for df in ler_csv_em_lotes(z, nome_arquivo, tamanho_lote, pular, tabela):
+            yield preparar_registros(df, tabela)
+
+
+# --- Verificação ---
+def _resumo_entrada(z, nome_arquivo):
+    """Soma SHA-256 e tamanho de um arquivo do zip, lido em blocos (o zipfile confere o CRC no fim)."""
+    resumo = hashlib.sha256()
+    tamanho = 0
+    with z.open(nome_arquivo) as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO), b""):
+            resumo.update(bloco)
+            tamanho += len(bloco)
+    return resumo.hexdigest(), tamanho
+
+
+def _verificar_tabela(z, nomes, tabela, info):
+    """(válido, situação) de uma tabela do manifesto."""
+    nome_arquivo = info.get("arquivo") or arquivo_da_tabela(nomes, tabela)
+    if not info["registros"]:
+        return True, "OK (sem registros)"
+    if nome_arquivo not in nomes:
+        return False, "Arquivo ausente"
+
+    try:
+        soma, tamanho = _resumo_entrada(z, nome_arquivo)
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        return False, f"Arquivo corrompido: {e}"
+
+    if "sha256" in info:
+        if tamanho != info["bytes"] or soma != info["sha256"]:
+            return False, "Soma de verificação diferente da registrada"
+        return True, "OK"
+
+    # Manifesto antigo, sem soma: confere só a quantidade de linhas
+    linhas = contar_linhas(z, nome_arquivo)
+    if linhas != info["registros"]:
+        return False, f"{linhas} linhas no arquivo, {info['registros']} no manifesto"
+    return True, "OK (sem soma de verificação)"
+
+
+def verificar_backup(z, ao_progresso=None):
+    """Confere um backup (ZipFile aberto) contra o manifesto, sem acessar o banco.
+
+    Cada arquivo é lido em blocos, em memória constante. Retorna um dicionário com
+    `valido`, `avisos` e `tabelas` (uma linha de relatório por tabela).
+    """
+    manifesto = ler_manifesto(z)
+    nomes = set(z.namelist())
+    avisos = []
+    tabelas = []
+
+    if manifesto is None:
+        avisos.append("Backup sem manifesto: apenas a integridade dos arquivos (CRC) foi verificada.")
+        itens = [(nome.rsplit(".", 1)[0], {"arquivo": nome, "registros": None}) for nome in sorted(nomes)]
+    else:
+        if manifesto.get("versao_esquema") not in (None, VERSAO_ESQUEMA):
+            avisos.append(
+                f"Backup gerado com a versão {manifesto['versao_esquema']} do esquema (atual: {VERSAO_ESQUEMA})."
+            )
+        itens = list(manifesto["tabelas"].items())
+        esperados = {info.get("arquivo") or arquivo_da_tabela(nomes, tabela) for tabela, info in itens}
+        for nome in sorted(nomes - esperados - {NOME_MANIFESTO}):
+            tabelas.append({"Tabela": nome, "Registros": None, "Válido": False, "Situação": "Arquivo fora do manifesto"})
+
+    for tabela, info in itens:
+        if info["registros"] is None:
+            try:
+                _resumo_entrada(z, info["arquivo"])
+                valido, situacao = True, "OK (CRC)"
+            except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+                valido, situacao = False, f"Arquivo corrompido: {e}"
+        else:
+            valido, situacao = _verificar_tabela(z, nomes, tabela, info)
+
+        tabelas.append({"Tabela": tabela, "Registros": info["registros"], "Válido": valido, "Situação": situacao})
+        if ao_progresso:
+            ao_progresso(tabela)
+
+    return {"valido": all(linha["Válido"] for linha in tabelas), "avisos": avisos, "tabelas": tabelas}
+
+
+# --- Envio ---
+def enviar_lote(client, tabela, registros, primeira_linha, linhas=None, metodo="upsert"):
+    """Faz o upsert do lote; se falhar, divide ao meio até isolar as linhas com erro.
+
+    Retorna (enviados, falhas), com falhas como [(linha_no_arquivo, mensagem)].
+    As linhas são consecutivas a partir de `primeira_linha`, ou informadas uma a uma em `linhas`.
+    `metodo="insert"` grava sem sobrescrever registros existentes (importação).
+    """
+    try:
+        getattr(client.table(tabela), metodo)(registros).execute()
+        return len(registros), []
+    except Exception as e:
+        if len(registros) == 1:
+            return 0, [(linhas[0] if linhas else primeira_linha, str(e))]
+
+        meio = len(registros) // 2
+        linhas_a, linhas_b = (linhas[:meio], linhas[meio:]) if linhas else (None, None)
+        enviados_a, falhas_a = enviar_lote(client, tabela, registros[:meio], primeira_linha, linhas_a, metodo)
+        enviados_b, falhas_b = enviar_lote(client, tabela, registros[meio:], primeira_linha + meio, linhas_b, metodo)
+        return enviados_a + enviados_b, falhas_a + falhas_b
+
+
+def restaurar_tabela(client, z, tabela, chave, estado, tamanho_lote=TAMANHO_LOTE_RESTAURACAO,
+                     total=None, ao_progresso=None, trava=None, cancelado=None):
+    """Restaura o arquivo da tabela em lotes, salvando o checkpoint após cada lote confirmado.
+
+    Retoma a partir da última linha registrada em `estado`. Retorna o número de linhas enviadas.
+    Com tabelas em paralelo, `trava` protege o `estado` compartilhado e a gravação do checkpoint.
+    """
+    trava = trava or threading.Lock()
+    nome_arquivo = arquivo_da_tabela(z.namelist(), tabela)
+    with trava:
+        feitas = estado["linhas"].get(tabela, 0)
+        falhas = estado["falhas"].setdefault(tabela, [])
+    enviados = 0
+
+    if total is None:
+        total = contar_linhas(z, nome_arquivo)
+
+    for registros in ler_registros_em_lotes(z, nome_arquivo, tabela, tamanho_lote, pular=feitas):
+        if cancelado is not None and cancelado.is_set():
+            return enviados
+
+        ok, falhas_lote = enviar_lote(client, tabela, registros, feitas + 1)
+
+        enviados += ok
+        feitas += len(registros)
+        with trava:
+            falhas.extend([linha, erro] for linha, erro in falhas_lote)
+            del falhas[MAX_FALHAS_CHECKPOINT:]
+            estado["linhas"][tabela] = feitas
+            salvar_checkpoint(chave, estado)
+
+        if ao_progresso:
+            ao_progresso(tabela, feitas, total)
+
+    with trava:
+        estado["concluidas"].append(tabela)
+        salvar_checkpoint(chave, estado)
+    return enviados
+
+
+def limpar_tabela(client, tabela):
+    # Pode falhar se uma tabela fora do backup ainda referenciar esta; segue só com o upsert
+    try:
+        client.table(tabela).delete().neq("id", 0).execute()
+    except Exception:
+        pass
+
+
+def aplicar_remocoes(client, tabelas, manifesto, ao_remover=None):
+    """Remove os IDs registrados num backup diferencial (tabelas dependentes primeiro)."""
+    for tabela in reversed(ordem_topologica(tabelas)):
+        removidos = list(expandir_intervalos(manifesto["tabelas"].get(tabela, {}).get("removidos", [])))
+        for inicio in range(0, len(removidos), LOTE_REMOCAO):
+            client.table(tabela).delete().in_("id", removidos[inicio:inicio + LOTE_REMOCAO]).execute()
+        if removidos and ao_remover:
+            ao_remover(tabela, len(removidos))
+
+
+def _restaurar_em_thread(client, z, tabela, chave, estado, tamanho_lote, total, trava, eventos, cancelado):
+    """Executa `restaurar_tabela` num worker, repassando progresso e resultado pela fila de eventos."""
+    try:
+        enviados = restaurar_tabela(
+            client, z, tabela, chave, estado, tamanho_lote, total,
+            lambda tabela, linhas, total: eventos.put(("progresso", tabela, (linhas, total))),
+            trava, cancelado,
+        )
+        eventos.put(("concluida", tabela, enviados))
+    except Exception as e:
+        eventos.put(("erro", tabela, e))
+
+
+def restaurar_backup(client, z, tabelas, chave, manifesto=None, tamanho_lote=TAMANHO_LOTE_RESTAURACAO,
+                     limpar_antes=False, ao_progresso=None, ao_concluir_tabela=None, ao_remover=None,
+                     max_conexoes=MAX_CONEXOES_RESTAURACAO):
+    """Restaura um backup (ZipFile aberto), retomando do checkpoint.
+
+    As tabelas são restauradas por nível do grafo de chaves estrangeiras: as de um mesmo
+    nível em paralelo, e cada nível só depois do anterior. A limpeza (`limpar_antes`)
+    segue a ordem inversa. Os callbacks rodam na thread chamadora, então podem
+    atualizar elementos do Streamlit.
+
+    Retorna {tabela: falhas} com as linhas que não puderam ser gravadas.
+    O checkpoint é removido ao final de uma restauração completa.
+    """
+    estado = carregar_checkpoint(chave)
+    nomes = set(z.namelist())
+    niveis = niveis_dependencia([tabela for tabela in tabelas if arquivo_da_tabela(nomes, tabela)])
+
+    trava = threading.Lock()
+    eventos = queue.Queue()
+    cancelado = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix="restauracao") as threads:
+        try:
+            # Limpeza só ao começar do zero (não ao retomar), dependentes antes das referenciadas
+            if limpar_antes and not estado["linhas"] and not estado["concluidas"]:
+                for nivel in reversed(niveis):
+                    list(threads.map(lambda tabela: limpar_tabela(client, tabela), nivel))
+
+            for nivel in niveis:
+                pendentes = [tabela for tabela in nivel if tabela not in estado["concluidas"]]
+                for tabela in pendentes:
+                    total = None
+                    if manifesto and tabela in manifesto["tabelas"]:
+                        total = manifesto["tabelas"][tabela]["registros"]
+                    threads.submit(
+                        _restaurar_em_thread, client, z, tabela, chave, estado, tamanho_lote,
+                        total, trava, eventos, cancelado,
+                    )
+
+                restantes = len(pendentes)
+                while restantes:
+                    tipo, tabela, valor = eventos.get()
+
+                    if tipo == "erro":
+                        raise RuntimeError(f"Falha ao restaurar '{tabela}': {valor}") from valor
+
+                    if tipo == "progresso":
+                        if ao_progresso:
+                            ao_progresso(tabela, *valor)
+                        continue
+
+                    restantes -= 1
+                    if ao_concluir_tabela:
+                        ao_concluir_tabela(tabela, valor, estado["falhas"].get(tabela, []))
+        except BaseException:
+            cancelado.set()
+            raise
+
+    if manifesto and manifesto["tipo"] == "diferencial" and not estado.get("remocoes_aplicadas"):
+        aplicar_remocoes(client, tabelas, manifesto, ao_remover)
+        estado["remocoes_aplicadas"] = True
+        salvar_checkpoint(chave, estado)
+
+    remover_checkpoint(chave)
+    return {tabela: falhas for tabela, falhas in estado["falhas"].items() if falhas}
+
+
+# --- Restauração Delta ---
+# Compara o hash de cada linha do backup com o da linha viva (pela chave primária)
+# e grava apenas as linhas novas ou alteradas. Não usa checkpoint: refazer a análise
+# depois de uma interrupção encontra só o que ainda falta.
+def normalizar_linhas(df, tabela):
+    """DataFrame com a mesma conversão de tipos da restauração e as datas como instantes.
+
+    O texto vindo do CSV, do Parquet ou do banco fica igual para o mesmo valor.
+    """
+    df = coagir_tipos(df, tabela)
+    tipos = tipos_da_tabela(tabela)
+    for coluna in df.columns:
+        tipo = tipos.get(coluna)
+        if tipo == "data_hora":
+            df[coluna] = pd.to_datetime(df[coluna], utc=True, format="ISO8601")
+        elif tipo == "data":
+            df[coluna] = pd.to_datetime(df[coluna], format="ISO8601")
+        elif tipo is None:
+            # Colunas fora do esquema são comparadas como texto
+            df[coluna] = df[coluna].astype("string")
+    return df
+
+
+def hash_linhas(registros, colunas, tabela):
+    """Hash de 64 bits de cada registro, indexado pelo id (vetorizado pelo pandas)."""
+    df = normalizar_linhas(pd.DataFrame(registros, columns=colunas), tabela)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return pd.Series(hashes, index=df["id"].to_numpy(dtype="int64"))
+
+
+def _hashes_do_arquivo(z, nome_arquivo, tabela, tamanho_lote):
+    colunas = None
+    partes = []
+    for registros in ler_registros_em_lotes(z, nome_arquivo, tabela, tamanho_lote):
+        colunas = colunas or list(registros[0].keys())
+        partes.append(hash_linhas(registros, colunas, tabela))
+    if not partes:
+        return colunas, pd.Series(dtype="uint64")
+    return colunas, pd.concat(partes)
+
+
+def _hashes_do_banco(client, tabela, colunas, tamanho_lote):
+    partes = [
+        hash_linhas(lote, colunas, tabela)
+        for lote in ler_tabela_em_lotes(client, tabela, ",".join(colunas), tamanho_lote=tamanho_lote)
+    ]
+    if not partes:
+        return pd.Series(dtype="uint64")
+    return pd.concat(partes)
+
+
+def _planejar_tabela(client, z, tabela, tamanho_lote, remover_ausentes):
+    nome_arquivo = arquivo_da_tabela(z.namelist(), tabela)
+    colunas, arquivo = _hashes_do_arquivo(z, nome_arquivo, tabela, tamanho_lote)
+    if colunas is None:
+        banco = pd.Series(dtype="uint64")
+    else:
+        banco = _hashes_do_banco(client, tabela, colunas, TAMANHO_LOTE_LEITURA)
+
+    comuns = arquivo.index.intersection(banco.index)
+    inserir = arquivo.index.difference(banco.index)
+    alterados = arquivo.loc[comuns].to_numpy() != banco.loc[comuns].to_numpy()
+    atualizar = comuns[alterados]
+    remover = banco.index.difference(arquivo.index) if remover_ausentes else pd.Index([], dtype="int64")
+
+    return {
+        "inserir": len(inserir),
+        "atualizar": len(atualizar),
+        "iguais": len(comuns) - len(atualizar),
+        "remover": len(remover),
+        "ids_gravar": np.sort(np.concatenate([inserir.to_numpy(), atualizar.to_numpy()])),
+        "ids_remover": np.sort(remover.to_numpy()),
+    }
+
+
+def planejar_delta(client, z, tabelas, tamanho_lote=TAMANHO_LOTE_RESTAURACAO, remover_ausentes=False,
+                   manifesto=None, max_conexoes=MAX_CONEXOES_RESTAURACAO):
+    """Simulação da restauração delta: o que seria inserido, atualizado e removido por tabela.
+
+    Nada é gravado. As tabelas são analisadas em paralelo. Retorna {tabela: plano}, com as
+    contagens e os IDs usados por `aplicar_delta`.
+    """
+    if manifesto and manifesto["tipo"] == "diferencial":
+        raise ValueError("A restauração delta exige um backup completo.")
+
+    nomes = set(z.namelist())
+    presentes = [tabela for tabela in ordem_topologica(tabelas) if arquivo_da_tabela(nomes, tabela)]
+    with ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix="delta") as threads:
+        futuros = {
+            tabela: threads.submit(_planejar_tabela, client, z, tabela, tamanho_lote, remover_ausentes)
+            for tabela in presentes
+        }
+        return {tabela: futuro.result() for tabela, futuro in futuros.items()}
+
+
+def resumo_delta(plano):
+    """Contagens do plano em linhas prontas para um DataFrame."""
+    return [
+        {"Tabela": tabela, "Inserir": p["inserir"], "Atualizar": p["atualizar"],
+         "Remover": p["remover"], "Sem alteração": p["iguais"]}
+        for tabela, p in plano.items()
+    ]
+
+
+def aplicar_delta(client, z, plano, tamanho_lote=TAMANHO_LOTE_RESTAURACAO, ao_progresso=None,
+                  ao_concluir_tabela=None, ao_remover=None):
+    """Grava só as linhas do plano: upserts na ordem das dependências, remoções na ordem inversa.
+
+    Retorna {tabela: falhas} como `restaurar_backup`.
+    """
+    falhas_totais = {}
+    for tabela in ordem_topologica(list(plano)):
+        ids_gravar = plano[tabela]["ids_gravar"]
+        if not len(ids_gravar):
+            continue
+
+        nome_arquivo = arquivo_da_tabela(z.namelist(), tabela)
+        total = len(ids_gravar)
+        feitas = enviados = 0
+        falhas = []
+        linha = 0
+        for registros in ler_registros_em_lotes(z, nome_arquivo, tabela, tamanho_lote):
+            ids = np.fromiter((r["id"] for r in registros), dtype="int64", count=len(registros))
+            posicoes = np.flatnonzero(np.isin(ids, ids_gravar)).tolist()
+            if posicoes:
+                selecionados = [registros[i] for i in posicoes]
+                ok, falhas_lote = enviar_lote(
+                    client, tabela, selecionados, 0, [linha + i + 1 for i in posicoes]
+                )
+                enviados += ok
+                feitas += len(selecionados)
+                falhas.extend([numero, erro] for numero, erro in falhas_lote)
+                if ao_progresso:
+                    ao_progresso(tabela, feitas, total)
+            linha += len(registros)
+
+        if falhas:
+            falhas_totais[tabela] = falhas
+        if ao_concluir_tabela:
+            ao_concluir_tabela(tabela, enviados, falhas)
+
+    for tabela in reversed(ordem_topologica(list(plano))):
+        removidos = plano[tabela]["ids_remover"].tolist()
+        for inicio in range(0, len(removidos), LOTE_REMOCAO):
+            client.table(tabela).delete().in_("id", removidos[inicio:inicio + LOTE_REMOCAO]).execute()
+        if removidos and ao_remover:
+            ao_remover(tabela, len(removidos))
+
+    return falhas_totais
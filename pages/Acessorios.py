@@ -1,4 +1,5 @@
 from utils import verificar_autenticacao
+from dados import carregar_referencias
 import streamlit as st
 import pandas as pd
 import datetime
@@ -23,14 +24,13 @@ def formatar_nf_padrao(valor_nf):
 # --- Funções do Banco de Dados ---
 def carregar_dados_auxiliares():
     try:
-        lojas = supabase.table("lojas").select("id, nome").order("nome").execute().data
-        colaboradores = supabase.table("colaboradores").select("id, nome").order("nome").execute().data
+        lojas, colaboradores = carregar_referencias("lojas", "colaboradores")
         
         # Puxa modelos únicos que já estão no estoque de acessórios
         estoque_atual = supabase.table("capas_peliculas").select("modelo").execute().data
         modelos_estoque = [item['modelo'] for item in estoque_atual] if estoque_atual else []
         
-        return lojas, colaboradores, modelos_estoque
+        return lojas.registros, colaboradores.registros, modelos_estoque
     except Exception as e:
         st.error(f"Erro ao carregar opções: {e}")
         return [], [], []
@@ -1,24 +1,35 @@
 from utils import verificar_autenticacao
+from dados import carregar_referencias, buscar_pagina
+from componentes import grade_editavel, salvar_alteracoes
 import streamlit as st
 import pandas as pd
 
 # --- Conexão com Supabase ---
 supabase = verificar_autenticacao()
 
-# --- Função de Carregamento Centralizada e com Cache ---
-def fetch_table(table_name, select_query="*"):
-    return supabase.table(table_name).select(select_query).execute().data
+# --- Paginação da Lista ---
+COLUNAS_GRADE = "id, serial, valor, modelo_id, status_id, usuario_id, local_id, estado_id"
+TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+def avancar_pagina(ultimo_id):
+    st.session_state.ativos_cursores.append(ultimo_id)
 
+def voltar_pagina():
+    st.session_state.ativos_cursores.pop()
+
+# --- Função de Carregamento Centralizada e com Cache ---
 def carregar_dados_sistema():
     try:
+        categorias, setores, status, estados, colaboradores, modelos = carregar_referencias(
+            "categorias", "setores", "status", "estados", "colaboradores", "modelos"
+        )
         dados = {
-            "ativos": fetch_table("ativos"),
-            "categorias": fetch_table("categorias", "id, nome"),
-            "setores": fetch_table("setores", "id, nome"),
-            "status": fetch_table("status", "id, nome"),
-            "estados": fetch_table("estados", "id, nome"),
-            "colaboradores": fetch_table("colaboradores", "id, nome"),
-            "modelos": fetch_table("modelos", "id, nome, categoria_id, marcas(nome)")
+            "categorias": categorias,
+            "setores": setores,
+            "status": status,
+            "estados": estados,
+            "colaboradores": colaboradores,
+            "modelos": modelos
         }
         return dados
     except Exception as e:
@@ -32,51 +43,77 @@ dados = carregar_dados_sistema()
 if not dados:
     st.stop()
 
-def criar_mapas(lista_dados, chave_valor="id", chave_nome="nome"):
-    map_inv = {item[chave_valor]: item[chave_nome] for item in lista_dados}
-    map_dir = {item[chave_nome]: item[chave_valor] for item in lista_dados}
-    return map_inv, map_dir
-
-# Processamento especial para Modelos (Nome + Marca)
-lista_modelos_processada = []
-for m in dados["modelos"]:
-    marca = m.get('marcas', {}).get('nome', 'S/M')
-    nome_completo = f"{marca} - {m['nome']}"
-    lista_modelos_processada.append({
-        "id": m["id"], 
-        "nome": nome_completo, 
-        "categoria_id": m["categoria_id"]
-    })
+# Modelos já vêm com o rótulo "Marca - Modelo" montado pelo repositório
+lista_modelos_processada = [
+    {"id": m["id"], "nome": dados["modelos"].por_id[m["id"]], "categoria_id": m["categoria_id"]}
+    for m in dados["modelos"].registros
+]
 
 # Mapas Gerais
-map_cats_inv, map_cats = criar_mapas(dados["categorias"])
-map_setor_inv, map_setor = criar_mapas(dados["setores"])
-map_status_inv, map_status = criar_mapas(dados["status"])
-map_estado_inv, map_estado = criar_mapas(dados["estados"])
-map_user_inv, map_user = criar_mapas(dados["colaboradores"])
-map_model_inv, map_model = criar_mapas(lista_modelos_processada)
+map_cats_inv, map_cats = dados["categorias"].por_id, dados["categorias"].por_nome
+map_setor_inv, map_setor = dados["setores"].por_id, dados["setores"].por_nome
+map_status_inv, map_status = dados["status"].por_id, dados["status"].por_nome
+map_estado_inv, map_estado = dados["estados"].por_id, dados["estados"].por_nome
+map_user_inv, map_user = dados["colaboradores"].por_id, dados["colaboradores"].por_nome
+map_model_inv, map_model = dados["modelos"].por_id, dados["modelos"].por_nome
 
 # --- Interface ---
 tab_lista, tab_cadastro = st.tabs(["Lista de Ativos", "Cadastrar Novo"])
 
 # --- ABA 01: Lista (Edição) ---
 with tab_lista:
-    if not dados["ativos"]:
-        st.info("Nenhum ativo cadastrado.")
+    # 1. Filtros (aplicados direto na consulta ao banco)
+    col_f1, col_f2, col_f3, col_f4, col_f5 = st.columns([2, 2, 2, 2, 1])
+    cat_filtro = col_f1.selectbox("Filtrar por Categoria", ["Todas"] + list(map_cats.keys()))
+    status_filtro = col_f2.selectbox("Status", ["Todos"] + list(map_status.keys()))
+    setor_filtro = col_f3.selectbox("Setor", ["Todos"] + list(map_setor.keys()))
+    user_filtro = col_f4.selectbox("Usuário", ["Todos", "Nenhum (Estoque)"] + list(map_user.keys()))
+    tamanho_pagina = col_f5.selectbox("Por página", TAMANHOS_PAGINA, index=1)
+
+    colunas = COLUNAS_GRADE
+    filtros = {}
+    if cat_filtro != "Todas":
+        # Join com modelos para filtrar pela categoria no próprio PostgREST
+        colunas += ", modelos!inner(categoria_id)"
+        filtros["modelos.categoria_id"] = map_cats[cat_filtro]
+    if status_filtro != "Todos":
+        filtros["status_id"] = map_status[status_filtro]
+    if setor_filtro != "Todos":
+        filtros["local_id"] = map_setor[setor_filtro]
+    if user_filtro == "Nenhum (Estoque)":
+        filtros["usuario_id"] = None
+    elif user_filtro != "Todos":
+        filtros["usuario_id"] = map_user[user_filtro]
+
+    # 2. Cursores das páginas (reiniciam quando filtros ou tamanho mudam)
+    chave_consulta = (colunas, tuple(sorted(filtros.items())), tamanho_pagina)
+    if st.session_state.get("ativos_consulta") != chave_consulta:
+        st.session_state.ativos_consulta = chave_consulta
+        st.session_state.ativos_cursores = [None]
+
+    cursores = st.session_state.ativos_cursores
+    pagina_atual = len(cursores) - 1
+
+    try:
+        registros, restantes = buscar_pagina(
+            supabase, "ativos", colunas, filtros, apos=cursores[-1], tamanho=tamanho_pagina
+        )
+    except Exception as e:
+        st.error(f"Erro ao carregar ativos: {e}")
+        registros, restantes = [], 0
+
+    # Todas as páginas anteriores estão cheias, então o total sai da contagem restante
+    total_ativos = pagina_atual * tamanho_pagina + restantes
+    total_paginas = max(1, -(-total_ativos // tamanho_pagina))
+
+    if not registros:
+        if pagina_atual > 0:
+            # A página ficou vazia (ex: itens removidos): volta para o início
+            st.session_state.ativos_cursores = [None]
+            st.rerun()
+        st.info("Nenhum ativo encontrado.")
     else:
-        # 1. Filtros
-        col_f1, col_f2 = st.columns([1, 3])
-        cat_filtro = col_f1.selectbox("Filtrar por Categoria", ["Todas"] + list(map_cats.keys()))
-        
-        # 2. Prepara DataFrame
-        df = pd.DataFrame(dados["ativos"])
-        
-        # Aplica Filtro (usando Pandas é mais rápido)
-        if cat_filtro != "Todas":
-            id_cat = map_cats[cat_filtro]
-            # Pega IDs de modelos dessa categoria
-            ids_mods = [m['id'] for m in lista_modelos_processada if m['categoria_id'] == id_cat]
-            df = df[df['modelo_id'].isin(ids_mods)]
+        df = pd.DataFrame(registros)
 
         # 3. Mapeamento Visual (Substitui IDs por Nomes)
         df_view = pd.DataFrame()
@@ -90,11 +127,8 @@ with tab_lista:
         df_view["estado"] = df["estado_id"].map(map_estado_inv)
 
         # 4. Data Editor
-        edited_df = st.data_editor(
+        edited_df, alteradas = grade_editavel(
             df_view,
-            width="stretch",
-            hide_index=True,
-            num_rows="fixed",
             disabled=["id"],
             column_config={
                 "id": None,
@@ -108,31 +142,39 @@ with tab_lista:
             }
         )
 
-        # 5. Salvar Alterações
+        # 5. Navegação
+        col_ant, col_info, col_prox = st.columns([1, 3, 1])
+        col_ant.button("◀ Anterior", on_click=voltar_pagina, disabled=pagina_atual == 0, width="stretch")
+        col_info.caption(f"Página {pagina_atual + 1} de {total_paginas} · {total_ativos} ativos encontrados")
+        col_prox.button(
+            "Próxima ▶",
+            on_click=avancar_pagina,
+            args=(registros[-1]["id"],),
+            disabled=restantes <= len(registros),
+            width="stretch"
+        )
+
+        # 6. Salvar Alterações
         if st.button("Salvar Alterações da Tabela"):
-            updates_count = 0
-
-            for i, row in edited_df.iterrows():
-                item_id = int(row["id"])
-                original = df[df['id'] == item_id].iloc[0]
-                novo_modelo_id = map_model.get(row["modelo"])
-                
-                payload = {
-                    "serial": row["serial"],
-                    "valor": row["valor"],
-                    "modelo_id": novo_modelo_id,
-                }
-                
-                try:
-                    supabase.table("ativos").update(payload).eq("id", item_id).execute()
-                    updates_count += 1
-                except Exception as e:
-                    st.error(f"Erro no ID {item_id}: {e}")
-
-            if updates_count > 0:
-                st.success("Dados atualizados!")
-                st.cache_data.clear()
-                st.rerun()
+            if alteradas.empty:
+                st.info("Nenhuma alteração detectada.")
+            else:
+                # Linha completa da grade (colunas não editáveis vêm do banco) num único upsert
+                payload = df.loc[alteradas.index, COLUNAS_GRADE.split(", ")].assign(
+                    serial=alteradas["serial"],
+                    valor=alteradas["valor"],
+                    modelo_id=alteradas["modelo"].map(map_model),
+                )
+                updates_count = salvar_alteracoes(supabase, "ativos", payload)
+
+                if updates_count == len(payload):
+                    st.success("Dados atualizados!")
+                    st.cache_data.clear()
+                    st.rerun()
+                elif updates_count > 0:
+                    # Mantém a tela para os erros das linhas que falharam continuarem visíveis
+                    st.warning(f"{updates_count} de {len(payload)} ativos atualizados.")
+                    st.cache_data.clear()
 
 # --- ABA 2: Cadastro ---
 with tab_cadastro:
@@ -1,9 +1,22 @@
 import streamlit as st
 import pandas as pd
 import zipfile
-import io
-import numpy as np
 from utils import verificar_autenticacao
+from esquema import ordem_topologica
+from motor_backup import (
+    gerar_backup, estimar_backup, ler_manifesto, ordenar_cadeia, codificar_lote_csv,
+    novo_arquivo_temporario, remover_arquivo, NOME_ARQUIVO_BACKUP, NOME_ARQUIVO_DIFERENCIAL, FORMATO_CSV,
+)
+from repositorio_backup import (
+    guardar_backup, listar_snapshots, exportar_snapshot, aplicar_retencao, coletar_lixo,
+    tamanho_repositorio, PASTA_REPOSITORIO, RETENCAO_DIARIOS, RETENCAO_SEMANAIS,
+)
+from agendador import agendador_backup, RETENCAO_AGENDADA
+from comparacao import comparar_backups, resumo_comparacao, COLUNAS_DIFERENCAS
+from motor_restauracao import (
+    restaurar_backup, chave_arquivo, existe_checkpoint, remover_checkpoint,
+    planejar_delta, aplicar_delta, resumo_delta, verificar_backup,
+)
 
 # --- Autenticação e Conexão ---
 supabase = verificar_autenticacao()
@@ -12,48 +25,42 @@ st.title("Sistema de Backup e Restauração")
 st.warning("Atenção: Não altere os arquivos do backup, isso impede o arquivo de ser lido na aba Restaurar.")
 
 # --- Definição de Tabelas ---
-TABELAS_ORDENADAS = [
-    "marcas", "modelos", "setores", "status", "colaboradores", # Cadastros Básicos
-    "ativos",                                             # Depende dos anteriores
-    "movimentacoes", "manutencoes"                        # Dependem de ativos
-]
+# Todas as tabelas do esquema, das referenciadas para as dependentes (chaves estrangeiras)
+TABELAS_ORDENADAS = ordem_topologica()
 
 # --- Função de Estimativa ---
-def calcular_estatisticas():
-    """Consulta o banco apenas para contar linhas e estimar tamanho."""
-    total_linhas = 0
-    detalhes = {}
-    
-    # Peso médio estimado por linha em CSV (0.15 KB é uma média conservadora para texto)
-    PESO_MEDIO_KB = 0.15 
-    
-    for tabela in TABELAS_ORDENADAS:
-        # O parâmetro count='exact', head=True retorna apenas o número, sem baixar os dados
-        res = supabase.table(tabela).select("*", count="exact", head=True).execute()
-        count = res.count
-        total_linhas += count
-        detalhes[tabela] = count
-        
-    tamanho_est_kb = total_linhas * PESO_MEDIO_KB
-    
-    # Formatação do tamanho
-    if tamanho_est_kb > 1024:
-        tamanho_str = f"{tamanho_est_kb/1024:.2f} MB"
-    else:
-        tamanho_str = f"{tamanho_est_kb:.1f} KB"
-        
+@st.cache_data(ttl=60, show_spinner=False)
+def calcular_estatisticas(formato):
+    """Conta linhas (em paralelo) e estima o tamanho do zip a partir de uma amostra real."""
+    estimativas = estimar_backup(supabase, TABELAS_ORDENADAS, formato=formato)
+
+    detalhes = {tabela: registros for tabela, (registros, _) in estimativas.items()}
+    total_linhas = sum(detalhes.values())
+    tamanho_str = formatar_tamanho(sum(tamanho for _, tamanho in estimativas.values()))
+
     return total_linhas, tamanho_str, detalhes
 
+def formatar_tamanho(tamanho_bytes):
+    if tamanho_bytes > 1024 * 1024:
+        return f"{tamanho_bytes / (1024 * 1024):.2f} MB"
+    return f"{tamanho_bytes / 1024:.1f} KB"
+
 # --- Estrutura de Abas ---
-aba_backup, aba_restore = st.tabs(["Gerar Backup", "Restaurar Banco de Dados"])
+aba_backup, aba_restore, aba_comparar = st.tabs(["Gerar Backup", "Restaurar Banco de Dados", "Comparar Backups"])
 
 # --- Aba 1: Gerar Backup ---
 with aba_backup:
     st.header("Criar Backup do Banco de Dados")
 
+    formato_colunar = st.toggle(
+        "Formato colunar (Parquet)",
+        help="Arquivos menores e mais rápidos, com os tipos preservados. Desative para gerar CSVs que abrem no Excel."
+    )
+    formato_backup = "parquet" if formato_colunar else "csv"
+
     with st.container(border=True):
         with st.spinner("Analisando tabelas..."):
-            total_reg, tamanho_est, detalhes_tab = calcular_estatisticas()
+            total_reg, tamanho_est, detalhes_tab = calcular_estatisticas(formato_backup)
 
             # Layout em 3 colunas de métricas
             col1, col2, col3 = st.columns(3)
@@ -65,101 +72,419 @@ with aba_backup:
             with st.expander("Ver detalhes por tabela"):
                 st.json(detalhes_tab)
 
-    if st.button("Gerar Backup"):
+    tipo_backup = st.radio(
+        "Tipo de backup",
+        ["Completo", "Diferencial"],
+        horizontal=True,
+        help="O diferencial exporta apenas o que mudou desde o backup anterior (enviado abaixo)."
+    )
+
+    manifesto_anterior = None
+    if tipo_backup == "Diferencial":
+        arquivo_anterior = st.file_uploader(
+            "Backup anterior (último completo ou diferencial da cadeia)", type="zip", key="backup_anterior"
+        )
+        if arquivo_anterior is not None:
+            manifesto_anterior = ler_manifesto(arquivo_anterior)
+            if manifesto_anterior is None:
+                st.error("Este backup não possui manifesto. Gere um backup completo para iniciar a cadeia.")
+
+    guardar_no_repositorio = st.checkbox(
+        "Guardar também no repositório local",
+        disabled=tipo_backup == "Diferencial",
+        help="Guarda o backup deduplicado no servidor: só as partes que mudaram ocupam espaço novo."
+    )
+
+    if st.button("Gerar Backup", disabled=tipo_backup == "Diferencial" and manifesto_anterior is None):
         with st.spinner("Compilando dados de todas as tabelas..."):
             try:
-                # Buffer em memória para o arquivo ZIP
-                zip_buffer = io.BytesIO()
-
-                with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                    total_registros = 0
-                    
-                    for tabela in TABELAS_ORDENADAS:
-                        # Busca todos os dados da tabela
-                        response = supabase.table(tabela).select("*").execute()
-                        dados = response.data
-                        
-                        if dados:
-                            df = pd.DataFrame(dados)
-                            total_registros += len(df)
-                            
-                            # Converte para CSV
-                            csv_data = df.to_csv(index=False, sep=";", decimal=",", encoding="utf-8-sig")
-                            
-                            # Adiciona ao ZIP
-                            zip_file.writestr(f"{tabela}.csv", csv_data)
-                
-                # Finaliza o ZIP
-                zip_buffer.seek(0)
+                # O zip é escrito em disco, em streaming; remove o arquivo da geração anterior
+                remover_arquivo(st.session_state.get("backup_arquivo"))
+                caminho_backup = novo_arquivo_temporario()
+                st.session_state.backup_arquivo = caminho_backup
+
+                # Progresso por tabela (as tabelas são exportadas em paralelo)
+                barras = {}
+                for tabela in TABELAS_ORDENADAS:
+                    barras[tabela] = st.progress(0.0, text=f"{tabela}: aguardando...")
+
+                def atualizar_progresso(tabela, registros, concluida):
+                    esperado = detalhes_tab.get(tabela) or 1
+                    fracao = 1.0 if concluida else min(registros / esperado, 0.99)
+                    situacao = "concluída" if concluida else "exportando"
+                    barras[tabela].progress(fracao, text=f"{tabela}: {registros} registros ({situacao})")
+
+                manifesto = gerar_backup(
+                    supabase,
+                    TABELAS_ORDENADAS,
+                    caminho_backup,
+                    ao_progresso=atualizar_progresso,
+                    manifesto_anterior=manifesto_anterior,
+                    formato=formato_backup
+                )
+                total_registros = sum(info["registros"] for info in manifesto["tabelas"].values())
+
                 st.success(f"Backup gerado com sucesso! Total de {total_registros} registros processados.")
+
+                if guardar_no_repositorio and tipo_backup == "Completo":
+                    guardado = guardar_backup(caminho_backup)
+                    st.info(
+                        f"Guardado no repositório local: {formatar_tamanho(guardado['bytes_novos'])} novos "
+                        f"de {formatar_tamanho(guardado['bytes_originais'])}."
+                    )
                 
                 # Botão de Download
-                st.download_button(
-                    label="Baixar Arquivo de Backup (.zip)",
-                    data=zip_buffer,
-                    file_name="officeflow_full_backup.zip",
-                    mime="application/zip"
-                )
+                with open(caminho_backup, "rb") as arquivo_backup:
+                    st.download_button(
+                        label="Baixar Arquivo de Backup (.zip)",
+                        data=arquivo_backup,
+                        file_name=NOME_ARQUIVO_DIFERENCIAL if manifesto_anterior else NOME_ARQUIVO_BACKUP,
+                        mime="application/zip"
+                    )
 
             except Exception as e:
                 st.error(f"Erro ao gerar backup: {e}")
 
+    # --- Repositório Local ---
+    with st.expander("Repositório local de backups"):
+        snapshots = listar_snapshots()
+        st.caption(
+            f"Pasta: {PASTA_REPOSITORIO} · {len(snapshots)} backups · "
+            f"{formatar_tamanho(tamanho_repositorio())} em disco"
+        )
+
+        if snapshots:
+            df_snapshots = pd.DataFrame(snapshots)
+            df_snapshots["bytes"] = df_snapshots["bytes"].map(formatar_tamanho)
+            st.dataframe(
+                df_snapshots.rename(columns={
+                    "id": "ID", "criado_em": "Criado em", "formato": "Formato",
+                    "registros": "Registros", "bytes": "Tamanho",
+                }),
+                width="stretch",
+                hide_index=True
+            )
+
+            id_snapshot = st.selectbox(
+                "Backup para download",
+                [s["id"] for s in snapshots],
+                format_func=lambda id_: next(s["criado_em"] for s in snapshots if s["id"] == id_)
+            )
+            if st.button("Preparar download"):
+                with st.spinner("Remontando o arquivo..."):
+                    remover_arquivo(st.session_state.get("snapshot_arquivo"))
+                    caminho_snapshot = novo_arquivo_temporario()
+                    st.session_state.snapshot_arquivo = caminho_snapshot
+                    exportar_snapshot(id_snapshot, caminho_snapshot)
+                with open(caminho_snapshot, "rb") as arquivo_snapshot:
+                    st.download_button(
+                        label="Baixar Backup do Repositório (.zip)",
+                        data=arquivo_snapshot,
+                        file_name=NOME_ARQUIVO_BACKUP,
+                        mime="application/zip"
+                    )
+
+        st.markdown("###### Retenção")
+        col_diarios, col_semanais = st.columns(2)
+        # Começa pela política do agendador (se configurada), para as duas não se desfazerem
+        diarios_padrao, semanais_padrao = RETENCAO_AGENDADA or (RETENCAO_DIARIOS, RETENCAO_SEMANAIS)
+        diarios = col_diarios.number_input("Dias mantidos", min_value=1, value=diarios_padrao)
+        semanais = col_semanais.number_input("Semanas mantidas", min_value=0, value=semanais_padrao)
+        if st.button("Aplicar retenção e liberar espaço"):
+            with st.spinner("Removendo backups antigos..."):
+                removidos = aplicar_retencao(int(diarios), int(semanais))
+                blocos, liberados = coletar_lixo()
+            st.success(f"{len(removidos)} backups removidos, {formatar_tamanho(liberados)} liberados.")
+
+    # --- Backups Automáticos ---
+    with st.expander("Backups automáticos"):
+        agendador = agendador_backup()
+        if agendador.agenda is None:
+            st.info("Agendador desativado (defina OFFICEFLOW_AGENDA_BACKUP no formato do cron para ativar).")
+        else:
+            proxima = agendador.proxima_execucao
+            st.caption(
+                f"Agenda: `{agendador.agenda.expressao}` · Próxima execução: "
+                f"{proxima.strftime('%d/%m/%Y %H:%M') if proxima else '-'} · "
+                "Os backups são guardados no repositório local."
+            )
+        if agendador.retencao:
+            st.caption(
+                f"Retenção automática: {agendador.retencao[0]} dias e {agendador.retencao[1]} semanas "
+                "(aplicada após cada execução)."
+            )
+        else:
+            st.caption(
+                "Sem retenção automática: nenhum backup é removido pelo agendador "
+                "(defina OFFICEFLOW_RETENCAO_DIARIOS e OFFICEFLOW_RETENCAO_SEMANAIS para ativar)."
+            )
+
+        if agendador.em_execucao:
+            st.info(f"Backup em andamento desde {agendador.em_execucao.strftime('%H:%M:%S')}.")
+        if st.button("Executar agora", disabled=agendador.em_execucao is not None):
+            # Roda em segundo plano: a página não fica presa durante o backup
+            if agendador.executar_em_segundo_plano():
+                st.success("Backup iniciado em segundo plano. Atualize a página para acompanhar.")
+            else:
+                st.warning("Já existe um backup em andamento.")
+
+        historico = agendador.historico()
+        if historico:
+            df_historico = pd.DataFrame(historico).reindex(
+                columns=["inicio", "origem", "situacao", "duracao", "registros", "bytes", "bytes_novos", "removidos", "erro"]
+            )
+            for coluna in ["bytes", "bytes_novos"]:
+                df_historico[coluna] = df_historico[coluna].map(
+                    lambda valor: formatar_tamanho(valor) if pd.notna(valor) else "-"
+                )
+            st.dataframe(
+                df_historico.rename(columns={
+                    "inicio": "Início", "origem": "Origem", "situacao": "Situação", "duracao": "Duração (s)",
+                    "registros": "Registros", "bytes": "Tamanho", "bytes_novos": "Novos no repositório",
+                    "removidos": "Backups removidos", "erro": "Erro",
+                }),
+                width="stretch",
+                hide_index=True
+            )
+        else:
+            st.caption("Nenhuma execução registrada.")
+
 # --- Aba 2: Restaurar Backup ---
 with aba_restore:
     st.header("Restaurar Banco de Dados")
     st.warning("Atenção: A restauração pode sobrescrever dados existentes!")
     
-    arquivo_zip = st.file_uploader("Upload do arquivo de backup (.zip)", type="zip")
+    arquivos_zip = st.file_uploader(
+        "Upload do arquivo de backup (.zip)",
+        type="zip",
+        accept_multiple_files=True,
+        help="Para backups diferenciais, envie o backup completo e todos os diferenciais da cadeia."
+    )
     
-    # Opção perigosa para limpar antes de restaurar
-    limpar_antes = st.checkbox("Limpar tabelas antes de restaurar (Recomendado para 'Reset' total)")
+    # Confere os arquivos contra o manifesto sem restaurar nada
+    if arquivos_zip and st.button("Verificar backup"):
+        with st.spinner("Verificando arquivos..."):
+            for arquivo in arquivos_zip:
+                try:
+                    with zipfile.ZipFile(arquivo, "r") as z:
+                        resultado = verificar_backup(z)
+                except zipfile.BadZipFile as e:
+                    st.error(f"{arquivo.name}: não é um zip válido ({e}).")
+                    continue
+
+                if resultado["valido"]:
+                    st.success(f"{arquivo.name}: backup íntegro.")
+                else:
+                    st.error(f"{arquivo.name}: foram encontrados problemas.")
+                for aviso in resultado["avisos"]:
+                    st.warning(aviso)
+                st.dataframe(pd.DataFrame(resultado["tabelas"]), width="stretch", hide_index=True)
+
+    modo_delta = st.toggle(
+        "Restauração delta (somente as diferenças)",
+        help="Compara o backup com o banco e grava apenas as linhas novas ou alteradas. Mostra um resumo antes de gravar."
+    )
+
+    # Arquivos que não abrem como zip ficam de fora da restauração (um erro por arquivo)
+    chaves_arquivos = {}
+    for arquivo in arquivos_zip or []:
+        try:
+            chaves_arquivos[arquivo.name] = chave_arquivo(arquivo)
+        except zipfile.BadZipFile:
+            st.error(f"{arquivo.name}: não é um zip válido")
+    arquivos_zip = [arquivo for arquivo in arquivos_zip or [] if arquivo.name in chaves_arquivos]
+    limpar_antes = recomecar = False
+    if not modo_delta:
+        # Opção perigosa para limpar antes de restaurar
+        limpar_antes = st.checkbox("Limpar tabelas antes de restaurar (Recomendado para 'Reset' total)")
 
-    if arquivo_zip is not None and st.button("Iniciar Restauração"):
+        # Restaurações interrompidas destes arquivos são retomadas de onde pararam
+        pendentes = [nome for nome, chave in chaves_arquivos.items() if existe_checkpoint(chave)]
+        if pendentes:
+            st.info(f"Restauração interrompida encontrada para: {', '.join(pendentes)}. Ela continuará de onde parou.")
+            recomecar = st.checkbox("Ignorar o progresso salvo e recomeçar do zero")
+
+    if arquivos_zip and not modo_delta and st.button("Iniciar Restauração"):
         with st.spinner("Processando arquivo de backup..."):
             try:
-                with zipfile.ZipFile(arquivo_zip, "r") as z:
-                    # Itera na ordem correta de inserção
-                    for tabela in TABELAS_ORDENADAS:
-                        nome_arquivo = f"{tabela}.csv"
-                        
-                        if nome_arquivo in z.namelist():
-                            # Lê o CSV do ZIP
-                            with z.open(nome_arquivo) as f:
-                                try:
-                                    # Tenta ler formato BR
-                                    df = pd.read_csv(f, sep=';', decimal=',')
-                                except:
-                                    # Fallback para formato padrão
-                                    f.seek(0)
-                                    df = pd.read_csv(f, sep=',', decimal='.')
-                            
-                            if not df.empty:
-                                # Conversão de Inteiros
-                                for col in df.select_dtypes(include=['float']).columns:
-                                    is_integer = df[col].dropna().apply(lambda x: x.is_integer()).all()
-                                    
-                                    if is_integer:
-                                        df[col] = df[col].astype('Int64')
-
-                                # Tratamento de Nulos
-                                df = df.astype(object)
-                                df = df.where(pd.notnull(df), None)
-
-                                dados = df.to_dict(orient='records')
-                                
-                                # 1. Limpeza (Se selecionado)
-                                if limpar_antes:
-                                    try:
-                                        supabase.table(tabela).delete().neq("id", 0).execute()
-                                    except:
-                                        pass
-
-                                # 2. Upsert (Atualiza se existir ID, Cria se não existir)
-                                supabase.table(tabela).upsert(dados).execute()
-                                st.write(f"Tabela '{tabela}': {len(dados)} registros restaurados.")
+                # Base completa primeiro, depois os diferenciais na ordem da cadeia
+                arquivos_por_nome = {arquivo.name: arquivo for arquivo in arquivos_zip}
+                manifestos = {nome: ler_manifesto(arquivo) for nome, arquivo in arquivos_por_nome.items()}
+                cadeia = ordenar_cadeia(manifestos)
+                falhas_totais = {}
+
+                for posicao, nome_zip in enumerate(cadeia):
+                    manifesto = manifestos[nome_zip]
+                    chave = chaves_arquivos[nome_zip]
+                    if recomecar:
+                        remover_checkpoint(chave)
+                    if len(cadeia) > 1:
+                        st.write(f"**{nome_zip}** ({manifesto['tipo']})")
+
+                    barras = {}
+
+                    def atualizar_progresso(tabela, linhas, total):
+                        if tabela not in barras:
+                            barras[tabela] = st.progress(0.0)
+                        fracao = min(linhas / total, 1.0) if total else 1.0
+                        barras[tabela].progress(fracao, text=f"{tabela}: {linhas} de {total} linhas")
+
+                    def informar_tabela(tabela, enviados, falhas):
+                        st.write(f"Tabela '{tabela}': {enviados} registros restaurados.")
+                        if falhas:
+                            st.warning(f"Tabela '{tabela}': {len(falhas)} linhas rejeitadas.")
+
+                    def informar_remocao(tabela, quantidade):
+                        st.write(f"Tabela '{tabela}': {quantidade} registros removidos.")
+
+                    with zipfile.ZipFile(arquivos_por_nome[nome_zip], "r") as z:
+                        falhas = restaurar_backup(
+                            supabase,
+                            z,
+                            TABELAS_ORDENADAS,
+                            chave,
+                            manifesto=manifesto,
+                            limpar_antes=limpar_antes and posicao == 0,
+                            ao_progresso=atualizar_progresso,
+                            ao_concluir_tabela=informar_tabela,
+                            ao_remover=informar_remocao
+                        )
+                    for tabela, lista in falhas.items():
+                        falhas_totais.setdefault(tabela, []).extend(
+                            {"Arquivo": nome_zip, "Linha": linha, "Erro": erro} for linha, erro in lista
+                        )
                 
+                calcular_estatisticas.clear()
                 st.success("Processo de restauração finalizado!")
+
+                if falhas_totais:
+                    with st.expander("Ver linhas rejeitadas"):
+                        for tabela, lista in falhas_totais.items():
+                            st.markdown(f"###### {tabela}")
+                            st.dataframe(pd.DataFrame(lista), width="stretch", hide_index=True)
+
                 st.info("Recomendamos atualizar a página para visualizar os dados restaurados.")
 
             except Exception as e:
-                st.error(f"Falha na restauração: {e}")
\ No newline at end of file
+                st.error(f"Falha na restauração: {e}")
+
+    # --- Restauração Delta ---
+    if arquivos_zip and modo_delta:
+        remover_ausentes = st.checkbox("Remover do banco os registros que não existem no backup")
+
+        if len(arquivos_zip) > 1:
+            st.error("A restauração delta usa um único backup completo.")
+        else:
+            arquivo_delta = arquivos_zip[0]
+            # O plano só vale para o arquivo e as opções com que foi calculado
+            chave_plano = (chaves_arquivos[arquivo_delta.name], remover_ausentes)
+
+            if st.button("Analisar diferenças"):
+                with st.spinner("Comparando o backup com o banco..."):
+                    try:
+                        with zipfile.ZipFile(arquivo_delta, "r") as z:
+                            plano = planejar_delta(
+                                supabase,
+                                z,
+                                TABELAS_ORDENADAS,
+                                remover_ausentes=remover_ausentes,
+                                manifesto=ler_manifesto(z)
+                            )
+                        st.session_state.plano_delta = (chave_plano, plano)
+                    except Exception as e:
+                        st.error(f"Falha na análise: {e}")
+
+            plano_salvo = st.session_state.get("plano_delta")
+            if plano_salvo and plano_salvo[0] == chave_plano:
+                plano = plano_salvo[1]
+                st.subheader("Resumo (nada foi gravado ainda)")
+                st.dataframe(pd.DataFrame(resumo_delta(plano)), width="stretch", hide_index=True)
+
+                alteracoes = sum(p["inserir"] + p["atualizar"] + p["remover"] for p in plano.values())
+                if alteracoes == 0:
+                    st.success("O banco já está igual ao backup.")
+                elif st.button(f"Aplicar {alteracoes} alterações", type="primary"):
+                    with st.spinner("Gravando as diferenças..."):
+                        try:
+                            barras = {}
+
+                            def atualizar_progresso_delta(tabela, linhas, total):
+                                if tabela not in barras:
+                                    barras[tabela] = st.progress(0.0)
+                                barras[tabela].progress(min(linhas / total, 1.0), text=f"{tabela}: {linhas} de {total} linhas")
+
+                            with zipfile.ZipFile(arquivo_delta, "r") as z:
+                                falhas = aplicar_delta(
+                                    supabase,
+                                    z,
+                                    plano,
+                                    ao_progresso=atualizar_progresso_delta,
+                                    ao_remover=lambda tabela, quantidade: st.write(
+                                        f"Tabela '{tabela}': {quantidade} registros removidos."
+                                    )
+                                )
+                            del st.session_state.plano_delta
+                            calcular_estatisticas.clear()
+                            st.success("Diferenças aplicadas!")
+
+                            if falhas:
+                                with st.expander("Ver linhas rejeitadas"):
+                                    for tabela, lista in falhas.items():
+                                        st.markdown(f"###### {tabela}")
+                                        st.dataframe(
+                                            pd.DataFrame(lista, columns=["Linha", "Erro"]), width="stretch", hide_index=True
+                                        )
+                        except Exception as e:
+                            st.error(f"Falha na restauração delta: {e}")
+
+# --- Aba 3: Comparar Backups ---
+with aba_comparar:
+    st.header("Comparar Backups")
+    st.caption("Mostra o que mudou entre dois backups completos: linhas inseridas, removidas e colunas alteradas.")
+
+    LIMITE_PREVIA_DIFERENCAS = 1000
+
+    col_antes, col_depois = st.columns(2)
+    arquivo_antes = col_antes.file_uploader("Backup mais antigo (.zip)", type="zip", key="comparar_antes")
+    arquivo_depois = col_depois.file_uploader("Backup mais recente (.zip)", type="zip", key="comparar_depois")
+
+    if arquivo_antes and arquivo_depois and st.button("Comparar"):
+        with st.spinner("Comparando as tabelas..."):
+            try:
+                # Detalhes completos vão para um CSV em disco; na tela só uma prévia
+                remover_arquivo(st.session_state.get("comparacao_arquivo"))
+                caminho_diferencas = novo_arquivo_temporario(".csv")
+                st.session_state.comparacao_arquivo = caminho_diferencas
+                previa = []
+
+                with open(caminho_diferencas, "wb") as destino:
+                    destino.write(codificar_lote_csv([], COLUNAS_DIFERENCAS, cabecalho=True))
+
+                    def gravar_diferencas(diferencas):
+                        destino.write(diferencas.to_csv(index=False, header=False, **FORMATO_CSV).encode("utf-8"))
+                        if sum(len(parte) for parte in previa) < LIMITE_PREVIA_DIFERENCAS:
+                            previa.append(diferencas.head(LIMITE_PREVIA_DIFERENCAS))
+
+                    resultado = comparar_backups(arquivo_antes, arquivo_depois, ao_diferencas=gravar_diferencas)
+
+                st.dataframe(pd.DataFrame(resumo_comparacao(resultado)), width="stretch", hide_index=True)
+                for tabela, r in resultado.items():
+                    if r["colunas_novas"] or r["colunas_removidas"]:
+                        st.info(f"{tabela}: colunas novas {r['colunas_novas']}, removidas {r['colunas_removidas']}.")
+
+                if previa:
+                    st.markdown(f"###### Diferenças (primeiras {LIMITE_PREVIA_DIFERENCAS})")
+                    st.dataframe(
+                        pd.concat(previa).head(LIMITE_PREVIA_DIFERENCAS), width="stretch", hide_index=True
+                    )
+                    with open(caminho_diferencas, "rb") as arquivo_diferencas:
+                        st.download_button(
+                            label="Baixar todas as diferenças (.csv)",
+                            data=arquivo_diferencas,
+                            file_name="officeflow_diferencas.csv",
+                            mime="text/csv"
+                        )
+                else:
+                    st.success("Os backups têm os mesmos dados.")
+            except Exception as e:
+                st.error(f"Falha na comparação: {e}")
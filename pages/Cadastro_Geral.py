@@ -1,4 +1,6 @@
 from utils import verificar_autenticacao
+from dados import carregar_referencias, invalidar_referencias
+from componentes import grade_editavel, salvar_alteracoes
 import streamlit as st
 import pandas as pd
 
@@ -7,9 +9,8 @@ supabase = verificar_autenticacao()
 
 # --- Função de Carregamento ---
 def carregar_opcoes_modelo():
-    marcas = supabase.table("marcas").select("id, nome").execute().data
-    categorias = supabase.table("categorias").select("id, nome").execute().data
-    return marcas, categorias
+    marcas, categorias = carregar_referencias("marcas", "categorias")
+    return marcas.registros, categorias.registros
 
 # --- Título da Página ---
 st.title("Cadastro Geral")
@@ -60,6 +61,7 @@ with tab_cadastro:
                     }
                     response = supabase.table("modelos").insert(novo_modelo).execute()
                     if response.data:
+                        invalidar_referencias("modelos")
                         st.success(f"Modelo '{nome_modelo}' cadastrado com sucesso!")
                     else:
                         st.error(f"Erro ao salvar: {response.error.message}")
@@ -82,6 +84,7 @@ with tab_cadastro:
                 try:
                     response = supabase.table("marcas").insert({"nome": nome_marca}).execute()
                     if response.data:
+                        invalidar_referencias("marcas")
                         st.cache_data.clear() # Limpa o cache para atualizar o form de modelos
                         st.rerun()  # Recarrega a página para atualizar os dados
                     else:
@@ -102,6 +105,7 @@ with tab_cadastro:
                 try:
                     response = supabase.table("categorias").insert({"nome": nome_categoria}).execute()
                     if response.data:
+                        invalidar_referencias("categorias")
                         st.cache_data.clear() # Limpa o cache para atualizar o form de modelos
                         st.rerun()  # Recarrega a página para atualizar os dados
                     else:
@@ -122,6 +126,7 @@ with tab_cadastro:
                 try:
                     response = supabase.table("lojas").insert({"nome": nome_loja}).execute()
                     if response.data:
+                        invalidar_referencias("lojas")
                         st.cache_data.clear()
                     else:
                         st.error(f"Erro ao salvar: {response.error.message}")
@@ -139,12 +144,9 @@ with tab_geral:
     # --- 4. SEÇÃO MODELOS ---
     with ger_modelos:
         # --- 4a. Carregar Todos os Dados de Modelos ---
-        @st.cache_data
         def carregar_dados_modelos_completos():
-            modelos = supabase.table("modelos").select("id, nome, categoria_id, marca_id").order("nome").execute().data
-            marcas = supabase.table("marcas").select("id, nome").order("nome").execute().data
-            categorias = supabase.table("categorias").select("id, nome").order("nome").execute().data
-            return modelos, marcas, categorias
+            modelos, marcas, categorias = carregar_referencias("modelos", "marcas", "categorias")
+            return modelos.registros, marcas.registros, categorias.registros
         
         try:
             modelos_data, marcas_data, categorias_data = carregar_dados_modelos_completos()
@@ -183,14 +185,14 @@ with tab_geral:
                 st.info("Nenhum modelo encontrado para esta categoria.")
                 st.stop()
 
-            df_para_editar = pd.DataFrame(modelos_filtrados)
+            df_para_editar = pd.DataFrame(modelos_filtrados, columns=["id", "nome", "categoria_id", "marca_id"])
             df_para_editar['marca'] = df_para_editar['marca_id'].map(marcas_map_inv)
             df_para_editar['categoria'] = df_para_editar['categoria_id'].map(categorias_map_inv)
 
             with st.form("form_edit_modelo"):
                 st.write(f"Editando Modelos da Categoria: **{categoria_filtro_nome}**")
 
-                edited_df = st.data_editor(
+                edited_df, modelos_alterados = grade_editavel(
                     df_para_editar,
                     key="editor_modelos",
                     column_config={
@@ -212,39 +214,23 @@ with tab_geral:
                             required=True
                         )
                     },
-                    num_rows="fixed",
-                    width="stretch",
-                    hide_index=True,
                 )
 
                 submitted_edit = st.form_submit_button("Salvar Alterações de Modelos")
             if submitted_edit:
                 try:
-                    updates_count = 0
-
-                    for index, row in edited_df.iterrows():
-                        item_id = row["id"]
-
-                        dados_para_salvar = {
-                            "nome": row["nome"],
-                            "marca_id": marcas_map[row["marca"]],
-                            "categoria_id": categorias_map[row["categoria"]]
-                        }
-
-                        if pd.isna(item_id):
-                            supabase.table("modelos").insert(dados_para_salvar).execute()
-                            updates_count += 1
-                        else:
-                            original_row = df_para_editar.iloc[index]
-
-                            if not row.equals(original_row):
-                                supabase.table("modelos").update(dados_para_salvar).eq("id", item_id).execute()
-                                updates_count += 1
+                    # Nomes de marca e categoria voltam para IDs só nas linhas alteradas
+                    dados_para_salvar = modelos_alterados[["id", "nome"]].assign(
+                        marca_id=modelos_alterados["marca"].map(marcas_map),
+                        categoria_id=modelos_alterados["categoria"].map(categorias_map),
+                    )
+                    updates_count = salvar_alteracoes(supabase, "modelos", dados_para_salvar)
 
                     if updates_count > 0:
                         st.success(f"{updates_count} alterações salvas com sucesso!")
+                        invalidar_referencias("modelos")
                         st.cache_data.clear()
-                    else:
+                    elif modelos_alterados.empty:
                         st.info("Nenhuma alteração detectada.")
 
                 except Exception as e:
@@ -261,7 +247,7 @@ with tab_geral:
             df_categorias = pd.DataFrame(categorias_data)
             
             # Carrega lojas
-            lojas_data = supabase.table("lojas").select("id, nome").order("nome").execute().data
+            lojas_data = carregar_referencias("lojas")[0].registros
             df_lojas = pd.DataFrame(lojas_data)
         except Exception as e:
             st.error(f"Erro ao carregar dados básicos: {e}")
@@ -277,47 +263,38 @@ with tab_geral:
             with col_a:
                 st.markdown("###### Marcas")
                 # --- 1b. Editar Marcas (Data Editor) ---
-                edited_df_marcas = st.data_editor(
+                edited_df_marcas, marcas_alteradas = grade_editavel(
                     df_marcas,
                     key="editor_marcas",
-                    num_rows="fixed",
                     column_config={
                          "id": None,
                          "nome": st.column_config.TextColumn("Nome", required=True)
                     },
-                    hide_index=True,
-                    width="stretch"
                 )
 
             # --- 2. SEÇÃO CATEGORIAS ---
             with col_b:
                 st.markdown("###### Categorias")
                 # --- 2b. Editar Categorias (Data Editor) ---
-                edited_df_cats = st.data_editor(
+                edited_df_cats, categorias_alteradas = grade_editavel(
                     df_categorias,
                     key="editor_categorias",
-                    num_rows="fixed",
                     column_config={
                          "id": None,
                          "nome": st.column_config.TextColumn("Nome", required=True)
                     },
-                    hide_index=True,
-                    width="stretch"
                 )
 
             # --- 3. SEÇÃO LOJAS ---
             with col_c:
                 st.markdown("###### Lojas")
-                edited_df_lojas = st.data_editor(
-                    df_lojas, 
-                    key="editor_lojas", 
-                    num_rows="fixed",
+                edited_df_lojas, lojas_alteradas = grade_editavel(
+                    df_lojas,
+                    key="editor_lojas",
                     column_config={
                          "id": None,
                          "nome": st.column_config.TextColumn("Nome", required=True)
                     },
-                    hide_index=True,
-                    width="stretch"
                 )
 
             st.divider()
@@ -326,36 +303,24 @@ with tab_geral:
         if submit_edit_all:
             total_updates = 0
             
-            # Salvar Marcas
-            try:
-                for index, row in edited_df_marcas.iterrows():
-                    original_row = df_marcas.iloc[index]
-                    if not row.equals(original_row):
-                        supabase.table("marcas").update({"nome": row['nome']}).eq("id", row['id']).execute()
-                        total_updates += 1
-            except Exception as e: st.error(f"Erro ao salvar Marcas: {e}")
-
-            # Salvar Categorias
-            try:
-                for index, row in edited_df_cats.iterrows():
-                    original_row = df_categorias.iloc[index]
-                    if not row.equals(original_row):
-                        supabase.table("categorias").update({"nome": row['nome']}).eq("id", row['id']).execute()
-                        total_updates += 1
-            except Exception as e: st.error(f"Erro ao salvar Categorias: {e}")
-
-            # Salvar Lojas
-            try:
-                for index, row in edited_df_lojas.iterrows():
-                    original_row = df_lojas.iloc[index]
-                    if not row.equals(original_row):
-                        supabase.table("lojas").update({"nome": row['nome']}).eq("id", row['id']).execute()
-                        total_updates += 1
-            except Exception as e: st.error(f"Erro ao salvar Lojas: {e}")
+            total_alteradas = len(marcas_alteradas) + len(categorias_alteradas) + len(lojas_alteradas)
+
+            # Um upsert por tabela, só com as linhas alteradas
+            for tabela, alteradas, rotulo in [
+                ("marcas", marcas_alteradas, "Marcas"),
+                ("categorias", categorias_alteradas, "Categorias"),
+                ("lojas", lojas_alteradas, "Lojas"),
+            ]:
+                try:
+                    total_updates += salvar_alteracoes(supabase, tabela, alteradas)
+                except Exception as e: st.error(f"Erro ao salvar {rotulo}: {e}")
 
             if total_updates > 0:
                 st.success(f"{total_updates} registros atualizados com sucesso!")
+                invalidar_referencias("marcas", "categorias", "lojas", "modelos")
                 st.cache_data.clear()
-                st.rerun()
-            else:
+                # Com falhas, mantém os erros na tela em vez de recarregar
+                if total_updates == total_alteradas:
+                    st.rerun()
+            elif total_alteradas == 0:
                 st.info("Nenhuma alteração detectada.")
\ No newline at end of file
@@ -1,4 +1,5 @@
 from utils import verificar_autenticacao
+from dados import carregar_referencias
 import streamlit as st
 import pandas as pd
 import random
@@ -21,16 +22,10 @@ def formatar_nf_padrao(valor_nf):
     return f"{apenas_numeros[:3]}.{apenas_numeros[3:6]}.{apenas_numeros[6:]}"
 
 def carregar_opcoes():
-    modelos = supabase.table("modelos").select("id, nome, categoria_id, marcas(nome)").order("nome").execute().data
-    categorias = supabase.table("categorias").select("id, nome").order("nome").execute().data
-    setores = supabase.table("setores").select("id, nome").order("nome").execute().data
-    status = supabase.table("status").select("id, nome").order("nome").execute().data
-    estados = supabase.table("estados").select("id, nome").order("nome").execute().data
-    lojas = supabase.table("lojas").select("id, nome").order("nome").execute().data 
-    # NOVA TABELA: Colaboradores
-    colaboradores = supabase.table("colaboradores").select("id, nome").order("nome").execute().data
-
-    return modelos, categorias, setores, status, estados, lojas, colaboradores
+    referencias = carregar_referencias(
+        "modelos", "categorias", "setores", "status", "estados", "lojas", "colaboradores"
+    )
+    return tuple(ref.registros for ref in referencias)
 
 def carregar_historico_compras():
     try:
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from utils import verificar_autenticacao
+from dados import ler_tabela
 
 # --- Conexão com supabase ---
 supabase = verificar_autenticacao()
@@ -12,8 +13,7 @@ def carregar_dados_dashboard():
     try:
         # 1. Busca Ativos (Com status e setores para gráficos)
         query_ativos = "id, serial, valor, status(nome), setores(nome), modelos(nome, marcas(nome))"
-        response_ativos = supabase.table("ativos").select(query_ativos).execute()
-        df_ativos = pd.DataFrame(response_ativos.data)
+        df_ativos = pd.DataFrame(ler_tabela(supabase, "ativos", query_ativos))
 
         # 2. Busca Movimentações Recentes (Últimas 10)
         query_mov = "created_at, ativos(serial), colaboradores(nome), setores(nome), status(nome)"
@@ -22,8 +22,7 @@ def carregar_dados_dashboard():
 
         # 3. Busca Manutenções em Aberto (retornado_em is null)
         query_manut = "id, criado_em, fornecedor, defeito, ativos(serial, modelos(nome))"
-        response_manut = supabase.table("manutencoes").select(query_manut).is_("retornado_em", "null").execute()
-        df_manutencao = pd.DataFrame(response_manut.data)
+        df_manutencao = pd.DataFrame(ler_tabela(supabase, "manutencoes", query_manut, filtros={"retornado_em": None}))
 
         return df_ativos, df_movimentacoes, df_manutencao
 
@@ -1,6 +1,14 @@
 import streamlit as st
 import pandas as pd
 from utils import verificar_autenticacao
+from dados import buscar_pagina, carregar_referencia, carregar_referencias, invalidar_referencias, CONSULTAS_REFERENCIA
+from importacao import detectar_formato_csv, ler_previa_csv, importar_csv
+from validacao import validar_csv, resumo_erros, ids_existentes
+from exportacao import exportar_tabela, exportar_inventario
+from esquema import tipos_da_tabela
+from motor_backup import (
+    novo_arquivo_temporario, remover_arquivo, FORMATOS, FORMATO_CSV, CODIFICACAO_CSV,
+)
 
 # --- Autenticação e Conexão ---
 supabase = verificar_autenticacao()
@@ -12,50 +20,147 @@ st.markdown("Importação e exportação em massa para o banco de dados.")
 # Lista de tabelas permitidas para evitar acesso indevido a tabelas de sistema
 TABELAS_DISPONIVEIS = ["ativos", "movimentacoes", "manutencoes", "setores", "colaboradores"]
 
+LINHAS_PREVIA = 100  # As prévias mostram só o início; exportação e importação seguem em lotes
+
+# Operadores do filtro da exportação -> métodos do PostgREST
+OPERADORES_FILTRO = {"=": "eq", "≠": "neq", ">": "gt", "≥": "gte", "<": "lt", "≤": "lte", "contém": "ilike"}
+
+# --- Prévia da Exportação ---
+# As abas rodam a cada interação: a contagem exata (varredura da tabela) fica em cache por
+# tabela, colunas e filtros, e só é refeita quando algum deles muda ou o tempo expira
+@st.cache_data(ttl=60, show_spinner=False)
+def previa_exportacao(tabela, colunas, filtros):
+    """Primeiras `LINHAS_PREVIA` linhas e a contagem exata: (registros, total)."""
+    return buscar_pagina(supabase, tabela, colunas, list(filtros), tamanho=LINHAS_PREVIA)
+
 # --- Estrutura de Navegação Interna ---
 aba_export, aba_import = st.tabs(["Exportar (Download)", "Importar (Upload)"])
 
 # --- Aba 1: Exportação de Dados ---
 with aba_export:
-    st.header("Exportar Dados para CSV")
-    st.caption("Selecione a tabela desejada para baixar os dados atuais.")
+    st.header("Exportar Dados")
+    st.caption("Selecione a tabela, as colunas e os filtros. O arquivo é gerado em lotes, sem limite de linhas.")
 
     tabela_selecionada = st.selectbox(
         "Selecione a Tabela:", 
         TABELAS_DISPONIVEIS, 
         key="sel_export"
     )
+    colunas_tabela = list(tipos_da_tabela(tabela_selecionada))
+
+    colunas_export = st.multiselect(
+        "Colunas (vazio = todas):", colunas_tabela, key=f"colunas_export_{tabela_selecionada}"
+    )
+    filtros_editados = st.data_editor(
+        pd.DataFrame({"Coluna": pd.Series(dtype="string"), "Operador": pd.Series(dtype="string"),
+                      "Valor": pd.Series(dtype="string")}),
+        num_rows="dynamic",
+        column_config={
+            "Coluna": st.column_config.SelectboxColumn(options=colunas_tabela, required=True),
+            "Operador": st.column_config.SelectboxColumn(options=list(OPERADORES_FILTRO), required=True, default="="),
+            "Valor": st.column_config.TextColumn(help="Vazio com '=' busca os registros sem valor"),
+        },
+        key=f"filtros_export_{tabela_selecionada}",
+        width="stretch",
+        hide_index=True,
+    )
+    formato_export = st.radio("Formato:", list(FORMATOS), format_func=str.upper, horizontal=True, key="formato_export")
+
+    # Filtros aplicados na consulta (no servidor), na ordem das linhas da tabela acima
+    filtros = []
+    for filtro in filtros_editados.dropna(subset=["Coluna", "Operador"]).itertuples(index=False):
+        valor = filtro.Valor if pd.notna(filtro.Valor) and filtro.Valor != "" else None
+        if valor is None:
+            if filtro.Operador == "=":
+                filtros.append((filtro.Coluna, None))
+            continue
+        if filtro.Operador == "contém":
+            valor = f"%{valor}%"
+        filtros.append((filtro.Coluna, (OPERADORES_FILTRO[filtro.Operador], valor)))
+    colunas_consulta = ",".join(colunas_export) if colunas_export else "*"
 
-    if st.button("Carregar Dados"):
-        with st.spinner(f"Baixando dados de '{tabela_selecionada}'..."):
-            try:
-                # 1. Busca dados no Supabase
-                response = supabase.table(tabela_selecionada).select("*").execute()
-                dados = response.data
-
-                if len(dados) > 0:
-                    # 2. Conversão para DataFrame
-                    df = pd.DataFrame(dados)
-                    
-                    # 3. Exibição de prévia
-                    st.dataframe(df, width="stretch", hide_index=True)
-                    st.caption(f"Total de registros encontrados: {len(df)}")
-
-                    # 4. Preparação do arquivo CSV
-                    csv = df.to_csv(index=False, sep=";", decimal=",", encoding="utf-8-sig")
-
-                    # 5. Disponibilização do Download
+    try:
+        # 1. Prévia e contagem exata (no servidor) na mesma requisição, em cache
+        previa_export, total_export = previa_exportacao(tabela_selecionada, colunas_consulta, tuple(filtros))
+
+        if total_export:
+            st.dataframe(pd.DataFrame(previa_export), width="stretch", hide_index=True)
+            st.caption(f"Primeiras {len(previa_export)} de {total_export} linhas encontradas.")
+
+            # 2. Arquivo gerado por páginas de range, gravadas direto num arquivo em disco;
+            # remove o arquivo da geração anterior
+            if st.button("Gerar Arquivo"):
+                barra_export = st.progress(0.0, text=f"Exportando '{tabela_selecionada}'...")
+                remover_arquivo(st.session_state.get("export_arquivo"))
+                caminho_export = novo_arquivo_temporario(FORMATOS[formato_export])
+                st.session_state.export_arquivo = caminho_export
+                with open(caminho_export, "wb") as arquivo_export:
+                    registros_export = exportar_tabela(
+                        supabase, tabela_selecionada, arquivo_export, formato=formato_export,
+                        colunas=colunas_consulta, filtros=filtros,
+                        ao_progresso=lambda registros: barra_export.progress(
+                            min(registros / total_export, 1.0), text=f"{registros} de {total_export} registros"
+                        ),
+                    )
+
+                # 3. Disponibilização do Download (o arquivo aberto, sem ler o conteúdo no script)
+                with open(caminho_export, "rb") as arquivo_export:
                     st.download_button(
-                        label="Baixar arquivo .csv",
-                        data=csv,
-                        file_name=f"{tabela_selecionada}_export.csv",
-                        mime="text/csv"
+                        label=f"Baixar arquivo {FORMATOS[formato_export]} ({registros_export} registros)",
+                        data=arquivo_export,
+                        file_name=f"{tabela_selecionada}_export{FORMATOS[formato_export]}",
+                        mime="text/csv" if formato_export == "csv" else "application/vnd.apache.parquet",
                     )
-                else:
-                    st.warning("A tabela selecionada está vazia.")
-            
-            except Exception as e:
-                st.error(f"Erro ao exportar: {e}")
+        else:
+            st.warning("Nenhum registro encontrado com os filtros informados.")
+
+    except Exception as e:
+        st.error(f"Erro ao exportar: {e}")
+
+    # --- Relatório de Inventário (nomes no lugar dos IDs) ---
+    st.divider()
+    st.subheader("Relatório de Inventário")
+    st.caption("Ativos com modelo, marca, categoria, setor, status, estado, usuário e compra já por nome.")
+
+    try:
+        setores_ref, status_ref = carregar_referencias("setores", "status")
+        col_setor, col_status, col_formato = st.columns(3)
+        setor_relatorio = col_setor.selectbox("Setor", ["Todos"] + setores_ref.nomes(), key="setor_relatorio")
+        status_relatorio = col_status.selectbox("Status", ["Todos"] + status_ref.nomes(), key="status_relatorio")
+        formato_relatorio = col_formato.radio(
+            "Formato", list(FORMATOS), format_func=str.upper, horizontal=True, key="formato_relatorio"
+        )
+
+        filtros_relatorio = {}
+        if setor_relatorio != "Todos":
+            filtros_relatorio["local_id"] = setores_ref.por_nome[setor_relatorio]
+        if status_relatorio != "Todos":
+            filtros_relatorio["status_id"] = status_ref.por_nome[status_relatorio]
+
+        if st.button("Gerar Relatório"):
+            total_relatorio = buscar_pagina(supabase, "ativos", "id", filtros_relatorio, tamanho=1)[1]
+            barra_relatorio = st.progress(0.0, text="Gerando relatório...")
+            remover_arquivo(st.session_state.get("relatorio_arquivo"))
+            caminho_relatorio = novo_arquivo_temporario(FORMATOS[formato_relatorio])
+            st.session_state.relatorio_arquivo = caminho_relatorio
+            with open(caminho_relatorio, "wb") as arquivo_relatorio:
+                ativos_relatorio = exportar_inventario(
+                    supabase, arquivo_relatorio, formato=formato_relatorio, filtros=filtros_relatorio,
+                    ao_progresso=lambda registros: barra_relatorio.progress(
+                        min(registros / max(total_relatorio, 1), 1.0), text=f"{registros} de {total_relatorio} ativos"
+                    ),
+                )
+
+            with open(caminho_relatorio, "rb") as arquivo_relatorio:
+                st.download_button(
+                    label=f"Baixar relatório {FORMATOS[formato_relatorio]} ({ativos_relatorio} ativos)",
+                    data=arquivo_relatorio,
+                    file_name=f"inventario{FORMATOS[formato_relatorio]}",
+                    mime="text/csv" if formato_relatorio == "csv" else "application/vnd.apache.parquet",
+                )
+
+    except Exception as e:
+        st.error(f"Erro ao gerar o relatório: {e}")
 
 # --- Aba 2: Importação de Dados ---
 with aba_import:
@@ -72,41 +177,90 @@ with aba_import:
 
     if arquivo_upload is not None:
         try:
-            # 1. Leitura do arquivo
-            try:
-                # Tenta padrão Web (UTF-8)
-                df_upload = pd.read_csv(arquivo_upload, sep=';', decimal=',', encoding='utf-8-sig', dtype=str)
-            except:
-                # Se der erro, tenta padrão Excel (Latin-1)
-                arquivo_upload.seek(0)
-                df_upload = pd.read_csv(arquivo_upload, sep=';', decimal=',', encoding='latin1', dtype=str)
-            
+            # 1 e 2. Formato (codificação e separador) e validação prévia contra o esquema da
+            # tabela, antes de qualquer gravação. Feitos uma vez por arquivo e tabela: as
+            # interações seguintes na página reaproveitam o resultado guardado na sessão.
+            chave_validacao = (arquivo_upload.file_id, tabela_destino)
+            validacao = st.session_state.get("validacao_importacao")
+            if validacao is None or validacao["chave"] != chave_validacao:
+                codificacao, separador = detectar_formato_csv(arquivo_upload)
+                with st.spinner("Validando o arquivo..."):
+                    total_linhas, erros = validar_csv(
+                        arquivo_upload, tabela_destino, carregar_referencia,
+                        lambda tabela, ids: ids_existentes(supabase, tabela, ids),
+                        codificacao=codificacao, separador=separador,
+                    )
+                validacao = st.session_state.validacao_importacao = {
+                    "chave": chave_validacao, "codificacao": codificacao, "separador": separador,
+                    "total_linhas": total_linhas, "erros": erros,
+                }
+            codificacao, separador = validacao["codificacao"], validacao["separador"]
+            total_linhas, erros = validacao["total_linhas"], validacao["erros"]
+
+            arquivo_upload.seek(0)
+            previa = ler_previa_csv(arquivo_upload, LINHAS_PREVIA, codificacao, separador)
+            linhas_com_erro = set(erros["linha"].tolist())
+            linhas_validas = total_linhas - len(linhas_com_erro)
+
             st.subheader("Pré-visualização dos dados")
-            st.dataframe(df_upload, width="stretch", hide_index=True)
-            st.info(f"Registros prontos para importação: {len(df_upload)}")
-
-            # 2. Ação de Importação
-            if st.button("Confirmar Importação no Banco de Dados", type="primary"):
-                with st.spinner("Enviando dados para o Supabase..."):
-                    # Conversão de Inteiros
-                    for col in df_upload.select_dtypes(include=['float']).columns:
-                        is_integer = df[col].dropna().apply(lambda x: x.is_integer()).all()
-                        
-                        if is_integer:
-                            df_upload[col] = df_upload[col].astype('Int64')
-
-                    # Tratamento de dados nulos (NaN -> None) para compatibilidade SQL
-                    df_upload = df_upload.where(pd.notnull(df_upload), None)
-                    
-                    # Conversão para formato de dicionário
-                    dados_para_inserir = df_upload.to_dict(orient='records')
-
-                    # Inserção em lote
-                    supabase.table(tabela_destino).insert(dados_para_inserir).execute()
-                    
-                    st.success("Importação realizada com sucesso!")
+            st.dataframe(previa, width="stretch", hide_index=True)
+            st.caption(
+                f"Primeiras {len(previa)} de {total_linhas} linhas · "
+                f"codificação {codificacao}, separador '{separador}'"
+            )
+
+            if linhas_com_erro:
+                st.error(
+                    f"{len(linhas_com_erro)} de {total_linhas} linhas com problemas. "
+                    "Somente as linhas válidas serão importadas."
+                )
+                st.dataframe(
+                    resumo_erros(erros).rename(columns={
+                        "coluna": "Coluna", "erro": "Erro", "linhas": "Linhas", "primeira_linha": "Primeira linha",
+                    }),
+                    width="stretch", hide_index=True,
+                )
+                st.download_button(
+                    label="Baixar relatório de erros (.csv)",
+                    data=erros.to_csv(index=False, **FORMATO_CSV).encode(CODIFICACAO_CSV),
+                    file_name=f"{tabela_destino}_erros_importacao.csv",
+                    mime="text/csv",
+                )
+
+            if linhas_validas:
+                st.info(f"Registros prontos para importação: {linhas_validas}")
+
+                # 3. Ação de Importação: um insert por lote; lotes com erro não interrompem os demais
+                if st.button("Confirmar Importação no Banco de Dados", type="primary"):
+                    barra = st.progress(0.0, text="Enviando dados para o Supabase...")
+
+                    def ao_progresso(lidas, enviados):
+                        barra.progress(
+                            min(lidas / max(total_linhas, 1), 1.0),
+                            text=f"{lidas} de {total_linhas} linhas processadas ({enviados} importadas)",
+                        )
+
+                    arquivo_upload.seek(0)
+                    enviados, falhas = importar_csv(
+                        supabase, tabela_destino, arquivo_upload, codificacao=codificacao, separador=separador,
+                        obter_referencia=carregar_referencia, ao_progresso=ao_progresso, ignorar=linhas_com_erro,
+                    )
+                    if tabela_destino in CONSULTAS_REFERENCIA:
+                        invalidar_referencias(tabela_destino)
+                    # O banco mudou: uma nova importação do mesmo arquivo é validada de novo
+                    st.session_state.pop("validacao_importacao", None)
+                    previa_exportacao.clear()
+
+                    if falhas:
+                        st.warning(f"{enviados} registros importados; {len(falhas)} falha(s) nas linhas abaixo.")
+                        st.dataframe(pd.DataFrame(falhas, columns=["Linha", "Erro"]), width="stretch", hide_index=True)
+                    else:
+                        st.success(f"Importação realizada com sucesso! {enviados} registros.")
 
+        except ValueError as e:
+            # Estrutura do arquivo (colunas desconhecidas ou obrigatórias ausentes)
+            st.error(str(e))
         except Exception as e:
             st.error("Falha na importação. Verifique se os nomes das colunas estão corretos.")
             with st.expander("Ver detalhes do erro"):
-                st.write(e)
\ No newline at end of file
+                st.write(e)
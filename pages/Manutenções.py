@@ -2,30 +2,31 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from utils import verificar_autenticacao
+from dados import carregar_referencia, ler_tabela
 
 # --- Conexão com Supabase ---
 supabase = verificar_autenticacao()
 
 # --- Criação de Dados ---
 def carregar_dados():
-    ativos_raw = supabase.table("ativos").select("*, modelos(nome, marcas(nome)), status(nome)").execute().data
-    status_raw = supabase.table("status").select("id, nome").execute().data
+    ativos_raw = ler_tabela(supabase, "ativos", "*, modelos(nome, marcas(nome)), status(nome)")
+    status_ref = carregar_referencia("status")
     
-    return ativos_raw, status_raw
+    return ativos_raw, status_ref
 
 def carregar_manutencoes_abertas():
-    return supabase.table("manutencoes").select(
-        "*, ativos(serial, modelos(nome, marcas(nome)))"
-    ).is_("retornado_em", "null").execute().data
+    return ler_tabela(
+        supabase, "manutencoes", "*, ativos(serial, modelos(nome, marcas(nome)))", filtros={"retornado_em": None}
+    )
 
 def carregar_historico_completo():
-    return supabase.table("manutencoes").select(
-        "*, ativos(serial, modelos(nome, marcas(nome)))"
-    ).order("criado_em", desc=True).execute().data
+    # Lido em lotes pela chave primária (ordem estável) e ordenado por data localmente
+    historico = ler_tabela(supabase, "manutencoes", "*, ativos(serial, modelos(nome, marcas(nome)))")
+    return sorted(historico, key=lambda h: h["criado_em"] or "", reverse=True)
 
 ativos_data, status_data = carregar_dados()
 
-status_map_inv = {s['nome']: s['id'] for s in status_data}
+status_map_inv = status_data.por_nome
 id_em_manutencao = status_map_inv.get("Em Manutenção")
 id_em_estoque = status_map_inv.get("Em Estoque")
 
@@ -1,4 +1,5 @@
 from utils import verificar_autenticacao
+from dados import carregar_referencias, ler_tabela, movimentar_ativos
 import streamlit as st
 import pandas as pd
 
@@ -13,16 +14,14 @@ def carregar_dados_auxiliares():
             status_dados:status_id(nome),
             modelo_id(nome, marca_id(nome))
         """
-        ativos = supabase.table("ativos").select(query).order("id").execute().data
+        ativos = ler_tabela(supabase, "ativos", query)
         
-        colaboradores = supabase.table("colaboradores").select("id, nome").order("nome").execute().data
-        setores = supabase.table("setores").select("id, nome").order("nome").execute().data 
-        status = supabase.table("status").select("id, nome").order("nome").execute().data
+        colaboradores, setores, status = carregar_referencias("colaboradores", "setores", "status")
         
         return ativos, colaboradores, setores, status
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
-        return [], [], [], []
+        return [], None, None, None
 
 # --- Carrega os dados ---
 ativos_data, colaboradores_data, setores_data, status_data = carregar_dados_auxiliares()
@@ -52,14 +51,17 @@ for a in ativos_data:
     
     ativos_map[label] = a
 
+if colaboradores_data is None:
+    st.stop()
+
 # --- Mapas de "Tradução" (ID <-> Nome) ---
-colaboradores_map = {u["nome"]: u["id"] for u in colaboradores_data}
-setores_map = {s["nome"]: s["id"] for s in setores_data}
-status_map = {s["nome"]: s["id"] for s in status_data}
+colaboradores_map = colaboradores_data.por_nome
+setores_map = setores_data.por_nome
+status_map = status_data.por_nome
 
-colaboradores_map_inv = {u["id"]: u["nome"] for u in colaboradores_data}
-setores_map_inv = {s["id"]: s["nome"] for s in setores_data}
-status_map_inv = {s["id"]: s["nome"] for s in status_data}
+colaboradores_map_inv = colaboradores_data.por_id
+setores_map_inv = setores_data.por_id
+status_map_inv = status_data.por_id
 
 opcao_manter = "Manter atual"
 
@@ -124,9 +126,7 @@ with tab_movimentar:
             
             if submitted:
                 with st.spinner("Processando..."):
-                    sucessos = 0
-                    erros = 0
-                    
+                    movimentos = []
                     for chave in chaves_selecionadas:
                         # Lógica "Manter Atual"
                         ativo_atual = ativos_map[chave]
@@ -135,33 +135,22 @@ with tab_movimentar:
                         id_local_final = ativo_atual.get("local_id") if nome_local_destino == opcao_manter else setores_map[nome_local_destino]
                         id_status_final = ativo_atual.get("status_id") if nome_status_destino == opcao_manter else status_map[nome_status_destino]
 
-                        try:
-                            # Executa Update e Log com os IDs calculados
-                            supabase.table("movimentacoes").insert({
-                                "ativo_id": ativo_atual['id'],
-                                "usuario_id": id_user_final,
-                                "setor_id": id_local_final,
-                                "status_id": id_status_final,
-                                "observacao": observacao_input
-                            }).execute()
-                            
-                            supabase.table("ativos").update({
-                                "usuario_id": id_user_final,
-                                "local_id": id_local_final,
-                                "status_id": id_status_final
-                            }).eq("id", ativo_atual['id']).execute()
-                            
-                            sucessos += 1
-                            
-                        except Exception as e:
-                            erros += 1
-                            st.error(f"Erro no ativo {ativo_atual['serial']}: {e}")
-                    
-                    if sucessos > 0:
-                        st.success(f"{sucessos} movimentações realizadas!")
-                        if erros == 0:
-                            st.cache_data.clear()
-                            st.rerun()
+                        movimentos.append({
+                            "ativo_id": ativo_atual['id'],
+                            "usuario_id": id_user_final,
+                            "setor_id": id_local_final,
+                            "status_id": id_status_final,
+                        })
+
+                    try:
+                        # Histórico e ativos numa única chamada: ou move todos, ou nenhum
+                        realizadas = movimentar_ativos(supabase, movimentos, observacao_input)
+                    except Exception as e:
+                        st.error(f"Nenhum ativo foi movimentado: {e}")
+                    else:
+                        st.success(f"{len(realizadas)} movimentações realizadas!")
+                        st.cache_data.clear()
+                        st.rerun()
 
 # --- ABA 2: Histórico---
 with tab_historico:
@@ -1,4 +1,6 @@
 from utils import verificar_autenticacao
+from dados import carregar_referencias, invalidar_referencias, ler_tabela
+from componentes import grade_editavel, salvar_alteracoes
 import streamlit as st
 import pandas as pd
 
@@ -12,20 +14,19 @@ st.title("Gestão de Usuários")
 cadastro_tab, gerenciar_tab = st.tabs(["Cadastrar / Editar", "Gerenciar"])
 
 # --- Identificação de Dados ---
-ativos_data = supabase.table("ativos").select("*, modelos(nome, marcas(nome)), status(nome)").execute().data
-colaboradores_data = supabase.table("colaboradores").select("id, nome, email, setor_id").order("nome").execute().data
-setores_data = supabase.table("setores").select("id, nome").order("nome").execute().data
-status_data = supabase.table("status").select("id", "nome").order("nome").execute().data
+ativos_data = ler_tabela(supabase, "ativos", "*, modelos(nome, marcas(nome)), status(nome)")
+colaboradores_ref, setores_ref, status_ref = carregar_referencias("colaboradores", "setores", "status")
+colaboradores_data = colaboradores_ref.registros
 
 # Mapeamento Nome -> ID (Para salvar)
-setores_map = {s['nome']: s['id'] for s in setores_data}
-status_map = {s['nome']: s['id'] for s in status_data}
+setores_map = setores_ref.por_nome
+status_map = status_ref.por_nome
 
-nome_setores = list(setores_map.keys())
-nome_status = list(status_map.keys())
+nome_setores = setores_ref.nomes()
+nome_status = status_ref.nomes()
 
 # Mapeamento ID -> Nome (Para exibir na tabela)
-id_to_nome_map = {s['id']: s['nome'] for s in setores_data}
+id_to_nome_map = setores_ref.por_id
 
 # --- ABA 01: Cadastro/Edição de Usuário ---
 with cadastro_tab:
@@ -47,6 +48,7 @@ with cadastro_tab:
                 }
                 supabase.table("colaboradores").insert(novo_usuario_dados).execute()
                 st.success(f"Usuário '{nome_usuario}' cadastrado!")
+                invalidar_referencias("colaboradores")
                 st.cache_data.clear()
                 st.rerun()
 
@@ -69,12 +71,9 @@ with cadastro_tab:
     with st.form("form_edit_users"):
         st.subheader("Editar Usuários:")
 
-        edited_df_users = st.data_editor(
-            df_users, 
-            key="editor_colaboradores", 
-            num_rows="fixed",
-            width="stretch",
-            hide_index=True,
+        edited_df_users, alterados = grade_editavel(
+            df_users,
+            key="editor_colaboradores",
             column_config={
                 "id": None, # Esconde o ID
                 "nome": st.column_config.TextColumn("Nome", required=True),
@@ -91,42 +90,24 @@ with cadastro_tab:
     # --- Confirmação ---
     if submit_edit_users:
         try:
-            updates_count = 0
+            # CORREÇÃO 2: Só as linhas alteradas com setor válido; o setor volta de Nome -> ID
+            setor_valido = alterados["setor_id"].isin(setores_map)
+            for nome in alterados.loc[~setor_valido, "nome"]:
+                st.warning(f"Setor inválido para o usuário {nome}.")
 
-            # Iterar sobre o dataframe editado
-            for index, row in edited_df_users.iterrows():
-                item_id = row["id"]
-
-                # Recupera a linha original para comparar mudanças
-                original_row = df_users.iloc[index]
-
-                # Só processa se houver diferença entre a linha editada e a original
-                if not row.equals(original_row):
-
-                    # CORREÇÃO 2: Verificar se o setor é válido antes de buscar no mapa
-                    nome_setor_atual = row["setor_id"]
-
-                    if nome_setor_atual in setores_map:
-                        # Traduz de volta: Nome -> ID
-                        id_setor_salvar = setores_map[nome_setor_atual]
-
-                        dados_para_salvar = {
-                            "nome": row["nome"],
-                            "email": row["email"],
-                            "setor_id": id_setor_salvar
-                        }
-
-                        supabase.table("colaboradores").update(dados_para_salvar).eq("id", item_id).execute()
-                        updates_count += 1
-                    else:
-                        st.warning(f"Setor '{nome_setor_atual}' inválido para o usuário {row['nome']}.")
+            dados_para_salvar = alterados.loc[setor_valido, ["id", "nome", "email", "setor_id"]].assign(
+                setor_id=lambda df: df["setor_id"].map(setores_map)
+            )
+            updates_count = salvar_alteracoes(supabase, "colaboradores", dados_para_salvar)
 
             if updates_count > 0:
                 st.success(f"{updates_count} alterações salvas com sucesso!")
+                invalidar_referencias("colaboradores")
                 st.cache_data.clear()
-                # Aguarda um pouco e recarrega para atualizar a tabela visualmente com os dados do banco
-                st.rerun()
-            else:
+                # Recarrega para atualizar a tabela com os dados do banco (com falhas, mantém os erros na tela)
+                if updates_count == len(dados_para_salvar):
+                    st.rerun()
+            elif alterados.empty:
                 st.info("Nenhuma alteração detectada.")
 
         except Exception as e:
@@ -135,7 +116,7 @@ with cadastro_tab:
 # --- ABA 02: Gerenciamento de Usuários ---
 with gerenciar_tab:
     # --- Mapeamento de Dados
-    colaboradores_map = {u["nome"]: u["id"] for u in colaboradores_data}
+    colaboradores_map = colaboradores_ref.por_nome
 
     # --- Inicio da Aba ---
     st.subheader("1. Selecione um usuário para gerenciar")
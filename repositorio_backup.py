@@ -0,0 +1,271 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+import zlib
+import numpy as np
+from motor_backup import ler_manifesto, NOME_MANIFESTO, TAMANHO_BLOCO
+
+# --- Repositório Local de Backups ---
+# Cada arquivo do backup é dividido em blocos definidos pelo conteúdo e guardado pelo hash:
+# tabelas sem alteração (ou só com linhas novas no fim) reaproveitam os blocos já gravados.
+# Funciona melhor com backups em CSV: o Parquet é compactado e muda por inteiro a cada alteração.
+#
+#   <pasta>/blocos/ab/abcdef...   bloco compactado (zlib), nome = SHA-256 do conteúdo original
+#   <pasta>/snapshots/<id>.json   manifesto do backup + lista de blocos de cada arquivo
+PASTA_REPOSITORIO = os.environ.get(
+    "OFFICEFLOW_REPOSITORIO", os.path.join(os.path.expanduser("~"), ".officeflow", "backups")
+)
+
+# Tamanho dos blocos: corte quando os 13 bits altos do hash zeram (~8 KiB em média)
+BLOCO_MINIMO = 2 * 1024
+BLOCO_MAXIMO = 64 * 1024
+MASCARA_CORTE = np.uint32(0xFFF80000)
+JANELA_HASH = 32  # Bytes que influenciam o hash rolante (gear) em cada posição
+
+RETENCAO_DIARIOS = 90   # Últimos dias com snapshot mantidos (o mais recente de cada dia)
+RETENCAO_SEMANAIS = 12  # Últimas semanas mantidas além dos diários (o mais recente de cada semana)
+CARENCIA_COLETA = 3600  # Blocos mais novos que isso (s) não são removidos: podem ser de um backup em andamento
+
+# Tabela do hash gear derivada do SHA-256: os cortes não mudam entre versões de bibliotecas
+_GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "little") for i in range(256)], dtype=np.uint32
+)
+
+_lock_repositorio = threading.Lock()
+
+
+# --- Divisão em Blocos ---
+def _candidatos_corte(dados):
+    """Posições após as quais o conteúdo permite um corte (hash gear vetorizado com NumPy)."""
+    # hash[i] = soma de gear[byte[i-k]] << k para k < 32, montada por duplicação da janela
+    # (janelas de 1, 2, 4, 8, 16 e 32 bytes): 5 passadas em vez de 32
+    hashes = _GEAR[np.frombuffer(dados, dtype=np.uint8)]
+    janela = 1
+    while janela < JANELA_HASH:
+        deslocado = np.zeros_like(hashes)
+        deslocado[janela:] = hashes[:-janela] << np.uint32(janela)
+        hashes = hashes + deslocado
+        janela *= 2
+    return np.flatnonzero((hashes & MASCARA_CORTE) == 0)
+
+
+def dividir_em_blocos(arquivo):
+    """Gera os blocos de um arquivo binário, lido em partes (memória limitada).
+
+    Os cortes dependem só dos bytes próximos, então uma alteração local muda apenas
+    os blocos vizinhos e o restante do arquivo continua deduplicado.
+    """
+    contexto = b""  # Últimos bytes antes do buffer: o hash de uma posição depende da janela anterior
+    buffer = b""
+    while True:
+        novo = arquivo.read(TAMANHO_BLOCO)
+        buffer += novo
+
+        inicio = 0
+        for posicao in _candidatos_corte(contexto + buffer).tolist():
+            corte = posicao + 1 - len(contexto)
+            if corte <= inicio:
+                continue
+            while corte - inicio > BLOCO_MAXIMO:
+                yield buffer[inicio:inicio + BLOCO_MAXIMO]
+                inicio += BLOCO_MAXIMO
+            if corte - inicio >= BLOCO_MINIMO:
+                yield buffer[inicio:corte]
+                inicio = corte
+
+        if not novo:
+            if inicio < len(buffer):
+                yield buffer[inicio:]
+            return
+
+        while len(buffer) - inicio > BLOCO_MAXIMO:
+            yield buffer[inicio:inicio + BLOCO_MAXIMO]
+            inicio += BLOCO_MAXIMO
+
+        contexto = (contexto + buffer[:inicio])[-(JANELA_HASH - 1):]
+        buffer = buffer[inicio:]
+
+
+# --- Blocos em Disco ---
+def _caminho_bloco(pasta, resumo):
+    return os.path.join(pasta, "blocos", resumo[:2], resumo)
+
+
+def _gravar_bloco(pasta, dados):
+    """Grava o bloco se ainda não existir. Retorna (hash, bytes gravados em disco)."""
+    resumo = hashlib.sha256(dados).hexdigest()
+    caminho = _caminho_bloco(pasta, resumo)
+    if os.path.exists(caminho):
+        # Renova a data: a coleta de lixo não remove um bloco que acabou de ser reaproveitado
+        os.utime(caminho)
+        return resumo, 0
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    compactado = zlib.compress(dados, 6)
+    temporario = f"{caminho}.{threading.get_ident()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(compactado)
+    os.replace(temporario, caminho)
+    return resumo, len(compactado)
+
+
+def _ler_bloco(pasta, resumo):
+    with open(_caminho_bloco(pasta, resumo), "rb") as f:
+        return zlib.decompress(f.read())
+
+
+# --- Snapshots ---
+def _pasta_snapshots(pasta):
+    return os.path.join(pasta, "snapshots")
+
+
+def guardar_backup(arquivo_zip, pasta=PASTA_REPOSITORIO):
+    """Guarda um backup completo (zip gerado por `gerar_backup`) como snapshot deduplicado.
+
+    Retorna {"id", "bytes_originais", "bytes_novos"}: quanto o backup tem e quanto ocupou de fato.
+    """
+    with zipfile.ZipFile(arquivo_zip) as z:
+        manifesto = ler_manifesto(z)
+        if manifesto is None:
+            raise ValueError("Só backups com manifesto podem ser guardados no repositório.")
+        if manifesto["tipo"] != "completo":
+            raise ValueError("O repositório guarda backups completos (a deduplicação já evita repetir dados).")
+
+        arquivos = {}
+        bytes_originais = bytes_novos = 0
+        with _lock_repositorio:
+            for entrada in z.infolist():
+                if entrada.filename == NOME_MANIFESTO:
+                    continue
+                blocos = []
+                with z.open(entrada) as f:
+                    for bloco in dividir_em_blocos(f):
+                        resumo, gravados = _gravar_bloco(pasta, bloco)
+                        blocos.append(resumo)
+                        bytes_novos += gravados
+                bytes_originais += entrada.file_size
+                arquivos[entrada.filename] = {
+                    "blocos": blocos,
+                    "bytes": entrada.file_size,
+                    "compactado": entrada.compress_type != zipfile.ZIP_STORED,
+                }
+
+            snapshot = {
+                "id": manifesto["id"],
+                "criado_em": manifesto["criado_em"],
+                "manifesto": manifesto,
+                "arquivos": arquivos,
+            }
+            os.makedirs(_pasta_snapshots(pasta), exist_ok=True)
+            caminho = os.path.join(_pasta_snapshots(pasta), f"{manifesto['id']}.json")
+            with open(f"{caminho}.tmp", "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            # O snapshot só aparece depois que todos os blocos estão gravados
+            os.replace(f"{caminho}.tmp", caminho)
+
+    return {"id": manifesto["id"], "bytes_originais": bytes_originais, "bytes_novos": bytes_novos}
+
+
+def carregar_snapshot(id_snapshot, pasta=PASTA_REPOSITORIO):
+    with open(os.path.join(_pasta_snapshots(pasta), f"{id_snapshot}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def listar_snapshots(pasta=PASTA_REPOSITORIO):
+    """Snapshots guardados, do mais recente para o mais antigo."""
+    if not os.path.isdir(_pasta_snapshots(pasta)):
+        return []
+    snapshots = []
+    for nome in os.listdir(_pasta_snapshots(pasta)):
+        if nome.endswith(".json"):
+            snapshot = carregar_snapshot(nome[:-len(".json")], pasta)
+            snapshots.append({
+                "id": snapshot["id"],
+                "criado_em": snapshot["criado_em"],
+                "formato": snapshot["manifesto"].get("formato", "csv"),
+                "registros": sum(info["registros"] for info in snapshot["manifesto"]["tabelas"].values()),
+                "bytes": sum(info["bytes"] for info in snapshot["arquivos"].values()),
+            })
+    return sorted(snapshots, key=lambda s: s["criado_em"], reverse=True)
+
+
+def exportar_snapshot(id_snapshot, destino, pasta=PASTA_REPOSITORIO):
+    """Remonta o zip do backup (caminho ou arquivo binário), pronto para verificar ou restaurar."""
+    snapshot = carregar_snapshot(id_snapshot, pasta)
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as z:
+        for nome, info in snapshot["arquivos"].items():
+            entrada = zipfile.ZipInfo(nome, time.localtime()[:6])
+            entrada.compress_type = zipfile.ZIP_DEFLATED if info["compactado"] else zipfile.ZIP_STORED
+            with z.open(entrada, "w", force_zip64=True) as f:
+                for resumo in info["blocos"]:
+                    f.write(_ler_bloco(pasta, resumo))
+        z.writestr(NOME_MANIFESTO, json.dumps(snapshot["manifesto"], ensure_ascii=False))
+
+
+def remover_snapshot(id_snapshot, pasta=PASTA_REPOSITORIO):
+    """Remove o manifesto do snapshot; os blocos saem na próxima coleta de lixo."""
+    caminho = os.path.join(_pasta_snapshots(pasta), f"{id_snapshot}.json")
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+# --- Retenção e Coleta de Lixo ---
+def selecionar_retidos(snapshots, diarios=RETENCAO_DIARIOS, semanais=RETENCAO_SEMANAIS):
+    """IDs mantidos: o mais recente de cada um dos últimos `diarios` dias e `semanais` semanas com snapshot."""
+    retidos = set()
+    dias, semanas = set(), set()
+    for snapshot in sorted(snapshots, key=lambda s: s["criado_em"], reverse=True):
+        data = datetime.datetime.fromisoformat(snapshot["criado_em"]).date()
+        semana = tuple(data.isocalendar())[:2]
+        if data not in dias and len(dias) < diarios:
+            dias.add(data)
+            retidos.add(snapshot["id"])
+        if semana not in semanas and len(semanas) < semanais:
+            semanas.add(semana)
+            retidos.add(snapshot["id"])
+    return retidos
+
+
+def aplicar_retencao(diarios=RETENCAO_DIARIOS, semanais=RETENCAO_SEMANAIS, pasta=PASTA_REPOSITORIO):
+    """Remove os snapshots fora da política de retenção. Retorna os IDs removidos."""
+    with _lock_repositorio:
+        snapshots = listar_snapshots(pasta)
+        retidos = selecionar_retidos(snapshots, diarios, semanais)
+        removidos = [s["id"] for s in snapshots if s["id"] not in retidos]
+        for id_snapshot in removidos:
+            remover_snapshot(id_snapshot, pasta)
+    return removidos
+
+
+def coletar_lixo(pasta=PASTA_REPOSITORIO, carencia=CARENCIA_COLETA):
+    """Apaga os blocos que nenhum snapshot referencia. Retorna (blocos removidos, bytes liberados)."""
+    with _lock_repositorio:
+        referenciados = set()
+        for snapshot in listar_snapshots(pasta):
+            for info in carregar_snapshot(snapshot["id"], pasta)["arquivos"].values():
+                referenciados.update(info["blocos"])
+
+        removidos = liberados = 0
+        limite = time.time() - carencia
+        raiz_blocos = os.path.join(pasta, "blocos")
+        for diretorio, _, nomes in os.walk(raiz_blocos):
+            for nome in nomes:
+                caminho = os.path.join(diretorio, nome)
+                if nome in referenciados or os.path.getmtime(caminho) > limite:
+                    continue
+                liberados += os.path.getsize(caminho)
+                os.remove(caminho)
+                removidos += 1
+    return removidos, liberados
+
+
+def tamanho_repositorio(pasta=PASTA_REPOSITORIO):
+    """Bytes ocupados pelos blocos em disco."""
+    total = 0
+    for diretorio, _, nomes in os.walk(os.path.join(pasta, "blocos")):
+        total += sum(os.path.getsize(os.path.join(diretorio, nome)) for nome in nomes)
+    return total
@@ -0,0 +1,47 @@
+-- Movimentação em lote: registra o histórico e atualiza os ativos numa única transação.
+-- Executar uma vez no SQL Editor do Supabase. Chamada por `dados.movimentar_ativos` (página Movimentações).
+--
+-- movimentos: [{"ativo_id": 1, "usuario_id": 2, "setor_id": 3, "status_id": 4}, ...]
+-- Retorna uma linha por ativo com o ID da movimentação criada. Tudo ou nada: se algum ativo
+-- não existir (ou qualquer comando falhar), nada é gravado.
+
+create or replace function public.movimentar_ativos(movimentos jsonb, observacao text default null)
+returns table (ativo_id bigint, movimentacao_id bigint)
+language plpgsql
+security invoker
+as $$
+#variable_conflict use_column
+declare
+    esperados integer := jsonb_array_length(movimentos);
+    gravados integer;
+begin
+    return query
+    with entrada as (
+        select *
+          from jsonb_to_recordset(movimentos)
+            as m(ativo_id bigint, usuario_id bigint, setor_id bigint, status_id bigint)
+    ),
+    atualizados as (
+        update public.ativos a
+           set usuario_id = e.usuario_id,
+               local_id = e.setor_id,
+               status_id = e.status_id
+          from entrada e
+         where a.id = e.ativo_id
+        returning a.id
+    ),
+    inseridos as (
+        insert into public.movimentacoes (ativo_id, usuario_id, setor_id, status_id, observacao)
+        select e.ativo_id, e.usuario_id, e.setor_id, e.status_id, movimentar_ativos.observacao
+          from entrada e
+          join atualizados u on u.id = e.ativo_id
+        returning movimentacoes.ativo_id, movimentacoes.id
+    )
+    select i.ativo_id::bigint, i.id::bigint from inseridos i;
+
+    get diagnostics gravados = row_count;
+    if gravados <> esperados then
+        raise exception 'movimentar_ativos: % de % ativos encontrados', gravados, esperados;
+    end if;
+end;
+$$;
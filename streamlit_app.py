@@ -2,6 +2,13 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from utils import verificar_autenticacao
+from agendador import agendador_backup, AGENDA_BACKUP
+
+# --- Backups Automáticos ---
+# Só com OFFICEFLOW_AGENDA_BACKUP definida; iniciado uma única vez por processo do servidor
+# (cache_resource), independente do login
+if AGENDA_BACKUP:
+    agendador_backup()
 
 # --- Conexão com supabase ---
 supabase = verificar_autenticacao()
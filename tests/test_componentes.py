@@ -0,0 +1,65 @@
+import pandas as pd
+import componentes
+from componentes import linhas_alteradas, salvar_alteracoes
+
+
+class ConsultaFalsa:
+    def __init__(self, linhas, chamadas):
+        self.linhas, self.chamadas = linhas, chamadas
+        self.ids, self.inicio, self.operacao = None, 0, "select"
+
+    def select(self, colunas):
+        return self
+
+    def in_(self, coluna, ids):
+        self.ids = set(ids)
+        return self
+
+    def order(self, coluna):
+        return self
+
+    def range(self, inicio, fim):
+        self.inicio = inicio
+        return self
+
+    def upsert(self, registros):
+        self.operacao, self.registros = "upsert", registros
+        return self
+
+    def execute(self):
+        self.chamadas.append(self.operacao)
+        if self.operacao == "upsert":
+            for registro in self.registros:
+                self.linhas[registro["id"]] = registro
+            return self
+        encontrados = [{"id": i} for i in sorted(self.linhas) if self.ids is None or i in self.ids]
+        self.data = encontrados[self.inicio:]
+        return self
+
+
+class ClienteFalso:
+    def __init__(self, linhas):
+        self.linhas, self.chamadas = linhas, []
+
+    def table(self, tabela):
+        return ConsultaFalsa(self.linhas, self.chamadas)
+
+
+def test_linhas_alteradas_ignora_nulos_e_tipos():
+    original = pd.DataFrame({"id": [1, 2, 3], "nome": ["a", None, "c"], "valor": [1.0, float("nan"), 3.0]})
+    editado = original.astype({"nome": "string"})
+    editado.loc[2, "nome"] = "C"
+    assert linhas_alteradas(original, editado).tolist() == [False, False, True]
+
+
+def test_salvar_nao_recria_linhas_removidas(monkeypatch):
+    erros = []
+    monkeypatch.setattr(componentes.st, "error", erros.append)
+    client = ClienteFalso({1: {"id": 1, "nome": "a"}})  # O ID 2 foi removido por outra sessão
+
+    salvos = salvar_alteracoes(client, "marcas", pd.DataFrame({"id": [1, 2], "nome": ["A", "B"]}))
+
+    assert salvos == 1
+    assert client.linhas == {1: {"id": 1, "nome": "A"}}
+    assert client.chamadas.count("upsert") == 1
+    assert len(erros) == 1 and "ID 2" in erros[0]
@@ -0,0 +1,25 @@
+import pytest
+from dados import movimentar_ativos
+
+
+class FuncaoInexistente(Exception):
+    code = "PGRST202"
+
+
+class ClienteSemFuncao:
+    """Simula o PostgREST sem a função instalada; qualquer gravação em tabela é um erro."""
+
+    def rpc(self, funcao, parametros):
+        return self
+
+    def execute(self):
+        raise FuncaoInexistente("Could not find the function public.movimentar_ativos")
+
+    def table(self, tabela):
+        raise AssertionError(f"gravação fora da transação em '{tabela}'")
+
+
+def test_movimentar_sem_funcao_nao_grava():
+    movimentos = [{"ativo_id": 1, "usuario_id": None, "setor_id": 2, "status_id": 1}]
+    with pytest.raises(RuntimeError, match="sql/movimentar_ativos.sql"):
+        movimentar_ativos(ClienteSemFuncao(), movimentos, "lote")
@@ -0,0 +1,41 @@
+import io
+from importacao import importar_csv
+from dados import Referencia
+
+
+class ClienteFalso:
+    """Guarda os lotes recebidos no lugar do Supabase."""
+
+    def __init__(self):
+        self.enviados = []
+
+    def table(self, tabela):
+        return self
+
+    def insert(self, registros):
+        self.enviados.extend(registros)
+        return self
+
+    def execute(self):
+        return self
+
+
+def _csv(linhas):
+    corpo = "".join(f"S{i};1;TI\n" for i in range(1, linhas + 1))
+    return io.BytesIO(("serial;modelo_id;local_id\n" + corpo).encode("utf-8-sig"))
+
+
+def test_ignorar_bloco_inteiro(monkeypatch):
+    # Blocos de 10 linhas: as linhas 11 a 20 (o segundo bloco todo) ficam de fora
+    monkeypatch.setattr("importacao.TAMANHO_LEITURA_CSV", 10)
+    setores = Referencia("setores", [{"id": 1, "nome": "TI"}])
+    client = ClienteFalso()
+
+    enviados, falhas = importar_csv(
+        client, "ativos", _csv(25), obter_referencia=lambda tabela: setores, ignorar=set(range(11, 21))
+    )
+
+    assert falhas == []
+    assert enviados == 15
+    assert [registro["serial"] for registro in client.enviados] == [f"S{i}" for i in [*range(1, 11), *range(21, 26)]]
+    assert {registro["local_id"] for registro in client.enviados} == {1}
@@ -0,0 +1,251 @@
+import datetime as dt
+import typing
+import annotated_types
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field, create_model
+from coercao import VALORES_VERDADEIROS, VALORES_FALSOS
+from dados import ids_existentes
+from esquema import tipos_da_tabela, CHAVES_ESTRANGEIRAS
+from importacao import traduzir_nomes, colunas_traduziveis, ler_csv_importacao, TAMANHO_LEITURA_CSV
+from motor_backup import FORMATO_CSV, CODIFICACAO_CSV
+
+# --- Esquemas de Importação ---
+# Campos aceitos no CSV de cada tabela da página de importação. Os modelos só declaram
+# tipos, obrigatoriedade e restrições: a validação lê essas declarações e confere cada
+# coluna de uma vez, sem instanciar um modelo por linha.
+UNICO = {"unico": True}  # Valor que não pode se repetir no arquivo
+
+
+class Ativo(BaseModel):
+    id: int | None = Field(None, json_schema_extra=UNICO)
+    serial: str = Field(json_schema_extra=UNICO)
+    valor: float | None = Field(None, ge=0)
+    modelo_id: int
+    usuario_id: int | None = None
+    local_id: int | None = None
+    status_id: int | None = None
+    estado_id: int | None = None
+    compra_id: int | None = None
+
+
+class Movimentacao(BaseModel):
+    id: int | None = Field(None, json_schema_extra=UNICO)
+    created_at: dt.datetime | None = None
+    ativo_id: int
+    usuario_id: int | None = None
+    setor_id: int | None = None
+    status_id: int | None = None
+    observacao: str | None = None
+
+
+class Manutencao(BaseModel):
+    id: int | None = Field(None, json_schema_extra=UNICO)
+    ativo_id: int
+    fornecedor: str
+    defeito: str
+    criado_em: dt.date | None = None
+    retornado_em: dt.date | None = None
+    valor: float | None = Field(None, ge=0)
+
+
+class Setor(BaseModel):
+    id: int | None = Field(None, json_schema_extra=UNICO)
+    nome: str = Field(json_schema_extra=UNICO)
+
+
+class Colaborador(BaseModel):
+    id: int | None = Field(None, json_schema_extra=UNICO)
+    nome: str
+    email: str | None = Field(None, json_schema_extra=UNICO)
+    setor_id: int | None = None
+
+
+ESQUEMAS_IMPORTACAO = {
+    "ativos": Ativo,
+    "movimentacoes": Movimentacao,
+    "manutencoes": Manutencao,
+    "setores": Setor,
+    "colaboradores": Colaborador,
+}
+
+# Demais tabelas (linha de comando): modelo montado a partir de `TIPOS_COLUNAS`, sem obrigatórios
+TIPOS_PYTHON = {
+    "inteiro": int,
+    "decimal": float,
+    "texto": str,
+    "data": dt.date,
+    "data_hora": dt.datetime,
+    "booleano": bool,
+}
+
+
+def esquema_importacao(tabela):
+    """Modelo pydantic com os campos aceitos na importação da tabela."""
+    if tabela not in ESQUEMAS_IMPORTACAO:
+        campos = {coluna: (TIPOS_PYTHON[tipo] | None, None) for coluna, tipo in tipos_da_tabela(tabela).items()}
+        campos["id"] = (int | None, Field(None, json_schema_extra=UNICO))
+        ESQUEMAS_IMPORTACAO[tabela] = create_model(tabela.capitalize(), **campos)
+    return ESQUEMAS_IMPORTACAO[tabela]
+
+
+COLUNAS_ERROS = ["linha", "coluna", "valor", "erro"]
+
+# --- Conferência por Tipo ---
+# Cada função recebe a coluna em texto (sem vazios) e devolve a máscara dos valores inválidos
+def _numeros(texto):
+    return pd.to_numeric(texto.str.replace(",", ".", regex=False), errors="coerce")
+
+
+def _inteiros_invalidos(texto):
+    numeros = _numeros(texto)
+    return numeros.isna() | (np.mod(numeros.fillna(0), 1) != 0)
+
+
+def _datas_invalidas(texto):
+    return pd.to_datetime(texto, format="ISO8601", errors="coerce", utc=True).isna()
+
+
+VERIFICACOES_TIPO = {
+    int: (_inteiros_invalidos, "não é um número inteiro"),
+    float: (lambda texto: _numeros(texto).isna(), "não é um número"),
+    dt.date: (_datas_invalidas, "data inválida (use AAAA-MM-DD)"),
+    dt.datetime: (_datas_invalidas, "data/hora inválida (use AAAA-MM-DD HH:MM)"),
+    bool: (
+        lambda texto: ~texto.str.lower().isin(VALORES_VERDADEIROS | VALORES_FALSOS),
+        "não é verdadeiro/falso",
+    ),
+}
+
+
+def _tipo_base(anotacao):
+    """`int | None` -> int."""
+    argumentos = [a for a in typing.get_args(anotacao) if a is not type(None)]
+    return argumentos[0] if argumentos else anotacao
+
+
+def _restricoes_invalidas(texto, tipo, metadados):
+    """Máscaras e mensagens das restrições do campo (ge/le/max_length)."""
+    for restricao in metadados:
+        if isinstance(restricao, annotated_types.Ge):
+            yield _numeros(texto) < restricao.ge, f"deve ser maior ou igual a {restricao.ge}"
+        elif isinstance(restricao, annotated_types.Le):
+            yield _numeros(texto) > restricao.le, f"deve ser menor ou igual a {restricao.le}"
+        elif isinstance(restricao, annotated_types.MaxLen) and tipo is str:
+            yield texto.str.len() > restricao.max_length, f"mais de {restricao.max_length} caracteres"
+
+
+def _erros(mascara, coluna, valores, erro):
+    """Linhas marcadas em `mascara` no formato do relatório."""
+    return pd.DataFrame({
+        "linha": mascara.index[mascara] + 1,
+        "coluna": coluna,
+        "valor": valores[mascara].to_numpy(dtype=object),
+        "erro": erro if isinstance(erro, str) else erro[mascara].to_numpy(dtype=object),
+    })
+
+
+# --- Validação ---
+def verificar_colunas(colunas, tabela):
+    """Lança ValueError se o arquivo tiver colunas desconhecidas ou faltar alguma obrigatória."""
+    campos = esquema_importacao(tabela).model_fields
+    desconhecidas = [coluna for coluna in colunas if coluna not in campos]
+    ausentes = [nome for nome, campo in campos.items() if campo.is_required() and nome not in colunas]
+    problemas = []
+    if desconhecidas:
+        problemas.append(f"colunas desconhecidas em '{tabela}': {', '.join(map(str, desconhecidas))}")
+    if ausentes:
+        problemas.append(f"colunas obrigatórias ausentes: {', '.join(ausentes)}")
+    if problemas:
+        raise ValueError("; ".join(problemas).capitalize() + ".")
+
+
+def _validar_lote(df, tabela, obter_referencia, consultar_ids):
+    """Erros por linha de um bloco do arquivo (exceto repetições, conferidas no arquivo todo)."""
+    campos = esquema_importacao(tabela).model_fields
+    texto = df.apply(lambda serie: serie.astype("string").str.strip().replace("", pd.NA))
+    erros = []
+
+    # Nomes nas chaves estrangeiras: valores sem ID correspondente (ver `traduzir_nomes`)
+    traduzidas = [c for c in colunas_traduziveis(tabela) if c in df.columns] if obter_referencia else []
+    if traduzidas:
+        traduzido, pendencias = traduzir_nomes(df, tabela, obter_referencia)
+        for coluna in traduzidas:
+            pendente = texto[coluna].notna() & traduzido[coluna].isna()
+            if pendente.any():
+                motivos = pendencias[pendencias["coluna"] == coluna].set_index("valor")["motivo"]
+                erros.append(_erros(pendente, coluna, texto[coluna], texto[coluna].map(motivos)))
+
+    for coluna in df.columns:
+        campo = campos[coluna]
+        valores = texto[coluna]
+        preenchida = valores.notna()
+        if campo.is_required() and not preenchida.all():
+            erros.append(_erros(~preenchida, coluna, df[coluna], "campo obrigatório vazio"))
+        if coluna in traduzidas or not preenchida.any():
+            continue
+
+        tipo = _tipo_base(campo.annotation)
+        preenchidos = valores[preenchida]
+        verificacao = VERIFICACOES_TIPO.get(tipo)
+        invalidos = verificacao[0](preenchidos) if verificacao else pd.Series(False, index=preenchidos.index)
+        if invalidos.any():
+            erros.append(_erros(invalidos, coluna, preenchidos, verificacao[1]))
+
+        validos = preenchidos[~invalidos]
+        for mascara, erro in _restricoes_invalidas(validos, tipo, campo.metadata):
+            mascara = mascara.fillna(False).astype(bool)
+            if mascara.any():
+                erros.append(_erros(mascara, coluna, validos, erro))
+
+        # Chave estrangeira sem cache de referência: os IDs distintos são consultados no banco
+        referenciada = CHAVES_ESTRANGEIRAS.get(tabela, {}).get(coluna)
+        if referenciada and consultar_ids and not validos.empty:
+            ids = _numeros(validos).astype("int64")
+            existentes = consultar_ids(referenciada, set(ids.unique().tolist()))
+            ausente = ~ids.isin(existentes)
+            if ausente.any():
+                erros.append(_erros(ausente, coluna, validos, f"ID não encontrado em '{referenciada}'"))
+    return erros
+
+
+def validar_csv(arquivo, tabela, obter_referencia=None, consultar_ids=None, tamanho_lote=TAMANHO_LEITURA_CSV,
+                codificacao=CODIFICACAO_CSV, separador=FORMATO_CSV["sep"]):
+    """Confere o CSV contra o esquema da tabela antes de qualquer gravação, bloco a bloco.
+
+    Verifica colunas (ValueError já no primeiro bloco), tipos, campos obrigatórios, valores
+    repetidos nos campos únicos e a existência das chaves estrangeiras: pelo cache de
+    referências (`obter_referencia`, que também aceita nomes) ou por `consultar_ids(tabela, ids)`.
+    Retorna (linhas, erros), com um erro por linha e coluna nas colunas `COLUNAS_ERROS`.
+    """
+    campos = esquema_importacao(tabela).model_fields
+    linhas, erros, unicos = 0, [], {}
+    for df in ler_csv_importacao(arquivo, tamanho_lote, codificacao, separador):
+        if linhas == 0:
+            verificar_colunas(list(df.columns), tabela)
+        linhas += len(df)
+        erros.extend(_validar_lote(df, tabela, obter_referencia, consultar_ids))
+        for coluna in df.columns:
+            if (campos[coluna].json_schema_extra or {}).get("unico"):
+                unicos.setdefault(coluna, []).append(df[coluna].str.strip().replace("", pd.NA).dropna())
+
+    # Repetições no arquivo todo: só a coluna única de cada bloco fica guardada
+    for coluna, partes in unicos.items():
+        valores = pd.concat(partes)
+        repetido = valores.duplicated(keep=False)
+        if repetido.any():
+            erros.append(_erros(repetido, coluna, valores, "valor repetido no arquivo"))
+
+    if not erros:
+        return linhas, pd.DataFrame(columns=COLUNAS_ERROS)
+    return linhas, pd.concat(erros, ignore_index=True).sort_values(["linha", "coluna"], kind="stable", ignore_index=True)
+
+
+def resumo_erros(erros):
+    """Contagem por coluna e tipo de erro, com a primeira linha afetada."""
+    return (
+        erros.groupby(["coluna", "erro"], sort=False)
+        .agg(linhas=("linha", "size"), primeira_linha=("linha", "min"))
+        .reset_index()
+        .sort_values("linhas", ascending=False, ignore_index=True)
+    )